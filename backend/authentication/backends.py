@@ -0,0 +1,101 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+from jose import jwk, jwt, JWTError
+
+from .exceptions import InvalidCredentials
+from .keys import KeyRing
+
+try:
+    import jwt as pyjwt
+except ImportError:
+    pyjwt = None
+
+
+class JWTBackend(ABC):
+    """
+    Encodes and decodes tokens (JWT) with keys that are prepared once, when the backend is created.
+    Tokens carry the identifier of their signing key (kid) and are verified with the matching key of the ring.
+
+        Attributes:
+            key_ring (KeyRing): The signing and verification keys.
+    """
+    def __init__(self, key_ring: KeyRing) -> None:
+        """
+        Initialize the JWTBackend.
+
+            Parameters:
+                key_ring (KeyRing): The signing and verification keys.
+        """
+        self.key_ring = key_ring
+        self._algorithms = [key_ring.algorithm]
+        self._headers = {"kid": key_ring.signing_key_id} if key_ring.signing_key_id else None
+        self._signing_key = self.prepare_key(key_ring.signing_key)
+        self._verification_keys = {
+            key_id: self.prepare_key(key) for key_id, key in key_ring.verification_keys.items()
+        }
+
+    @abstractmethod
+    def prepare_key(self, key: str) -> Any:
+        """
+        Builds the key object used by the JWT library.
+        """
+
+    @abstractmethod
+    def encode(self, claims: Dict) -> str:
+        """
+        Signs claims into a token (JWT).
+        """
+
+    @abstractmethod
+    def decode(self, token: str) -> Dict:
+        """
+        Verifies a token (JWT) and returns its claims, raising InvalidCredentials if it is invalid or expired.
+        """
+
+
+class JoseBackend(JWTBackend):
+    """
+    JWT backend using python-jose.
+    """
+    def prepare_key(self, key: str) -> Any:
+        return jwk.construct(key, self.key_ring.algorithm)
+
+    def encode(self, claims: Dict) -> str:
+        return jwt.encode(claims, self._signing_key, algorithm=self.key_ring.algorithm, headers=self._headers)
+
+    def decode(self, token: str) -> Dict:
+        try:
+            key = self._verification_keys.get(jwt.get_unverified_header(token).get("kid"))
+            if key is None:
+                raise InvalidCredentials()
+            return jwt.decode(token, key, algorithms=self._algorithms)
+        except JWTError:
+            raise InvalidCredentials()
+
+
+class PyJWTBackend(JWTBackend):
+    """
+    JWT backend using PyJWT. Run benchmarks/jwt_backends.py to compare it with python-jose on your machine.
+    """
+    def prepare_key(self, key: str) -> Any:
+        if pyjwt is None:
+            raise ImportError("The pyjwt backend requires the PyJWT package (pip install pyjwt)")
+        return pyjwt.get_algorithm_by_name(self.key_ring.algorithm).prepare_key(key)
+
+    def encode(self, claims: Dict) -> str:
+        return pyjwt.encode(claims, self._signing_key, algorithm=self.key_ring.algorithm, headers=self._headers)
+
+    def decode(self, token: str) -> Dict:
+        try:
+            key = self._verification_keys.get(pyjwt.get_unverified_header(token).get("kid"))
+            if key is None:
+                raise InvalidCredentials()
+            return pyjwt.decode(token, key, algorithms=self._algorithms, options={"verify_sub": False})
+        except pyjwt.PyJWTError:
+            raise InvalidCredentials()
+
+
+JWT_BACKENDS = {
+    "jose": JoseBackend,
+    "pyjwt": PyJWTBackend,
+}
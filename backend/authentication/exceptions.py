@@ -1,5 +1,7 @@
 from fastapi import HTTPException, status
 
+from ..utils.responses import encode_detail
+
 
 class IncorrectEmailOrPassword(HTTPException):
     """
@@ -8,10 +10,12 @@ class IncorrectEmailOrPassword(HTTPException):
         Attributes:
             STATUS_CODE (int): The HTTP status code for this exception, set to 401 Unauthorized.
             DETAIL (str): The detailed error message indicating that the email or password is incorrect.
+            BODY (bytes): The pre-encoded body of the error response.
             HEADERS (Dict[str, str]): The headers to be included in the response when this exception is raised.
     """
     STATUS_CODE = status.HTTP_401_UNAUTHORIZED
     DETAIL = {"msg": "Email address or password is incorrect"}
+    BODY = encode_detail(DETAIL)
     HEADERS = {"WWW-Authenticate": "Bearer"}
 
     def __init__(self) -> None:
@@ -28,10 +32,12 @@ class InvalidCredentials(HTTPException):
         Attributes:
             STATUS_CODE (int): The HTTP status code for this exception, set to 401 Unauthorized.
             DETAIL (str): The detailed error message indicating that the credentials could not be validated.
+            BODY (bytes): The pre-encoded body of the error response.
             HEADERS (Dict[str, str]): The headers to be included in the response when this exception is raised.
     """
     STATUS_CODE = status.HTTP_401_UNAUTHORIZED
     DETAIL = {"msg": "Could not validate credentials"}
+    BODY = encode_detail(DETAIL)
     HEADERS = {"WWW-Authenticate": "Bearer"}
 
     def __init__(self) -> None:
@@ -39,3 +45,50 @@ class InvalidCredentials(HTTPException):
         Initialize the InvalidCredentials exception.
         """
         super().__init__(status_code=self.STATUS_CODE, detail=self.DETAIL, headers=self.HEADERS)
+
+
+class AdminAccessRequired(HTTPException):
+    """
+    Custom exception class for indicating that an admin endpoint was called without a valid admin key.
+
+        Attributes:
+            STATUS_CODE (int): The HTTP status code for this exception, set to 403 Forbidden.
+            DETAIL (str): The detailed error message indicating that admin access is required.
+            BODY (bytes): The pre-encoded body of the error response.
+    """
+    STATUS_CODE = status.HTTP_403_FORBIDDEN
+    DETAIL = {"msg": "Admin access is required"}
+    BODY = encode_detail(DETAIL)
+
+    def __init__(self) -> None:
+        """
+        Initialize the AdminAccessRequired exception.
+        """
+        super().__init__(status_code=self.STATUS_CODE, detail=self.DETAIL)
+
+
+class TooManyLoginAttempts(HTTPException):
+    """
+    Custom exception class for indicating that too many login attempts were made in a short time.
+
+        Attributes:
+            STATUS_CODE (int): The HTTP status code for this exception, set to 429 Too Many Requests.
+            DETAIL (str): The detailed error message indicating that there were too many login attempts.
+            BODY (bytes): The pre-encoded body of the error response.
+            HEADERS (Dict[str, str]): The example headers of the response, Retry-After depends on the limit.
+    """
+    STATUS_CODE = status.HTTP_429_TOO_MANY_REQUESTS
+    DETAIL = {"msg": "Too many login attempts, please try again later"}
+    BODY = encode_detail(DETAIL)
+    HEADERS = {"Retry-After": "60"}
+
+    def __init__(self, retry_after: float) -> None:
+        """
+        Initialize the TooManyLoginAttempts exception.
+
+            Parameters:
+                retry_after (float): Seconds after which a new attempt is allowed.
+        """
+        super().__init__(
+            status_code=self.STATUS_CODE, detail=self.DETAIL, headers={"Retry-After": str(max(1, round(retry_after)))}
+        )
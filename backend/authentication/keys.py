@@ -0,0 +1,170 @@
+import hashlib
+import json
+from base64 import urlsafe_b64encode
+from pathlib import Path
+from typing import Dict, List
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from ..config import Settings
+
+
+SYMMETRIC_ALGORITHMS = {"HS256", "HS384", "HS512"}
+EC_CURVES = {"secp256r1": "P-256", "secp384r1": "P-384", "secp521r1": "P-521"}
+
+def _base64url_uint(value: int) -> str:
+    """
+    Encodes an unsigned integer as unpadded base64url, as required by JWK.
+
+        Parameters:
+            value (int): The integer to encode.
+
+        Returns:
+            str: The encoded integer.
+    """
+    return _base64url(value.to_bytes((value.bit_length() + 7) // 8 or 1, "big"))
+
+def _base64url(value: bytes) -> str:
+    """
+    Encodes bytes as unpadded base64url.
+
+        Parameters:
+            value (bytes): The bytes to encode.
+
+        Returns:
+            str: The encoded bytes.
+    """
+    return urlsafe_b64encode(value).rstrip(b"=").decode()
+
+def public_key_to_jwk(public_key_pem: bytes) -> Dict[str, str]:
+    """
+    Converts a PEM public key into its JSON Web Key members (without "kid", "alg" and "use").
+
+        Parameters:
+            public_key_pem (bytes): The public key in PEM format.
+
+        Raises:
+            ValueError: If the key type is not supported.
+
+        Returns:
+            Dict[str, str]: The JSON Web Key members.
+    """
+    public_key = serialization.load_pem_public_key(public_key_pem)
+
+    if isinstance(public_key, rsa.RSAPublicKey):
+        numbers = public_key.public_numbers()
+        return {"kty": "RSA", "n": _base64url_uint(numbers.n), "e": _base64url_uint(numbers.e)}
+    if isinstance(public_key, ec.EllipticCurvePublicKey):
+        numbers = public_key.public_numbers()
+        size = (public_key.curve.key_size + 7) // 8
+        return {
+            "kty": "EC",
+            "crv": EC_CURVES[public_key.curve.name],
+            "x": _base64url(numbers.x.to_bytes(size, "big")),
+            "y": _base64url(numbers.y.to_bytes(size, "big")),
+        }
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        raw = public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return {"kty": "OKP", "crv": "Ed25519", "x": _base64url(raw)}
+
+    raise ValueError(f"Unsupported public key type: {type(public_key).__name__}")
+
+def get_key_id(jwk: Dict[str, str]) -> str:
+    """
+    Computes the RFC 7638 thumbprint of a JSON Web Key, used as its key identifier (kid).
+
+        Parameters:
+            jwk (Dict[str, str]): The JSON Web Key members.
+
+        Returns:
+            str: The key identifier.
+    """
+    required_members = {"RSA": ("e", "kty", "n"), "EC": ("crv", "kty", "x", "y"), "OKP": ("crv", "kty", "x")}
+    canonical = json.dumps(
+        {member: jwk[member] for member in required_members[jwk["kty"]]}, separators=(",", ":"), sort_keys=True
+    )
+    return _base64url(hashlib.sha256(canonical.encode()).digest())
+
+
+class KeyRing:
+    """
+    Keys signing and verifying tokens (JWT), kept in memory.
+    Tokens are signed with a single key, but every public key of the ring is accepted, so a new signing key
+    can be rolled out while tokens signed with the previous one are still valid.
+
+        Attributes:
+            algorithm (str): The signing algorithm.
+            signing_key_id (str | None): The identifier of the signing key, None for symmetric algorithms.
+            signing_key (str): The secret or the private key (PEM) signing tokens.
+            verification_keys (Dict[str | None, str]): Secrets or public keys (PEM) by key identifier.
+            jwks (Dict[str, List[Dict[str, str]]]): The public keys as a JSON Web Key Set.
+            jwks_body (bytes): The JSON Web Key Set, encoded once.
+            jwks_etag (str): The entity tag of the encoded JSON Web Key Set.
+    """
+    def __init__(self, algorithm: str, signing_key: str, public_keys: List[str] | None = None) -> None:
+        """
+        Initialize the KeyRing.
+
+            Parameters:
+                algorithm (str): The signing algorithm.
+                signing_key (str): The secret (symmetric algorithms) or the private key in PEM format.
+                public_keys (List[str] | None): Additional public keys (PEM) that are still accepted.
+        """
+        self.algorithm = algorithm
+        self.signing_key = signing_key
+        self.verification_keys: Dict[str | None, str] = {}
+        self.jwks: Dict[str, List[Dict[str, str]]] = {"keys": []}
+
+        if algorithm in SYMMETRIC_ALGORITHMS:
+            self.signing_key_id = None
+            self.verification_keys[None] = signing_key
+        else:
+            private_key = serialization.load_pem_private_key(signing_key.encode(), password=None)
+            signing_public_key = private_key.public_key().public_bytes(
+                serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+            ).decode()
+
+            self.signing_key_id = self._add_public_key(signing_public_key)
+            for public_key in public_keys or []:
+                self._add_public_key(public_key)
+
+        self.jwks_body = json.dumps(self.jwks, separators=(",", ":")).encode()
+        self.jwks_etag = f'"{hashlib.sha256(self.jwks_body).hexdigest()[:32]}"'
+
+    def _add_public_key(self, public_key: str) -> str:
+        """
+        Adds a public key to the verification keys and to the JSON Web Key Set.
+
+            Parameters:
+                public_key (str): The public key in PEM format.
+
+            Returns:
+                str: The key identifier.
+        """
+        jwk = public_key_to_jwk(public_key.encode())
+        key_id = get_key_id(jwk)
+        if key_id not in self.verification_keys:
+            self.verification_keys[key_id] = public_key
+            self.jwks["keys"].append({**jwk, "kid": key_id, "alg": self.algorithm, "use": "sig"})
+        return key_id
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "KeyRing":
+        """
+        Builds the key ring from the settings, reading the key files.
+
+            Parameters:
+                settings (Settings): The application settings.
+
+            Returns:
+                KeyRing: The key ring.
+        """
+        if settings.algorithm in SYMMETRIC_ALGORITHMS:
+            return cls(settings.algorithm, settings.secret_key)
+
+        public_keys = []
+        if settings.jwt_public_keys_dir:
+            public_keys = [path.read_text() for path in sorted(Path(settings.jwt_public_keys_dir).glob("*.pem"))]
+
+        return cls(settings.algorithm, Path(settings.jwt_private_key_file).read_text(), public_keys)
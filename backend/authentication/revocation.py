@@ -0,0 +1,92 @@
+import heapq
+from abc import ABC, abstractmethod
+from threading import Lock
+from time import time
+from typing import Dict, List, Tuple
+
+
+class RevocationList(ABC):
+    """
+    Access tokens revoked before they expire, checked on every authenticated request.
+    Entries are only needed until the revoked access tokens expire, so the list stays small.
+    A shared backend (e.g. Redis) can be plugged in by implementing it, so that a logout is seen by all workers.
+    """
+    @abstractmethod
+    def revoke_token(self, token_id: str, expires: float) -> None:
+        """
+        Revokes a single access token.
+
+            Parameters:
+                token_id (str): The unique identifier (jti) of the token.
+                expires (float): The UNIX time the token expires.
+        """
+
+    @abstractmethod
+    def revoke_session(self, session_id: str, expires: float) -> None:
+        """
+        Revokes every access token of a session.
+
+            Parameters:
+                session_id (str): The identifier (sid) of the session.
+                expires (float): The UNIX time the last access token of the session expires.
+        """
+
+    @abstractmethod
+    def is_revoked(self, claims: Dict) -> bool:
+        """
+        Checks whether an access token is revoked.
+
+            Parameters:
+                claims (Dict): The decoded access token claims.
+
+            Returns:
+                bool: True if the token or its session was revoked.
+        """
+
+
+class MemoryRevocationList(RevocationList):
+    """
+    In-process revocation list of this worker. Checks are two dictionary lookups without a lock.
+    Entries are also pushed on a heap ordered by expiry, so expired entries are dropped from its top in O(log n)
+    whenever something is revoked.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize the MemoryRevocationList.
+        """
+        self._tokens: Dict[str, float] = {}
+        self._sessions: Dict[str, float] = {}
+        self._expiry: List[Tuple[float, str, str]] = []
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._tokens) + len(self._sessions)
+
+    def _prune(self, now: float) -> None:
+        """
+        Drops the expired entries. Must be called with the lock held.
+
+            Parameters:
+                now (float): The current UNIX time.
+        """
+        while self._expiry and self._expiry[0][0] <= now:
+            expires, kind, key = heapq.heappop(self._expiry)
+            if kind == "token" and self._tokens.get(key) == expires:
+                del self._tokens[key]
+            elif kind == "session" and self._sessions.get(key) == expires:
+                del self._sessions[key]
+
+    def revoke_token(self, token_id: str, expires: float) -> None:
+        with self._lock:
+            self._prune(time())
+            self._tokens[token_id] = expires
+            heapq.heappush(self._expiry, (expires, "token", token_id))
+
+    def revoke_session(self, session_id: str, expires: float) -> None:
+        with self._lock:
+            self._prune(time())
+            self._sessions[session_id] = expires
+            heapq.heappush(self._expiry, (expires, "session", session_id))
+
+    def is_revoked(self, claims: Dict) -> bool:
+        return claims.get("jti") in self._tokens or claims.get("sid") in self._sessions
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Header, Response, status
+
+from .services import get_key_ring
+
+
+router = APIRouter(
+    tags=["authentication"]
+)
+
+JWKS_CACHE_CONTROL = "public, max-age=300"
+
+@router.get(
+    "/.well-known/jwks.json",
+    summary="Get the token verification keys",
+    description="""
+    <h1>Returns the public keys verifying access tokens as a JSON Web Key Set.</h1>
+
+    The keys are identified by the "kid" header of the tokens.
+    The response can be cached and revalidated with its ETag.
+    """,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Successfully obtained the JSON Web Key Set"
+        },
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The cached JSON Web Key Set is still valid"
+        }
+    },
+    response_description="Successfully obtained the JSON Web Key Set",
+    status_code=status.HTTP_200_OK
+)
+async def get_jwks(if_none_match: str | None = Header(None)):
+    """
+    Returns the public keys of the key ring. The body is encoded once, when the key ring is loaded.
+
+        Parameters:
+            if_none_match (str | None): The ETag of a cached JSON Web Key Set. Defaults to Header(None).
+
+        Returns:
+            Response: The JSON Web Key Set or an empty 304 Not Modified response.
+    """
+    key_ring = get_key_ring()
+    headers = {"ETag": key_ring.jwks_etag, "Cache-Control": JWKS_CACHE_CONTROL}
+
+    if if_none_match == key_ring.jwks_etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=key_ring.jwks_body, media_type="application/json", headers=headers)
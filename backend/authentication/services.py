@@ -1,53 +1,288 @@
-from typing import Dict
-from sqlalchemy.orm import Session
-from datetime import timedelta, datetime
-from jose import jwt, JWTError
-from os import getenv
+import hashlib
+from functools import lru_cache
+from time import time
+from typing import Dict, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import timedelta, datetime, timezone
+from uuid import uuid4
 from pydantic import EmailStr
 
-from ..users.services import get_user_by_email
-from .. utils.security import verify_hashed_string
+from ..config import get_settings
+from ..database.configuration import get_async_sessionmaker
+from ..jobs.queue import get_job_queue, job_handler
+from ..metrics.instruments import timed
+from ..tracing.tracer import traced
+from ..users.schemas import UserInDB, UserOut
+from ..utils.cache import Cache, CacheStats, build_cache
+from ..users.services import get_cached_user_by_id, get_user_by_email
+from .. utils.security import async_get_dummy_hashed_string, async_get_hashed_string, async_verify_hashed_string, \
+    get_keyed_digest, hashed_string_needs_update
+from ..utils.exceptions import HashingQueueFull
+from .backends import JWT_BACKENDS, JWTBackend
 from .exceptions import InvalidCredentials
-from ..users.services import get_user_by_id
+from .keys import KeyRing
+from .revocation import MemoryRevocationList, RevocationList
+from . import sessions
+from ..users.services import update_hashed_password
 
 
-def authenticate_user(db: Session, email: EmailStr, password: str) -> bool:
+access_token_claims_stats = CacheStats()
+
+@traced
+async def authenticate_user(db: AsyncSession, email: EmailStr, password: str) -> UserInDB | None:
     """
     Authenticates a user based on his email address and password.
+    Unknown email addresses are checked against a dummy hash, so they can not be told apart by timing.
+    If the password hash uses a deprecated scheme or cost, a job replacing it is enqueued.
 
         Parameters:
-            db (Session): A database session.
+            db (AsyncSession): A database session.
             email (EmailStr): An email address of the user to be authenticated.
             password (str): A password of the user to be authenticated.
 
         Returns:
-            bool: Returns True if authentication succeeds, otherwise False.
+            UserInDB | None: The authenticated user if authentication succeeds, otherwise None.
     """
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     if user is None:
-        return False
-    return verify_hashed_string(password, user.hashed_password)
+        await async_verify_hashed_string(password, await async_get_dummy_hashed_string())
+        return None
+    if not await async_verify_hashed_string(password, user.hashed_password):
+        return None
+    if hashed_string_needs_update(user.hashed_password):
+        await get_job_queue().enqueue(
+            "rehash_password",
+            {"user_id": user.id, "password": password, "hashed_password": user.hashed_password},
+            durable=False
+        )
+    return user
 
-def authenticate_refresh_token(db: Session, user_id: int, refresh_token: str) -> bool:
+@job_handler("rehash_password")
+async def rehash_password(user_id: int, password: str, hashed_password: str) -> None:
     """
-    Authenticates a refresh token based on the user identifier and the provided refresh token.
+    Hashes a password again with the configured scheme and cost and saves the new hash, using its own
+    database session since it runs after the response. The job is never durable, since its payload holds
+    the plaintext password. It is skipped if the hashing pool is overloaded, the next login tries again.
 
         Parameters:
-            db (Session): A database session.
-            user_id (int): The user's identifier to check his refresh token.
-            refresh_token (str): The provided refresh token to compare with user's refresh token.
+            user_id (int): An identifier of the user.
+            password (str): The verified password of the user.
+            hashed_password (str): The outdated hash of the password.
+    """
+    try:
+        new_hashed_password = await async_get_hashed_string(password)
+    except HashingQueueFull:
+        return
+
+    async with get_async_sessionmaker()() as db:
+        await update_hashed_password(db, user_id, hashed_password, new_hashed_password)
+
+def get_access_token_claims(user_id: int, session_id: str, email: str | None = None) -> Dict:
+    """
+    Builds the claims of an access token for a user session.
+    The email is embedded only if ACCESS_TOKEN_EMBED_EMAIL is enabled, which lets the API answer
+    who the current user is without touching the database.
+
+        Parameters:
+            user_id (int): An identifier of the user the access token is issued for.
+            session_id (str): The identifier of the session the access token belongs to.
+            email (str | None): The email address of the user.
 
         Returns:
-            bool: Returns True if authentication succeeds, otherwise False.
+            Dict: The access token claims.
     """
-    user = get_user_by_id(db, user_id)
-    if user is None:
-        return False
-    return verify_hashed_string(refresh_token, user.hashed_refresh_token)
+    if email is not None and get_settings().access_token_embed_email:
+        return {"sub": str(user_id), "sid": session_id, "email": email}
+    return {"sub": str(user_id), "sid": session_id}
+
+@traced
+def create_session_tokens(user_id: int, session_id: str, email: str | None = None) -> Tuple[Dict, str, datetime]:
+    """
+    Creates the access token and the next refresh token of a session.
+
+        Parameters:
+            user_id (int): An identifier of the user owning the session.
+            session_id (str): The identifier of the session.
+            email (str | None): The email address of the user, embedded in the access token if enabled.
+
+        Returns:
+            Tuple[Dict, str, datetime]: The tokens, the keyed digest of the refresh token and when it expires.
+    """
+    settings = get_settings()
+    refresh_token = create_token(
+        data={"sub": str(user_id), "sid": session_id, "type": "refresh"}, expires_delta=settings.refresh_token_expires
+    )
+    tokens = {
+        "access_token": create_token(
+            data=get_access_token_claims(user_id, session_id, email), expires_delta=settings.access_token_expires
+        ),
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+    return tokens, get_keyed_digest(refresh_token), datetime.now(timezone.utc) + settings.refresh_token_expires
+
+@traced
+async def start_session(db: AsyncSession, user: UserOut) -> Dict:
+    """
+    Starts a new session (one per login, i.e. per device) and issues its first tokens.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            user (UserOut): The authenticated user.
+
+        Returns:
+            Dict: The refresh token, access token and their type.
+    """
+    session_id = uuid4().hex
+    tokens, refresh_token_digest, expires_at = create_session_tokens(user.id, session_id, user.email)
+    await sessions.create_session(db, session_id, user.id, refresh_token_digest, expires_at)
+    return tokens
+
+@traced
+async def refresh_session(db: AsyncSession, refresh_token: str) -> Dict:
+    """
+    Rotates the refresh token of a session: the presented token is replaced with a new one in a single UPDATE,
+    so every refresh token can be used once. If an already used refresh token is presented again, it was
+    stolen or leaked, so the whole session is ended and its access tokens are revoked.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            refresh_token (str): The presented refresh token.
+
+        Raises:
+            InvalidCredentials: If the refresh token is incorrect, expired, already used or its session ended.
+
+        Returns:
+            Dict: The new refresh token, access token and their type.
+    """
+    claims = decode_token(refresh_token)
+    session_id = claims.get("sid")
+    if claims.get("type") != "refresh" or not isinstance(session_id, str):
+        raise InvalidCredentials()
+    try:
+        user_id = int(claims["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCredentials()
+
+    email = None
+    if get_settings().access_token_embed_email:
+        user = await get_cached_user_by_id(db, user_id)
+        if user is None:
+            raise InvalidCredentials()
+        email = user.email
+
+    tokens, new_refresh_token_digest, expires_at = create_session_tokens(user_id, session_id, email)
+    if await sessions.rotate_session(
+        db, session_id, user_id, get_keyed_digest(refresh_token), new_refresh_token_digest, expires_at
+    ):
+        return tokens
+
+    if await sessions.delete_session(db, session_id, user_id):
+        get_revocation_list().revoke_session(session_id, time() + get_settings().access_token_expires.total_seconds())
+    raise InvalidCredentials()
+
+@traced
+async def end_session(db: AsyncSession, claims: Dict) -> None:
+    """
+    Ends the session of an access token (logout): its refresh token stops working and
+    its access tokens are revoked.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            claims (Dict): The decoded access token claims.
+    """
+    revocation_list = get_revocation_list()
+    revocation_list.revoke_token(claims["jti"], claims["exp"])
+
+    session_id = claims.get("sid")
+    if session_id is not None:
+        await sessions.delete_session(db, session_id, int(claims["sub"]))
+        revocation_list.revoke_session(session_id, time() + get_settings().access_token_expires.total_seconds())
+
+@traced
+async def end_all_sessions(db: AsyncSession, user_id: int) -> None:
+    """
+    Ends every session of a user (logout from all devices): all refresh tokens stop working and
+    the access tokens of the deleted sessions are revoked. Sessions started afterwards are not affected,
+    even within the same second.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            user_id (int): An identifier of the user.
+    """
+    revocation_list = get_revocation_list()
+    expires = time() + get_settings().access_token_expires.total_seconds()
+    for session_id in await sessions.delete_user_sessions(db, user_id):
+        revocation_list.revoke_session(session_id, expires)
+
+@lru_cache
+def get_revocation_list() -> RevocationList:
+    """
+    Returns the list of revoked access tokens. It is kept in the memory of each worker, so a logout handled
+    by one worker is not seen by the others until the access tokens expire, while refresh tokens stop working
+    everywhere at once since sessions live in the database.
+
+        Returns:
+            RevocationList: The revocation list.
+    """
+    return MemoryRevocationList()
+
+def is_access_token_revoked(claims: Dict) -> bool:
+    """
+    Checks whether decoded token claims may not be used as an access token, either because they belong to
+    a refresh token or because the access token was revoked.
+
+        Parameters:
+            claims (Dict): The decoded token claims.
+
+        Returns:
+            bool: True if the token must be rejected.
+    """
+    return claims.get("type") == "refresh" or get_revocation_list().is_revoked(claims)
+
+def get_user_from_access_token_claims(claims: Dict) -> UserOut | None:
+    """
+    Rebuilds the user from access token claims that embed the email.
+
+        Parameters:
+            claims (Dict): The decoded access token claims.
+
+        Returns:
+            UserOut | None: The user if the claims embed the email, otherwise None.
+    """
+    email = claims.get("email")
+    if email is None:
+        access_token_claims_stats.record_miss()
+        return None
+
+    access_token_claims_stats.record_hit()
+    return UserOut.model_construct(id=int(claims["sub"]), email=email)
+
+@lru_cache
+def get_key_ring() -> KeyRing:
+    """
+    Returns the signing and verification keys, loaded once from the settings.
+
+        Returns:
+            KeyRing: The key ring.
+    """
+    return KeyRing.from_settings(get_settings())
+
+@lru_cache
+def get_jwt_backend() -> JWTBackend:
+    """
+    Returns the JWT backend selected by the settings, with its keys prepared once.
+
+        Returns:
+            JWTBackend: The JWT backend.
+    """
+    return JWT_BACKENDS[get_settings().jwt_backend](get_key_ring())
 
+@traced
+@timed
 def create_token(data: Dict, expires_delta: timedelta) -> str:
     """
-    Creates a token (JWT) using JWT encoding.
+    Creates a token (JWT) using JWT encoding. Every token gets its own unique identifier (jti) and issue time (iat).
 
         Parameters:
             data (Dict): A dictionary containing user-specific data to be included in the token payload.
@@ -57,10 +292,12 @@ def create_token(data: Dict, expires_delta: timedelta) -> str:
             str: The created token (JWT).
     """
     to_encode = data.copy()
-    expires = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expires})
-    return jwt.encode(to_encode, getenv("SECRET_KEY"), algorithm=getenv("ALGORITHM"))
+    now = datetime.now(timezone.utc)
+    to_encode.update({"iat": now, "exp": now + expires_delta, "jti": uuid4().hex})
+    return get_jwt_backend().encode(to_encode)
 
+@traced
+@timed
 def decode_token(token: str) -> Dict:
     """
     Decodes a token (JWT) using JWT decoding.
@@ -74,7 +311,46 @@ def decode_token(token: str) -> Dict:
         Returns:
             Dict: A dictionary that contains information from token (JWT).
     """
-    try:
-        return jwt.decode(token, getenv("SECRET_KEY"), algorithms=[getenv("ALGORITHM")])
-    except JWTError:
-        raise InvalidCredentials()
+    return get_jwt_backend().decode(token)
+
+@lru_cache
+def get_token_cache() -> Cache:
+    """
+    Returns the cache of decoded access tokens, configured by the settings.
+    An entry takes roughly 1 KB, so TOKEN_CACHE_MAX_SIZE=10000 caps the cache at about 10 MB per worker.
+
+        Returns:
+            Cache: The decoded token cache.
+    """
+    settings = get_settings()
+    return build_cache(
+        "memory",
+        max_size=settings.token_cache_max_size,
+        ttl=settings.token_cache_ttl_seconds
+    )
+
+def decode_token_cached(token: str) -> Dict:
+    """
+    Decodes a token (JWT), verifying its signature only the first time the token is seen.
+    The claims stay cached until the token expires or the cache TTL elapses, whichever comes first.
+    The returned dictionary is shared between requests and must not be modified.
+
+        Parameters:
+            token (str): A token (JWT) to decode.
+
+        Raises:
+            InvalidCredentials: If the token (JWT) is incorrect.
+
+        Returns:
+            Dict: A dictionary that contains information from token (JWT).
+    """
+    token_cache = get_token_cache()
+    key = hashlib.sha256(token.encode()).digest()
+
+    claims = token_cache.get(key)
+    if claims is None:
+        claims = decode_token(token)
+        expires = claims.get("exp")
+        token_cache.set(key, claims, None if expires is None else expires - time())
+
+    return claims
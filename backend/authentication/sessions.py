@@ -0,0 +1,136 @@
+from datetime import datetime, timezone
+from typing import List
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..metrics.instruments import timed
+from ..tracing.tracer import traced
+
+
+@traced
+@timed
+async def create_session(
+    db: AsyncSession, session_id: str, user_id: int, refresh_token_digest: str, expires_at: datetime
+) -> None:
+    """
+    Stores a new session (one device, one refresh-token family).
+
+        Parameters:
+            db (AsyncSession): A database session.
+            session_id (str): The identifier of the session, carried by its tokens as "sid".
+            user_id (int): An identifier of the user owning the session.
+            refresh_token_digest (str): A keyed digest of the current refresh token.
+            expires_at (datetime): When the current refresh token expires.
+    """
+    await db.execute(insert(models.UserSession).values(
+        id=session_id,
+        user_id=user_id,
+        refresh_token_digest=refresh_token_digest,
+        created_at=datetime.now(timezone.utc),
+        expires_at=expires_at
+    ))
+    await db.commit()
+
+@traced
+@timed
+async def rotate_session(
+    db: AsyncSession,
+    session_id: str,
+    user_id: int,
+    refresh_token_digest: str,
+    new_refresh_token_digest: str,
+    expires_at: datetime
+) -> bool:
+    """
+    Replaces the refresh token of a session with a single compare-and-set UPDATE by primary key,
+    which succeeds only if the presented refresh token is still the current one.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            session_id (str): The identifier of the session.
+            user_id (int): An identifier of the user owning the session.
+            refresh_token_digest (str): A keyed digest of the presented refresh token.
+            new_refresh_token_digest (str): A keyed digest of the new refresh token.
+            expires_at (datetime): When the new refresh token expires.
+
+        Returns:
+            bool: True if the refresh token was replaced, False if the session does not exist or the token is stale.
+    """
+    result = await db.execute(
+        update(models.UserSession)
+        .where(
+            models.UserSession.id == session_id,
+            models.UserSession.user_id == user_id,
+            models.UserSession.refresh_token_digest == refresh_token_digest
+        )
+        .values(refresh_token_digest=new_refresh_token_digest, expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+@traced
+@timed
+async def delete_session(db: AsyncSession, session_id: str, user_id: int) -> bool:
+    """
+    Deletes a session.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            session_id (str): The identifier of the session.
+            user_id (int): An identifier of the user owning the session.
+
+        Returns:
+            bool: True if the session existed, False otherwise.
+    """
+    result = await db.execute(
+        delete(models.UserSession)
+        .where(models.UserSession.id == session_id, models.UserSession.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+@traced
+@timed
+async def delete_user_sessions(db: AsyncSession, user_id: int) -> List[str]:
+    """
+    Deletes all sessions of a user, using the index on the user identifier.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            user_id (int): An identifier of the user.
+
+        Returns:
+            List[str]: The identifiers of the deleted sessions.
+    """
+    result = await db.execute(
+        delete(models.UserSession)
+        .where(models.UserSession.user_id == user_id)
+        .returning(models.UserSession.id)
+        .execution_options(synchronize_session=False)
+    )
+    session_ids = list(result.scalars())
+    await db.commit()
+    return session_ids
+
+@timed
+async def purge_expired_sessions(db: AsyncSession) -> int:
+    """
+    Deletes the sessions whose refresh token expired, using the index on the expiry.
+
+        Parameters:
+            db (AsyncSession): A database session.
+
+        Returns:
+            int: The number of deleted sessions.
+    """
+    result = await db.execute(
+        delete(models.UserSession)
+        .where(models.UserSession.expires_at < datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
@@ -1 +1,315 @@
-API_ENDPOINT = "/api/v1"
\ No newline at end of file
+from datetime import timedelta
+from functools import lru_cache
+from os import cpu_count, getenv
+from typing import Literal, Tuple
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, ConfigDict, Field, PositiveInt, field_validator, model_validator
+
+
+API_ENDPOINT = "/api/v1"
+
+
+class Settings(BaseModel):
+    """
+    Validated application settings, loaded once from the environment (and the ".env" file).
+
+        Parameters:
+            database_url (str): The database URL (DATABASE_URL).
+            database_read_url (str | None): The database URL of a separate engine for lookups, opened read-only
+                for SQLite (DATABASE_READ_URL). It is used like a replica.
+            database_replica_urls (Tuple[str, ...]): The database URLs of read replicas, comma-separated
+                (DATABASE_REPLICA_URLS).
+            database_read_your_writes_seconds (float): How long lookups of rows just written, or of a user whose
+                token was just issued, go to the primary database instead of a replica
+                (DATABASE_READ_YOUR_WRITES_SECONDS).
+            database_pool_size (int): Connections kept open by the pool (DATABASE_POOL_SIZE).
+            database_max_overflow (int): Connections opened above the pool size under load (DATABASE_MAX_OVERFLOW).
+            database_pool_recycle (int): Seconds after which a connection is replaced (DATABASE_POOL_RECYCLE).
+            database_pool_pre_ping (bool): Whether connections are tested on checkout (DATABASE_POOL_PRE_PING).
+            database_pool_timeout (float): Seconds to wait for a free connection (DATABASE_POOL_TIMEOUT).
+            sqlite_journal_mode (str): SQLite journal mode (SQLITE_JOURNAL_MODE).
+            sqlite_synchronous (str): SQLite synchronous mode (SQLITE_SYNCHRONOUS).
+            sqlite_mmap_size (int): Bytes of the SQLite file mapped into memory (SQLITE_MMAP_SIZE).
+            sqlite_cache_size (int): SQLite page cache size, negative values are in KiB (SQLITE_CACHE_SIZE).
+            sqlite_busy_timeout (int): Milliseconds to wait for a lock (SQLITE_BUSY_TIMEOUT).
+            secret_key (str): The key signing tokens and refresh-token digests (SECRET_KEY).
+            algorithm (str): The token signing algorithm, e.g. HS256, RS256 or EdDSA (ALGORITHM).
+            jwt_private_key_file (str | None): PEM private key signing tokens with an asymmetric algorithm
+                (JWT_PRIVATE_KEY_FILE).
+            jwt_public_keys_dir (str | None): Directory of PEM public keys of previous or upcoming signing keys
+                that are still accepted (JWT_PUBLIC_KEYS_DIR).
+            access_token_expires (timedelta): Lifetime of access tokens (ACCESS_TOKEN_EXPIRE_MINUTES).
+            refresh_token_expires (timedelta): Lifetime of refresh tokens (REFRESH_TOKEN_EXPIRE_MINUTES).
+            access_token_embed_email (bool): Whether access tokens embed the email (ACCESS_TOKEN_EMBED_EMAIL).
+            jwt_backend (str): The library encoding and decoding tokens, "jose" or "pyjwt" (JWT_BACKEND).
+            json_backend (str): The library encoding the responses the API builds itself, "pydantic" or "orjson"
+                (JSON_BACKEND).
+            password_hashing_executor (str): "thread" or "process" pool for bcrypt (PASSWORD_HASHING_EXECUTOR).
+            password_hashing_workers (int): Size of the hashing pool (PASSWORD_HASHING_WORKERS).
+            password_hashing_max_queue (int): Hashing jobs allowed to wait for a worker (PASSWORD_HASHING_MAX_QUEUE).
+            password_hash_schemes (Tuple[str, ...]): Accepted password hash schemes, comma-separated, the first one
+                hashes new passwords and the others are rehashed on login (PASSWORD_HASH_SCHEMES).
+            bcrypt_rounds (int | None): The bcrypt cost of new hashes, hashes with another cost are rehashed on login,
+                defaults to the passlib default (BCRYPT_ROUNDS).
+            argon2_time_cost (int | None): The argon2 time cost of new hashes (ARGON2_TIME_COST).
+            argon2_memory_cost (int | None): The argon2 memory cost of new hashes in KiB (ARGON2_MEMORY_COST).
+            user_cache_backend (str): "memory" or "none" (USER_CACHE_BACKEND).
+            user_cache_max_size (int): The maximum number of cached users (USER_CACHE_MAX_SIZE).
+            user_cache_ttl_seconds (float): How long a user stays cached (USER_CACHE_TTL_SECONDS).
+            token_cache_max_size (int): The maximum number of cached decoded access tokens, 0 disables the cache
+                (TOKEN_CACHE_MAX_SIZE).
+            token_cache_ttl_seconds (float): How long decoded access tokens stay cached at most
+                (TOKEN_CACHE_TTL_SECONDS).
+            email_filter_capacity (int): Registered email addresses the Bloom filter of each worker is sized for,
+                0 disables the filter (EMAIL_FILTER_CAPACITY).
+            email_filter_error_rate (float): The false positive rate of the email filter at full capacity
+                (EMAIL_FILTER_ERROR_RATE).
+            admin_api_key (str | None): The key expected in the X-Admin-Key header of admin endpoints,
+                admin endpoints are disabled if it is not set (ADMIN_API_KEY).
+            bulk_register_chunk_size (int): Records checked, hashed and inserted together during a bulk
+                registration (BULK_REGISTER_CHUNK_SIZE).
+            bulk_register_max_records (int): The maximum number of records of a bulk registration
+                (BULK_REGISTER_MAX_RECORDS).
+            rate_limit_backend (str): "memory" or "none" (RATE_LIMIT_BACKEND).
+            rate_limit_max_keys (int): The maximum number of rate limit buckets kept in memory (RATE_LIMIT_MAX_KEYS).
+            login_attempts_per_ip (int): Login attempts allowed per IP address and period (LOGIN_ATTEMPTS_PER_IP).
+            login_attempts_per_email (int): Login attempts allowed per email address and period
+                (LOGIN_ATTEMPTS_PER_EMAIL).
+            login_attempts_period_seconds (float): The period of the login limits (LOGIN_ATTEMPTS_PERIOD_SECONDS).
+            job_queue_backend (str): The transport of background jobs, "memory" or "sqlite" to keep queued jobs
+                across restarts (JOB_QUEUE_BACKEND).
+            job_queue_sqlite_path (str): The SQLite file of the "sqlite" job transport (JOB_QUEUE_SQLITE_PATH).
+            job_queue_concurrency (int): Background jobs of a transport running at once per worker
+                (JOB_QUEUE_CONCURRENCY).
+            job_queue_max_pending (int): Pending background jobs before new ones are dropped (JOB_QUEUE_MAX_PENDING).
+            job_max_attempts (int): Attempts of a background job before it is failed (JOB_MAX_ATTEMPTS).
+            job_retry_delay_seconds (float): The delay before the first retry of a background job, doubled after
+                every attempt (JOB_RETRY_DELAY_SECONDS).
+            tracing_enabled (bool): Whether sampled requests are traced (TRACING_ENABLED).
+            tracing_sample_rate (float): The share of requests traced, from 0 to 1 (TRACING_SAMPLE_RATE).
+            tracing_exporter (str): The destination of the traces, "file" or "memory" (TRACING_EXPORTER).
+            tracing_file (str): The file the "file" exporter appends the spans to (TRACING_FILE).
+            metrics_enabled (bool): Whether request, function and SQL timings are recorded and exposed
+                on /metrics (METRICS_ENABLED).
+    """
+    model_config = ConfigDict(frozen=True)
+
+    database_url: str = Field(..., min_length=1)
+    database_read_url: str | None = None
+    database_replica_urls: Tuple[str, ...] = ()
+    database_read_your_writes_seconds: float = Field(5, ge=0)
+    database_pool_size: PositiveInt = 10
+    database_max_overflow: int = Field(20, ge=0)
+    database_pool_recycle: int = 1800
+    database_pool_pre_ping: bool = True
+    database_pool_timeout: float = Field(30, gt=0)
+    sqlite_journal_mode: Literal["WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"] = "WAL"
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    sqlite_mmap_size: int = Field(268435456, ge=0)
+    sqlite_cache_size: int = -65536
+    sqlite_busy_timeout: int = Field(5000, ge=0)
+    secret_key: str = Field(..., min_length=1)
+    algorithm: Literal["HS256", "HS384", "HS512", "RS256", "RS384", "RS512", "ES256", "ES384", "EdDSA"] = "HS256"
+    jwt_private_key_file: str | None = None
+    jwt_public_keys_dir: str | None = None
+    access_token_expires: timedelta
+    refresh_token_expires: timedelta
+    access_token_embed_email: bool = False
+    jwt_backend: Literal["jose", "pyjwt"] = "jose"
+    json_backend: Literal["pydantic", "orjson"] = "pydantic"
+    password_hashing_executor: Literal["thread", "process"] = "thread"
+    password_hashing_workers: PositiveInt = Field(default_factory=lambda: cpu_count() or 1)
+    password_hashing_max_queue: int | None = Field(None, ge=0)
+    password_hash_schemes: Tuple[Literal["bcrypt", "argon2"], ...] = Field(("bcrypt",), min_length=1)
+    bcrypt_rounds: int | None = Field(None, ge=4, le=31)
+    argon2_time_cost: int | None = Field(None, ge=1)
+    argon2_memory_cost: int | None = Field(None, ge=8)
+    user_cache_backend: Literal["memory", "none"] = "memory"
+    user_cache_max_size: int = Field(10000, ge=0)
+    user_cache_ttl_seconds: float = Field(60, ge=0)
+    token_cache_max_size: int = Field(0, ge=0)
+    token_cache_ttl_seconds: float = Field(60, ge=0)
+    email_filter_capacity: int = Field(1000000, ge=0)
+    email_filter_error_rate: float = Field(0.01, gt=0, lt=1)
+    admin_api_key: str | None = None
+    bulk_register_chunk_size: PositiveInt = 500
+    bulk_register_max_records: PositiveInt = 100000
+    rate_limit_backend: Literal["memory", "none"] = "memory"
+    rate_limit_max_keys: PositiveInt = 500000
+    login_attempts_per_ip: PositiveInt = 30
+    login_attempts_per_email: PositiveInt = 10
+    login_attempts_period_seconds: float = Field(300, gt=0)
+    job_queue_backend: Literal["memory", "sqlite"] = "memory"
+    job_queue_sqlite_path: str = Field("./database/jobs.db", min_length=1)
+    job_queue_concurrency: PositiveInt = 4
+    job_queue_max_pending: PositiveInt = 10000
+    job_max_attempts: PositiveInt = 5
+    job_retry_delay_seconds: float = Field(1, gt=0)
+    tracing_enabled: bool = False
+    tracing_sample_rate: float = Field(0.01, ge=0, le=1)
+    tracing_exporter: Literal["file", "memory"] = "file"
+    tracing_file: str = Field("./traces.jsonl", min_length=1)
+    metrics_enabled: bool = True
+
+    @field_validator("access_token_expires", "refresh_token_expires", mode="before")
+    def minutes_validator(cls, value: str | float | timedelta) -> timedelta:
+        """
+        Converts a number of minutes into a timedelta.
+
+            Parameters:
+                value (str | float | timedelta): The number of minutes or a timedelta.
+
+            Raises:
+                ValueError: If the lifetime is not positive.
+
+            Returns:
+                timedelta: The lifetime.
+        """
+        if not isinstance(value, timedelta):
+            value = timedelta(minutes=float(value))
+        if value <= timedelta(0):
+            raise ValueError("The token lifetime must be positive")
+        return value
+
+    @field_validator("database_replica_urls", mode="before")
+    def urls_validator(cls, value: str | Tuple[str, ...]) -> Tuple[str, ...]:
+        """
+        Splits a comma-separated list of database URLs.
+
+            Parameters:
+                value (str | Tuple[str, ...]): The comma-separated URLs or a tuple of URLs.
+
+            Returns:
+                Tuple[str, ...]: The URLs.
+        """
+        if isinstance(value, str):
+            return tuple(url.strip() for url in value.split(",") if url.strip())
+        return value
+
+    @field_validator("password_hash_schemes", mode="before")
+    def schemes_validator(cls, value: str | Tuple[str, ...]) -> Tuple[str, ...]:
+        """
+        Splits a comma-separated list of password hash schemes.
+
+            Parameters:
+                value (str | Tuple[str, ...]): The comma-separated schemes or a tuple of schemes.
+
+            Returns:
+                Tuple[str, ...]: The schemes, in order of preference.
+        """
+        if isinstance(value, str):
+            return tuple(scheme.strip() for scheme in value.split(",") if scheme.strip())
+        return value
+
+    @model_validator(mode="after")
+    def signing_key_validator(self) -> "Settings":
+        """
+        Checks that asymmetric algorithms have a private key and are supported by the JWT backend.
+
+            Raises:
+                ValueError: If the signing configuration is incomplete.
+
+            Returns:
+                Settings: The validated settings.
+        """
+        if not self.algorithm.startswith("HS") and not self.jwt_private_key_file:
+            raise ValueError(f"The {self.algorithm} algorithm requires JWT_PRIVATE_KEY_FILE")
+        if self.algorithm == "EdDSA" and self.jwt_backend != "pyjwt":
+            raise ValueError("The EdDSA algorithm requires JWT_BACKEND=pyjwt")
+        return self
+
+    @property
+    def database_read_urls(self) -> Tuple[str, ...]:
+        """
+        The database URLs lookups are balanced between, DATABASE_READ_URL first.
+        """
+        if self.database_read_url:
+            return (self.database_read_url, *self.database_replica_urls)
+        return self.database_replica_urls
+
+    @property
+    def password_hashing_max_pending(self) -> int:
+        """
+        The maximum number of running and waiting hashing jobs, defaults to 4 waiting jobs per worker.
+        """
+        max_queue = self.password_hashing_max_queue
+        if max_queue is None:
+            max_queue = self.password_hashing_workers * 4
+        return self.password_hashing_workers + max_queue
+
+
+ENVIRONMENT_VARIABLES = {
+    "database_url": "DATABASE_URL",
+    "database_read_url": "DATABASE_READ_URL",
+    "database_replica_urls": "DATABASE_REPLICA_URLS",
+    "database_read_your_writes_seconds": "DATABASE_READ_YOUR_WRITES_SECONDS",
+    "database_pool_size": "DATABASE_POOL_SIZE",
+    "database_max_overflow": "DATABASE_MAX_OVERFLOW",
+    "database_pool_recycle": "DATABASE_POOL_RECYCLE",
+    "database_pool_pre_ping": "DATABASE_POOL_PRE_PING",
+    "database_pool_timeout": "DATABASE_POOL_TIMEOUT",
+    "sqlite_journal_mode": "SQLITE_JOURNAL_MODE",
+    "sqlite_synchronous": "SQLITE_SYNCHRONOUS",
+    "sqlite_mmap_size": "SQLITE_MMAP_SIZE",
+    "sqlite_cache_size": "SQLITE_CACHE_SIZE",
+    "sqlite_busy_timeout": "SQLITE_BUSY_TIMEOUT",
+    "secret_key": "SECRET_KEY",
+    "algorithm": "ALGORITHM",
+    "jwt_private_key_file": "JWT_PRIVATE_KEY_FILE",
+    "jwt_public_keys_dir": "JWT_PUBLIC_KEYS_DIR",
+    "access_token_expires": "ACCESS_TOKEN_EXPIRE_MINUTES",
+    "refresh_token_expires": "REFRESH_TOKEN_EXPIRE_MINUTES",
+    "access_token_embed_email": "ACCESS_TOKEN_EMBED_EMAIL",
+    "jwt_backend": "JWT_BACKEND",
+    "json_backend": "JSON_BACKEND",
+    "password_hashing_executor": "PASSWORD_HASHING_EXECUTOR",
+    "password_hashing_workers": "PASSWORD_HASHING_WORKERS",
+    "password_hashing_max_queue": "PASSWORD_HASHING_MAX_QUEUE",
+    "password_hash_schemes": "PASSWORD_HASH_SCHEMES",
+    "bcrypt_rounds": "BCRYPT_ROUNDS",
+    "argon2_time_cost": "ARGON2_TIME_COST",
+    "argon2_memory_cost": "ARGON2_MEMORY_COST",
+    "user_cache_backend": "USER_CACHE_BACKEND",
+    "user_cache_max_size": "USER_CACHE_MAX_SIZE",
+    "user_cache_ttl_seconds": "USER_CACHE_TTL_SECONDS",
+    "token_cache_max_size": "TOKEN_CACHE_MAX_SIZE",
+    "token_cache_ttl_seconds": "TOKEN_CACHE_TTL_SECONDS",
+    "email_filter_capacity": "EMAIL_FILTER_CAPACITY",
+    "email_filter_error_rate": "EMAIL_FILTER_ERROR_RATE",
+    "admin_api_key": "ADMIN_API_KEY",
+    "bulk_register_chunk_size": "BULK_REGISTER_CHUNK_SIZE",
+    "bulk_register_max_records": "BULK_REGISTER_MAX_RECORDS",
+    "rate_limit_backend": "RATE_LIMIT_BACKEND",
+    "rate_limit_max_keys": "RATE_LIMIT_MAX_KEYS",
+    "login_attempts_per_ip": "LOGIN_ATTEMPTS_PER_IP",
+    "login_attempts_per_email": "LOGIN_ATTEMPTS_PER_EMAIL",
+    "login_attempts_period_seconds": "LOGIN_ATTEMPTS_PERIOD_SECONDS",
+    "job_queue_backend": "JOB_QUEUE_BACKEND",
+    "job_queue_sqlite_path": "JOB_QUEUE_SQLITE_PATH",
+    "job_queue_concurrency": "JOB_QUEUE_CONCURRENCY",
+    "job_queue_max_pending": "JOB_QUEUE_MAX_PENDING",
+    "job_max_attempts": "JOB_MAX_ATTEMPTS",
+    "job_retry_delay_seconds": "JOB_RETRY_DELAY_SECONDS",
+    "tracing_enabled": "TRACING_ENABLED",
+    "tracing_sample_rate": "TRACING_SAMPLE_RATE",
+    "tracing_exporter": "TRACING_EXPORTER",
+    "tracing_file": "TRACING_FILE",
+    "metrics_enabled": "METRICS_ENABLED",
+}
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Loads the settings from the environment. They are parsed and validated only on the first call.
+
+        Raises:
+            ValidationError: If a setting is missing or invalid.
+
+        Returns:
+            Settings: The application settings.
+    """
+    load_dotenv()
+    return Settings(**{
+        field: getenv(variable) for field, variable in ENVIRONMENT_VARIABLES.items() if getenv(variable)
+    })
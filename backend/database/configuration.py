@@ -1,16 +1,227 @@
-from sqlalchemy import create_engine
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
-from os import getenv
 
+from backend.config import Settings, get_settings
+from backend.metrics.instruments import instrument_engine
+from backend.tracing.instruments import instrument_engine_tracing
+from .routing import RoutingSession
 
-load_dotenv()
-SQLALCHEMY_DATABASE_URL = getenv("DATABASE_URL")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+SYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql",
+    "mysql+aiomysql": "mysql+pymysql",
+}
+
+def get_async_url(url: URL) -> URL:
+    """
+    Returns the database URL with an asyncio driver (e.g. aiosqlite or asyncpg).
+
+        Parameters:
+            url (URL): A database URL with a sync or an async driver.
+
+        Returns:
+            URL: The database URL with an async driver.
+    """
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+def get_sync_url(url: URL) -> URL:
+    """
+    Returns the database URL with a blocking driver, used for schema management and scripts.
+
+        Parameters:
+            url (URL): A database URL with a sync or an async driver.
+
+        Returns:
+            URL: The database URL with a sync driver.
+    """
+    return url.set(drivername=SYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def get_read_only_url(url: URL) -> URL:
+    """
+    Returns a database URL that opens SQLite files in read-only mode. Other URLs are returned unchanged.
+
+        Parameters:
+            url (URL): A database URL.
+
+        Returns:
+            URL: The read-only database URL.
+    """
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return url
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+
+def get_engine_options(url: URL, settings: Settings) -> Dict[str, Any]:
+    """
+    Builds the engine keyword arguments: thread checks are disabled for SQLite and the pool is sized
+    for server databases (e.g. PostgreSQL or MySQL).
+
+        Parameters:
+            url (URL): A database URL.
+            settings (Settings): The application settings.
+
+        Returns:
+            Dict[str, Any]: Keyword arguments for create_engine or create_async_engine.
+    """
+    if url.get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+
+    return {
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_recycle": settings.database_pool_recycle,
+        "pool_pre_ping": settings.database_pool_pre_ping,
+        "pool_timeout": settings.database_pool_timeout,
+    }
+
+def apply_sqlite_pragmas(engine: Engine, settings: Settings, read_only: bool = False) -> None:
+    """
+    Applies the configured pragmas to every new SQLite connection of the engine.
+    WAL lets readers work while a write is in progress and synchronous=NORMAL is durable enough with WAL.
+
+        Parameters:
+            engine (Engine): A (sync) engine.
+            settings (Settings): The application settings.
+            read_only (bool): Whether the connections are read-only, in which case the journal mode is kept.
+    """
+    if engine.url.get_backend_name() != "sqlite":
+        return
+
+    pragmas = [
+        f"PRAGMA busy_timeout = {settings.sqlite_busy_timeout}",
+        f"PRAGMA synchronous = {settings.sqlite_synchronous}",
+        f"PRAGMA mmap_size = {settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size = {settings.sqlite_cache_size}",
+    ]
+    if not read_only:
+        pragmas.insert(0, f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def create_database_engine(
+    url: URL, settings: Settings, read_only: bool = False, name: str = "primary"
+) -> AsyncEngine:
+    """
+    Creates a configured async engine.
+
+        Parameters:
+            url (URL): A database URL with a sync or an async driver.
+            settings (Settings): The application settings.
+            read_only (bool): Whether the engine only serves lookups.
+            name (str): The engine label of metrics and traces. Defaults to "primary".
+
+        Returns:
+            AsyncEngine: The async engine.
+    """
+    if read_only:
+        url = get_read_only_url(url)
+
+    database_engine = create_async_engine(get_async_url(url), **get_engine_options(url, settings))
+    apply_sqlite_pragmas(database_engine.sync_engine, settings, read_only)
+    if settings.metrics_enabled:
+        instrument_engine(database_engine.sync_engine, name)
+    if settings.tracing_enabled:
+        instrument_engine_tracing(database_engine.sync_engine, name)
+    return database_engine
+
 
 Base = declarative_base()
+
+@lru_cache
+def get_engine() -> Engine:
+    """
+    Returns the blocking engine of the primary database, used for migrations and scripts.
+    It is created on the first call, so importing the application does not touch the database.
+
+        Returns:
+            Engine: The sync engine.
+    """
+    settings = get_settings()
+    url = make_url(settings.database_url)
+    database_engine = create_engine(get_sync_url(url), **get_engine_options(url, settings))
+    apply_sqlite_pragmas(database_engine, settings)
+    return database_engine
+
+@lru_cache
+def get_async_engine() -> AsyncEngine:
+    """
+    Returns the async engine of the primary database, created on the first call.
+
+        Returns:
+            AsyncEngine: The async engine.
+    """
+    return create_database_engine(make_url(get_settings().database_url), get_settings())
+
+@lru_cache
+def get_replica_async_engines() -> Tuple[AsyncEngine, ...]:
+    """
+    Returns the read-only async engines of the replicas (DATABASE_READ_URL and DATABASE_REPLICA_URLS),
+    created on the first call.
+
+        Returns:
+            Tuple[AsyncEngine, ...]: The replica engines, empty if no replica is configured.
+    """
+    settings = get_settings()
+    return tuple(
+        create_database_engine(make_url(url), settings, read_only=True, name=f"replica-{number}")
+        for number, url in enumerate(settings.database_read_urls, start=1)
+    )
+
+@lru_cache
+def get_sessionmaker() -> sessionmaker:
+    """
+    Returns the factory of blocking database sessions, used by scripts.
+
+        Returns:
+            sessionmaker: The session factory.
+    """
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+@lru_cache
+def get_async_sessionmaker() -> async_sessionmaker:
+    """
+    Returns the factory of async database sessions. Their statements are routed between the primary database
+    and the replicas (see backend/database/routing.py).
+
+        Returns:
+            async_sessionmaker: The session factory.
+    """
+    return async_sessionmaker(
+        bind=get_async_engine(), sync_session_class=RoutingSession, replicas=get_replica_async_engines(),
+        autoflush=False, expire_on_commit=False
+    )
+
+async def dispose_engines() -> None:
+    """
+    Closes the pooled connections of the engines created so far, e.g. on shutdown.
+    """
+    if get_replica_async_engines.cache_info().currsize:
+        for replica_engine in get_replica_async_engines():
+            await replica_engine.dispose()
+        get_replica_async_engines.cache_clear()
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
+        get_async_engine.cache_clear()
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+        get_engine.cache_clear()
+    get_sessionmaker.cache_clear()
+    get_async_sessionmaker.cache_clear()
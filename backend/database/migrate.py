@@ -0,0 +1,148 @@
+"""
+Applies the schema migrations of the "backend.database.migrations" package to the database.
+Run it once per deployment, before the workers start: the workers only check that the schema is up to date.
+
+Every migration is a "vNNNN_description.py" module with an upgrade(connection) function. Migrations are applied
+in the order of their version, each in its own transaction, and recorded in the schema_version table.
+A migration must never change once released, a new one is added instead.
+
+Usage:
+    python -m backend.database.migrate [upgrade]
+    python -m backend.database.migrate status
+"""
+import argparse
+import importlib
+import pkgutil
+from datetime import datetime, timezone
+from typing import Callable, List, NamedTuple, Set
+
+from sqlalchemy import Column, Connection, DateTime, Engine, Integer, MetaData, String, Table, inspect, insert, select
+
+from backend.database import migrations
+from backend.database.configuration import get_engine
+
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False)
+)
+
+
+class Migration(NamedTuple):
+    """
+    A schema migration.
+
+        Attributes:
+            version (int): The version the migration brings the schema to.
+            description (str): What the migration changes.
+            upgrade (Callable[[Connection], None]): Applies the migration.
+    """
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def load_migrations() -> List[Migration]:
+    """
+    Loads the migrations of the migrations package.
+
+        Raises:
+            ValueError: If two migrations have the same version.
+
+        Returns:
+            List[Migration]: The migrations ordered by version.
+    """
+    loaded = {}
+    for module_info in pkgutil.iter_modules(migrations.__path__):
+        if not module_info.name.startswith("v"):
+            continue
+        version = int(module_info.name[1:].split("_", 1)[0])
+        if version in loaded:
+            raise ValueError(f"Duplicate migration version: {version}")
+        module = importlib.import_module(f"{migrations.__name__}.{module_info.name}")
+        loaded[version] = Migration(version, (module.__doc__ or module_info.name).strip(), module.upgrade)
+    return [loaded[version] for version in sorted(loaded)]
+
+def get_applied_versions(connection: Connection) -> Set[int]:
+    """
+    Reads the versions already applied, without creating anything.
+
+        Parameters:
+            connection (Connection): A database connection.
+
+        Returns:
+            Set[int]: The applied versions, empty for a new database.
+    """
+    if not inspect(connection).has_table(schema_version.name):
+        return set()
+    return set(connection.scalars(select(schema_version.c.version)))
+
+def get_pending_migrations(connection: Connection) -> List[Migration]:
+    """
+    Lists the migrations not applied to the database yet.
+
+        Parameters:
+            connection (Connection): A database connection.
+
+        Returns:
+            List[Migration]: The pending migrations ordered by version.
+    """
+    applied_versions = get_applied_versions(connection)
+    return [migration for migration in load_migrations() if migration.version not in applied_versions]
+
+def upgrade(engine: Engine) -> List[Migration]:
+    """
+    Applies the pending migrations, each in its own transaction together with its schema_version row.
+
+        Parameters:
+            engine (Engine): A (sync) engine of the primary database.
+
+        Returns:
+            List[Migration]: The applied migrations.
+    """
+    with engine.begin() as connection:
+        schema_version.create(connection, checkfirst=True)
+        pending_migrations = get_pending_migrations(connection)
+
+    for migration in pending_migrations:
+        with engine.begin() as connection:
+            migration.upgrade(connection)
+            connection.execute(insert(schema_version).values(
+                version=migration.version,
+                description=migration.description,
+                applied_at=datetime.now(timezone.utc)
+            ))
+    return pending_migrations
+
+def parse_arguments(argv: List[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+        Parameters:
+            argv (List[str] | None): The arguments, defaults to sys.argv.
+
+        Returns:
+            argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.database.migrate", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("command", nargs="?", choices=("upgrade", "status"), default="upgrade")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    command_arguments = parse_arguments()
+    if command_arguments.command == "status":
+        with get_engine().connect() as status_connection:
+            pending = get_pending_migrations(status_connection)
+        for pending_migration in pending:
+            print(f"pending {pending_migration.version:04d}: {pending_migration.description}")
+        print("The schema is up to date" if not pending else f"{len(pending)} pending migrations")
+    else:
+        for applied_migration in upgrade(get_engine()):
+            print(f"applied {applied_migration.version:04d}: {applied_migration.description}")
+        print("The schema is up to date")
@@ -0,0 +1,16 @@
+"""
+Creates the users table. Databases created before migrations existed already have it and are left as they are.
+"""
+from sqlalchemy import Column, Connection, Integer, MetaData, String, Table
+
+
+def upgrade(connection: Connection) -> None:
+    metadata = MetaData()
+    Table(
+        "users", metadata,
+        Column("id", Integer, primary_key=True, index=True),
+        Column("email", String, unique=True, index=True),
+        Column("hashed_password", String),
+        Column("hashed_refresh_token", String, default=None)
+    )
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,18 @@
+"""
+Creates the sessions table, one row per device with the digest of its current refresh token.
+"""
+from sqlalchemy import Column, Connection, DateTime, ForeignKey, Integer, MetaData, String, Table
+
+
+def upgrade(connection: Connection) -> None:
+    metadata = MetaData()
+    Table("users", metadata, Column("id", Integer, primary_key=True))
+    Table(
+        "sessions", metadata,
+        Column("id", String(32), primary_key=True),
+        Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+        Column("refresh_token_digest", String, nullable=False),
+        Column("created_at", DateTime(timezone=True), nullable=False),
+        Column("expires_at", DateTime(timezone=True), nullable=False, index=True)
+    )
+    metadata.tables["sessions"].create(connection, checkfirst=True)
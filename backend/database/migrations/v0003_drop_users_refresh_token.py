@@ -0,0 +1,13 @@
+"""
+Drops the refresh token digest of the users table, replaced by the sessions table.
+"""
+from sqlalchemy import Connection, inspect, text
+
+
+def upgrade(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("users")}
+    if "hashed_refresh_token" in columns:
+        # Databases created while the digest was looked up have an index on it, which SQLite refuses to keep
+        # once its column is gone.
+        connection.execute(text("DROP INDEX IF EXISTS ix_users_hashed_refresh_token"))
+        connection.execute(text("ALTER TABLE users DROP COLUMN hashed_refresh_token"))
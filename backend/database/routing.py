@@ -0,0 +1,136 @@
+from functools import lru_cache
+from itertools import count
+from time import time
+from typing import Any, Hashable, Tuple
+
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from ..config import get_settings
+from ..utils.cache import Cache, build_cache
+
+
+RECENT_WRITES_MAX_SIZE = 100000
+
+_replica_counter = count()
+
+
+class RoutingSession(Session):
+    """
+    Session sending writes to the primary database and lookups to a replica. Every session sticks to one replica,
+    chosen among the replicas with the fewest connections in use, and switches to the primary for good once it
+    writes, so it reads its own writes. Statements that are neither an ORM flush nor an INSERT, UPDATE or DELETE
+    construct (e.g. raw text) are treated as lookups. Without replicas everything goes to the primary.
+    """
+    def __init__(self, replicas: Tuple[AsyncEngine, ...] = (), **kwargs: Any) -> None:
+        """
+        Initialize the RoutingSession.
+
+            Parameters:
+                replicas (Tuple[AsyncEngine, ...]): The replica engines, the bind of the session is the primary.
+                **kwargs (Any): The arguments of Session.
+        """
+        super().__init__(**kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Engine:
+        if not self.replicas or self.info.get("use_primary"):
+            return self.bind
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["use_primary"] = True
+            return self.bind
+
+        replica = self.info.get("replica")
+        if replica is None:
+            replica = self.info["replica"] = select_replica(self.replicas).sync_engine
+        return replica
+
+
+def select_replica(replicas: Tuple[AsyncEngine, ...]) -> AsyncEngine:
+    """
+    Picks the replica with the fewest connections in use. Ties are broken round-robin,
+    so idle replicas share the load evenly.
+
+        Parameters:
+            replicas (Tuple[AsyncEngine, ...]): The replica engines.
+
+        Returns:
+            AsyncEngine: The chosen replica.
+    """
+    if len(replicas) == 1:
+        return replicas[0]
+
+    start = next(_replica_counter) % len(replicas)
+    rotated = replicas[start:] + replicas[:start]
+    return min(rotated, key=lambda replica: getattr(replica.sync_engine.pool, "checkedout", lambda: 0)())
+
+@lru_cache
+def get_recent_writes() -> Cache:
+    """
+    Returns the keys (e.g. ("email", address) or ("user", identifier)) written by this worker
+    within the read-your-writes window.
+
+        Returns:
+            Cache: The recent writes.
+    """
+    return build_cache("memory", RECENT_WRITES_MAX_SIZE, get_settings().database_read_your_writes_seconds)
+
+def mark_recent_write(*keys: Hashable) -> None:
+    """
+    Records that rows were just written, so lookups of them go to the primary during the read-your-writes window,
+    while the replicas may not have them yet.
+
+        Parameters:
+            *keys (Hashable): The keys of the written rows.
+    """
+    if not get_settings().database_read_urls:
+        return
+    recent_writes = get_recent_writes()
+    for key in keys:
+        recent_writes.set(key, True)
+
+def use_primary(db: AsyncSession) -> None:
+    """
+    Sends all further statements of a session to the primary database.
+
+        Parameters:
+            db (AsyncSession): A database session.
+    """
+    db.info["use_primary"] = True
+
+def is_reading_replica(db: AsyncSession) -> bool:
+    """
+    Checks whether the lookups of a session went to a replica, e.g. to retry a lookup that found nothing
+    on the primary, since the row may have been written by another worker and not be replicated yet.
+
+        Parameters:
+            db (AsyncSession): A database session.
+
+        Returns:
+            bool: True if the session reads from a replica, False if it uses the primary.
+    """
+    return db.info.get("replica") is not None and not db.info.get("use_primary")
+
+def use_primary_if_recent(db: AsyncSession, *keys: Hashable, issued_at: float | None = None) -> None:
+    """
+    Sends all further statements of a session to the primary database if one of the keys was written
+    or a token was issued within the read-your-writes window. The issue time of a token is known to every worker,
+    so it covers requests sent to another worker than the login.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            *keys (Hashable): The keys of the rows to look up.
+            issued_at (float | None): The UNIX time the token of the request was issued.
+    """
+    settings = get_settings()
+    if not settings.database_read_urls or db.info.get("use_primary"):
+        return
+    if issued_at is not None and time() - issued_at < settings.database_read_your_writes_seconds:
+        use_primary(db)
+        return
+
+    recent_writes = get_recent_writes()
+    if any(recent_writes.get(key) for key in keys):
+        use_primary(db)
@@ -1,50 +1,134 @@
-from typing import Generator
-from fastapi import Depends
-from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-
-from backend.users.services import get_user_by_id
-from backend.config import API_ENDPOINT
-from backend.database.configuration import SessionLocal
+import hmac
+from functools import lru_cache
+from typing import AsyncGenerator, Dict, Tuple
+from fastapi import Depends, Request
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.users.services import get_cached_user_by_id
+from backend.config import API_ENDPOINT, get_settings
+from backend.database.configuration import get_async_sessionmaker
+from backend.database.routing import use_primary_if_recent
 from backend.users.schemas import UserOut
-from backend.authentication.services import decode_token
-from authentication.exceptions import InvalidCredentials
+from backend.tracing.tracer import traced
+from backend.utils.rate_limit import RateLimiter, build_rate_limit_backend
+from backend.authentication.services import decode_token_cached, get_user_from_access_token_claims, \
+    is_access_token_revoked
+from backend.authentication.exceptions import AdminAccessRequired, InvalidCredentials, TooManyLoginAttempts
 
 
-def get_db() -> Generator[SessionLocal, None, None]:
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
-    Database session to communicate with the database.
+    Database session to communicate with the database. Writes go to the primary database and lookups to a replica,
+    if replicas are configured.
 
         Returns:
-            Generator[SessionLocal, None, None]: A generator yielding a database session.
+            AsyncGenerator[AsyncSession, None]: A generator yielding a database session.
     """
-    db = SessionLocal()
-    try:
+    async with get_async_sessionmaker()() as db:
         yield db
-    finally:
-        db.close()
 
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl=f"{API_ENDPOINT}/users/login")
 
-def get_current_user(db: Session = Depends(get_db), access_token: str = Depends(oauth2_bearer)) -> UserOut:
+@traced
+async def get_current_token_claims(access_token: str = Depends(oauth2_bearer)) -> Dict:
     """
-    Retrieves the currently authenticated user based on the provided access token (JWT).
+    Decodes the provided access token (JWT) and checks that it was not revoked.
 
         Parameters:
-            db (Session): A database session.
             access_token (str): An access token (JWT) obtained from the authentication header.
 
+        Raises:
+            InvalidCredentials: If the access token is incorrect, is a refresh token or was revoked.
+
+        Returns:
+            Dict: The decoded access token claims, shared between requests and not to be modified.
+    """
+    claims = decode_token_cached(access_token)
+    if is_access_token_revoked(claims):
+        raise InvalidCredentials()
+    return claims
+
+@traced
+async def get_current_user(
+    db: AsyncSession = Depends(get_db), claims: Dict = Depends(get_current_token_claims)
+) -> UserOut:
+    """
+    Retrieves the currently authenticated user based on the provided access token (JWT).
+    The user is taken from the token claims if they embed the email, otherwise from the user cache or the database.
+
+        Parameters:
+            db (AsyncSession): A database session for lookups.
+            claims (Dict): The decoded claims of the access token obtained from the authentication header.
+
         Raises:
             InvalidCredentials: If a user with an identifier from an access token is not found in the database.
 
         Returns:
             user (UserOut): Main information about the current user.
     """
-    decoded_token = decode_token(access_token)
-    user_id = decoded_token.get("sub")
+    try:
+        user_id = int(claims["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidCredentials()
+
+    user = get_user_from_access_token_claims(claims)
+    if user is not None:
+        return user
 
-    user = get_user_by_id(db, user_id)
+    use_primary_if_recent(db, issued_at=claims.get("iat"))
+    user = await get_cached_user_by_id(db, user_id)
     if user is None:
         raise InvalidCredentials()
 
     return user
+
+admin_key_header = APIKeyHeader(name="X-Admin-Key", auto_error=False)
+
+def get_admin(admin_key: str | None = Depends(admin_key_header)) -> None:
+    """
+    Allows access to admin endpoints only with the admin key from the settings.
+
+        Parameters:
+            admin_key (str | None): The key obtained from the X-Admin-Key header.
+
+        Raises:
+            AdminAccessRequired: If the key is missing or wrong, or if no admin key is configured.
+    """
+    expected_admin_key = get_settings().admin_api_key
+    if not expected_admin_key or not admin_key or not hmac.compare_digest(admin_key, expected_admin_key):
+        raise AdminAccessRequired()
+
+@lru_cache
+def get_login_rate_limiters() -> Tuple[RateLimiter, RateLimiter]:
+    """
+    Returns the login rate limiters per IP address and per email address, configured by the settings.
+
+        Returns:
+            Tuple[RateLimiter, RateLimiter]: The limiters per IP address and per email address.
+    """
+    settings = get_settings()
+    backend = build_rate_limit_backend(settings.rate_limit_backend, settings.rate_limit_max_keys)
+    return (
+        RateLimiter("login-ip", backend, settings.login_attempts_per_ip, settings.login_attempts_period_seconds),
+        RateLimiter("login-email", backend, settings.login_attempts_per_email, settings.login_attempts_period_seconds)
+    )
+
+@traced
+def limit_login_attempts(request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+    """
+    Rejects login attempts over the limits per IP address and per email address, before any password is verified.
+
+        Parameters:
+            request (Request): The incoming request.
+            form_data (OAuth2PasswordRequestForm): User input data containing email and password.
+
+        Raises:
+            TooManyLoginAttempts: If the IP address or the email address made too many attempts.
+    """
+    ip_limiter, email_limiter = get_login_rate_limiters()
+    client_host = request.client.host if request.client else "unknown"
+
+    retry_after = max(ip_limiter.hit(client_host), email_limiter.hit(form_data.username.lower()))
+    if retry_after:
+        raise TooManyLoginAttempts(retry_after)
@@ -0,0 +1,196 @@
+import asyncio
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Set
+
+from ..config import get_settings
+from ..metrics.instruments import job_outcomes
+from .transports import Job, JobTransport, MemoryJobTransport, SQLiteJobTransport
+
+
+JOB_HANDLERS: Dict[str, Callable[..., Awaitable[None]]] = {}
+
+def job_handler(name: str) -> Callable:
+    """
+    Decorator registering an async function as the handler of the jobs with a name.
+    The payload of a job is passed as keyword arguments, so it must be JSON-serializable for durable jobs.
+
+        Parameters:
+            name (str): The name of the jobs.
+
+        Returns:
+            Callable: The decorator, returning the function unchanged.
+    """
+    def decorator(function: Callable[..., Awaitable[None]]) -> Callable[..., Awaitable[None]]:
+        JOB_HANDLERS[name] = function
+        return function
+    return decorator
+
+
+class JobQueue:
+    """
+    In-process job queue running side work (e.g. rehashing a password after a login) once the request returned.
+    A fixed number of worker tasks per transport bounds the concurrency, jobs that raise an error are retried
+    with an exponential backoff and enqueuing fails fast when too many jobs are pending, so a slow handler can not
+    pile up work. Durable jobs go to the configured transport, the others (e.g. with a plaintext password in the
+    payload, which must never be written to disk) always stay in memory.
+    """
+    def __init__(
+        self, transport: JobTransport, volatile_transport: JobTransport, concurrency: int, max_attempts: int,
+        retry_delay: float
+    ) -> None:
+        """
+        Initialize the JobQueue.
+
+            Parameters:
+                transport (JobTransport): The transport of durable jobs.
+                volatile_transport (JobTransport): The in-memory transport of the other jobs, may be the same.
+                concurrency (int): The number of jobs of a transport running at once.
+                max_attempts (int): The number of attempts before a job is failed.
+                retry_delay (float): Seconds before the first retry, doubled after every attempt.
+        """
+        self.transport = transport
+        self.volatile_transport = volatile_transport
+        self._concurrency = concurrency
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._workers: List[asyncio.Task] = []
+        self._idle_workers: Set[asyncio.Task] = set()
+        self._stopping = False
+
+    async def enqueue(self, name: str, payload: Dict, durable: bool = True) -> bool:
+        """
+        Adds a job without waiting for it to run.
+
+            Parameters:
+                name (str): The name of a registered handler.
+                payload (Dict): The keyword arguments of the handler.
+                durable (bool): Whether the job may be stored by a durable transport. Defaults to True.
+
+            Raises:
+                KeyError: If no handler is registered with the name.
+
+            Returns:
+                bool: True if the job was added, False if too many jobs are pending and it was dropped.
+        """
+        if name not in JOB_HANDLERS:
+            raise KeyError(f"No job handler is registered as {name!r}")
+
+        transport = self.transport if durable else self.volatile_transport
+        added = await transport.put(name, payload)
+        job_outcomes.labels(name, "enqueued" if added else "rejected").inc()
+        return added
+
+    def _get_transports(self) -> List[JobTransport]:
+        """
+        Returns the distinct transports of the queue.
+
+            Returns:
+                List[JobTransport]: The transports, once each.
+        """
+        if self.transport is self.volatile_transport:
+            return [self.transport]
+        return [self.transport, self.volatile_transport]
+
+    def start(self) -> None:
+        """
+        Starts the worker tasks on the running event loop, unless they already run.
+        """
+        if self._workers:
+            return
+        self._stopping = False
+        self._workers = [
+            asyncio.create_task(self._work(transport))
+            for transport in self._get_transports() for _ in range(self._concurrency)
+        ]
+
+    async def stop(self, timeout: float = 10) -> None:
+        """
+        Stops the worker tasks. Idle workers stop right away, running jobs may finish within the timeout.
+        Durable jobs that did not finish run again after a restart, jobs still in memory are lost.
+
+            Parameters:
+                timeout (float): Seconds the running jobs may take to finish. Defaults to 10.
+        """
+        self._stopping = True
+        for worker in self._idle_workers:
+            worker.cancel()
+        if self._workers:
+            _, unfinished = await asyncio.wait(self._workers, timeout=timeout)
+            for worker in unfinished:
+                worker.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+        self._workers = []
+        self._idle_workers.clear()
+
+        for transport in self._get_transports():
+            await transport.close()
+
+    async def _work(self, transport: JobTransport) -> None:
+        """
+        Claims and runs the jobs of a transport one at a time, until the queue stops.
+
+            Parameters:
+                transport (JobTransport): The transport of the worker.
+        """
+        worker = asyncio.current_task()
+        while not self._stopping:
+            self._idle_workers.add(worker)
+            try:
+                job = await transport.get()
+            finally:
+                self._idle_workers.discard(worker)
+            await self._run(transport, job)
+
+    async def _run(self, transport: JobTransport, job: Job) -> None:
+        """
+        Runs a job and acknowledges, retries or fails it depending on the outcome.
+
+            Parameters:
+                transport (JobTransport): The transport the job was claimed from.
+                job (Job): The claimed job.
+        """
+        try:
+            await JOB_HANDLERS[job.name](**job.payload)
+        except Exception as error:
+            description = f"{type(error).__name__}: {error}"
+            if job.attempts >= self._max_attempts:
+                await transport.fail(job, description)
+                job_outcomes.labels(job.name, "failed").inc()
+            else:
+                await transport.retry(job, self._retry_delay * 2 ** (job.attempts - 1), description)
+                job_outcomes.labels(job.name, "retried").inc()
+            return
+
+        await transport.ack(job)
+        job_outcomes.labels(job.name, "succeeded").inc()
+
+
+@lru_cache
+def get_job_queue() -> JobQueue:
+    """
+    Returns the job queue of this worker, configured by the settings.
+
+        Returns:
+            JobQueue: The job queue.
+    """
+    settings = get_settings()
+    volatile_transport = MemoryJobTransport(settings.job_queue_max_pending)
+    transport = volatile_transport
+    if settings.job_queue_backend == "sqlite":
+        transport = SQLiteJobTransport(settings.job_queue_sqlite_path, settings.job_queue_max_pending)
+
+    return JobQueue(
+        transport,
+        volatile_transport,
+        concurrency=settings.job_queue_concurrency,
+        max_attempts=settings.job_max_attempts,
+        retry_delay=settings.job_retry_delay_seconds
+    )
+
+async def shutdown_job_queue() -> None:
+    """
+    Stops the job queue created so far, e.g. on shutdown, so the next use creates a new one.
+    """
+    if get_job_queue.cache_info().currsize:
+        await get_job_queue().stop()
+        get_job_queue.cache_clear()
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Dict, List, NamedTuple
+from uuid import uuid4
+
+
+class Job(NamedTuple):
+    """
+    Class representing a claimed job.
+
+        Attributes:
+            id (str): The identifier of the job in its transport.
+            name (str): The name of the handler running the job.
+            payload (Dict): The keyword arguments of the handler.
+            attempts (int): The number of the current attempt, starting at 1.
+    """
+    id: str
+    name: str
+    payload: Dict
+    attempts: int
+
+
+class JobTransport(ABC):
+    """
+    Storage of the jobs waiting to run. Every claimed job is eventually acknowledged, retried or failed.
+    """
+    @abstractmethod
+    async def put(self, name: str, payload: Dict) -> bool:
+        """
+        Adds a job, unless the transport is full.
+
+            Parameters:
+                name (str): The name of the handler running the job.
+                payload (Dict): The keyword arguments of the handler.
+
+            Returns:
+                bool: True if the job was added, False if too many jobs are pending.
+        """
+
+    @abstractmethod
+    async def get(self) -> Job:
+        """
+        Waits for a job that is ready to run and claims it.
+
+            Returns:
+                Job: The claimed job.
+        """
+
+    @abstractmethod
+    async def ack(self, job: Job) -> None:
+        """
+        Removes a job that succeeded.
+
+            Parameters:
+                job (Job): The claimed job.
+        """
+
+    @abstractmethod
+    async def retry(self, job: Job, delay: float, error: str) -> None:
+        """
+        Makes a job that raised an error ready to run again after a delay.
+
+            Parameters:
+                job (Job): The claimed job.
+                delay (float): Seconds before the next attempt.
+                error (str): The error of the attempt.
+        """
+
+    @abstractmethod
+    async def fail(self, job: Job, error: str) -> None:
+        """
+        Gives up a job that failed its last attempt.
+
+            Parameters:
+                job (Job): The claimed job.
+                error (str): The error of the last attempt.
+        """
+
+    async def close(self) -> None:
+        """
+        Releases the resources of the transport.
+        """
+
+
+class MemoryJobTransport(JobTransport):
+    """
+    In-process transport of this worker. Nothing is written anywhere, so it works offline and is the one to use
+    in tests, but the pending jobs are lost when the worker stops. Failed jobs are dropped.
+    """
+    def __init__(self, max_pending: int) -> None:
+        """
+        Initialize the MemoryJobTransport.
+
+            Parameters:
+                max_pending (int): The maximum number of waiting, delayed and running jobs.
+        """
+        self._queue: asyncio.Queue[Job] = asyncio.Queue()
+        self._max_pending = max_pending
+        self._pending = 0
+
+    def __len__(self) -> int:
+        return self._pending
+
+    async def put(self, name: str, payload: Dict) -> bool:
+        if self._pending >= self._max_pending:
+            return False
+        self._pending += 1
+        self._queue.put_nowait(Job(uuid4().hex, name, payload, 0))
+        return True
+
+    async def get(self) -> Job:
+        job = await self._queue.get()
+        return job._replace(attempts=job.attempts + 1)
+
+    async def ack(self, job: Job) -> None:
+        self._pending -= 1
+
+    async def retry(self, job: Job, delay: float, error: str) -> None:
+        asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job)
+
+    async def fail(self, job: Job, error: str) -> None:
+        self._pending -= 1
+
+
+class SQLiteJobTransport(JobTransport):
+    """
+    Durable transport storing the jobs in a SQLite file of their own, so queued jobs survive a restart and are
+    shared by the worker processes of the machine. A claimed job is leased: if its worker dies, the job becomes
+    ready again once the lease expires. Jobs that failed their last attempt are kept with the "failed" status.
+    Statements run in a thread, so the event loop is not blocked by the disk.
+    """
+    def __init__(self, path: str, max_pending: int, lease_seconds: float = 300, poll_interval: float = 1) -> None:
+        """
+        Initialize the SQLiteJobTransport.
+
+            Parameters:
+                path (str): The path of the SQLite file, created if needed.
+                max_pending (int): The maximum number of queued and running jobs.
+                lease_seconds (float): Seconds after which a running job is given to another worker.
+                poll_interval (float): Seconds between checks for jobs added by other processes.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA busy_timeout=5000")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY, name TEXT NOT NULL, payload TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "status TEXT NOT NULL DEFAULT 'queued', available_at REAL NOT NULL, last_error TEXT)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_jobs_status_available_at ON jobs (status, available_at)"
+        )
+        self._lock = Lock()
+        self._max_pending = max_pending
+        self._lease_seconds = lease_seconds
+        self._poll_interval = poll_interval
+        self._added: asyncio.Event | None = None
+
+    def _execute(self, statement: str, *parameters: object) -> List[tuple]:
+        """
+        Runs a statement with the lock held, since the connection is shared by threads.
+
+            Parameters:
+                statement (str): The SQL statement.
+                *parameters (object): The parameters of the statement.
+
+            Returns:
+                List[tuple]: The rows returned by the statement.
+        """
+        with self._lock:
+            return self._connection.execute(statement, parameters).fetchall()
+
+    def _insert(self, name: str, payload: str) -> bool:
+        """
+        Inserts a job, unless too many jobs are queued or running, in a single locked step.
+
+            Parameters:
+                name (str): The name of the handler running the job.
+                payload (str): The JSON-encoded keyword arguments of the handler.
+
+            Returns:
+                bool: True if the job was inserted, False otherwise.
+        """
+        with self._lock:
+            pending = self._connection.execute(
+                "SELECT count(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+            if pending >= self._max_pending:
+                return False
+            self._connection.execute(
+                "INSERT INTO jobs (name, payload, available_at) VALUES (?, ?, ?)", (name, payload, time())
+            )
+            return True
+
+    def _claim(self) -> Job | None:
+        """
+        Claims the job that has been ready the longest, including running jobs whose lease expired,
+        with a single UPDATE, so two processes never claim the same job.
+
+            Returns:
+                Job | None: The claimed job, None if no job is ready.
+        """
+        now = time()
+        rows = self._execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, available_at = ? "
+            "WHERE id = (SELECT id FROM jobs WHERE status IN ('queued', 'running') AND available_at <= ? "
+            "ORDER BY available_at LIMIT 1) RETURNING id, name, payload, attempts",
+            now + self._lease_seconds, now
+        )
+        if not rows:
+            return None
+        job_id, name, payload, attempts = rows[0]
+        return Job(str(job_id), name, json.loads(payload), attempts)
+
+    async def put(self, name: str, payload: Dict) -> bool:
+        added = await asyncio.to_thread(self._insert, name, json.dumps(payload))
+        if added and self._added is not None:
+            self._added.set()
+        return added
+
+    async def get(self) -> Job:
+        if self._added is None:
+            self._added = asyncio.Event()
+        while True:
+            self._added.clear()
+            job = await asyncio.to_thread(self._claim)
+            if job is not None:
+                return job
+            try:
+                await asyncio.wait_for(self._added.wait(), self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def ack(self, job: Job) -> None:
+        await asyncio.to_thread(self._execute, "DELETE FROM jobs WHERE id = ?", int(job.id))
+
+    async def retry(self, job: Job, delay: float, error: str) -> None:
+        await asyncio.to_thread(
+            self._execute, "UPDATE jobs SET status = 'queued', available_at = ?, last_error = ? WHERE id = ?",
+            time() + delay, error, int(job.id)
+        )
+
+    async def fail(self, job: Job, error: str) -> None:
+        await asyncio.to_thread(
+            self._execute, "UPDATE jobs SET status = 'failed', last_error = ? WHERE id = ?", error, int(job.id)
+        )
+
+    async def close(self) -> None:
+        with self._lock:
+            self._connection.close()
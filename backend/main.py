@@ -1,15 +1,67 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
+from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from backend.users.router import router as users_router
-from backend.database.configuration import Base, engine
+from backend.authentication.router import router as authentication_router
+from backend.database.configuration import dispose_engines, get_async_engine
+from backend.database.migrate import get_pending_migrations
+from backend.jobs.queue import get_job_queue, shutdown_job_queue
+from backend.metrics.router import router as metrics_router
+from backend.metrics.instruments import MetricsMiddleware, is_metrics_enabled, register_cache_stats
+from backend.tracing.instruments import TracingMiddleware
+from backend.tracing.tracer import shutdown_tracer
 from backend.config import API_ENDPOINT
+from backend.authentication.services import access_token_claims_stats, get_jwt_backend, get_token_cache
+from backend.users.services import get_email_filter, get_user_cache
+from backend.utils.responses import http_exception_handler
+from backend.utils.security import async_get_dummy_hashed_string, shutdown_hashing_pool
 
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Prepares the worker before it serves requests and releases its resources on shutdown.
+    Nothing touches the database or the key files at import time, so importing the application stays cheap.
+
+        Parameters:
+            app (FastAPI): The application.
+
+        Raises:
+            RuntimeError: If the database schema is not up to date.
+    """
+    get_jwt_backend()
+    async with get_async_engine().connect() as connection:
+        pending_migrations = await connection.run_sync(get_pending_migrations)
+    if pending_migrations:
+        raise RuntimeError(
+            f"The database schema is {len(pending_migrations)} migrations behind, "
+            "run: python -m backend.database.migrate"
+        )
+
+    await async_get_dummy_hashed_string()
+    if is_metrics_enabled():
+        register_cache_stats([
+            ("user", get_user_cache().stats),
+            ("token", get_token_cache().stats),
+            ("access_token_claims", access_token_claims_stats),
+        ])
+    email_filter = get_email_filter()
+    if email_filter is not None:
+        email_filter.start_loading()
+    get_job_queue().start()
+
+    yield
+
+    await shutdown_job_queue()
+    shutdown_hashing_pool()
+    await dispose_engines()
+    shutdown_tracer()
 
 app = FastAPI(
+    lifespan=lifespan,
     docs_url=f"{API_ENDPOINT}/docs",
     redoc_url=f"{API_ENDPOINT}/redocs",
     title="Users login-registration API",
@@ -31,8 +83,18 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+app.add_exception_handler(StarletteHTTPException, http_exception_handler)
+
 app.include_router(users_router, prefix=API_ENDPOINT)
+app.include_router(authentication_router)
+
+# Both middlewares read their settings on the first request, so importing the application reads no settings.
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.include_router(metrics_router)
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("backend.main:app",host="localhost", port=8000, reload=True)
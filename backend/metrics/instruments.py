@@ -0,0 +1,199 @@
+from functools import lru_cache, wraps
+from inspect import iscoroutinefunction
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import get_settings
+from ..utils.cache import CacheStats
+from .registry import CallbackGauge, Counter, Histogram, Registry
+
+
+SQL_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE", "OTHER")
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Latency of HTTP requests by route template.", ("method", "route")
+))
+http_responses = registry.register(Counter(
+    "http_responses_total", "HTTP responses by route template and status code.", ("method", "route", "status")
+))
+function_duration = registry.register(Histogram(
+    "function_duration_seconds", "Duration of instrumented functions (hashing, tokens, user services).",
+    ("function",)
+))
+sql_statement_duration = registry.register(Histogram(
+    "sql_statement_duration_seconds", "Duration of SQL statements by engine and operation, the count is the number "
+    "of statements.", ("engine", "operation")
+))
+sql_statement_errors = registry.register(Counter(
+    "sql_statement_errors_total", "SQL statements that raised an error.", ("engine",)
+))
+pool_checkout_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a connection from the pool.", ("engine",)
+))
+job_outcomes = registry.register(Counter(
+    "jobs_total", "Background jobs by name and outcome (enqueued, rejected, succeeded, retried, failed).",
+    ("job", "outcome")
+))
+cache_hits = registry.register(CallbackGauge("cache_hits", "Cache hits since the start of the process.", ("cache",)))
+cache_misses = registry.register(CallbackGauge(
+    "cache_misses", "Cache misses since the start of the process.", ("cache",)
+))
+
+@lru_cache
+def is_metrics_enabled() -> bool:
+    """
+    Returns whether metrics are recorded, read from the settings on first use rather than at import time.
+
+        Returns:
+            bool: True if metrics are enabled, False otherwise.
+    """
+    return get_settings().metrics_enabled
+
+def timed(function: Callable) -> Callable:
+    """
+    Decorator recording the duration of a sync or async function in function_duration_seconds.
+    When metrics are disabled, every call only pays the cached is_metrics_enabled lookup.
+
+        Parameters:
+            function (Callable): The function to time.
+
+        Returns:
+            Callable: The timed function.
+    """
+    histogram = function_duration.labels(f"{function.__module__.removeprefix('backend.')}.{function.__qualname__}")
+
+    if iscoroutinefunction(function):
+        @wraps(function)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not is_metrics_enabled():
+                return await function(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                histogram.observe(perf_counter() - start)
+        return async_wrapper
+
+    @wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if not is_metrics_enabled():
+            return function(*args, **kwargs)
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.observe(perf_counter() - start)
+    return wrapper
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """
+    Records the duration of every SQL statement and the pool checkout wait of an engine.
+
+        Parameters:
+            engine (Engine): A (sync) engine, e.g. the sync_engine of an async engine.
+            name (str): The engine label, e.g. "primary".
+    """
+    histograms = {operation: sql_statement_duration.labels(name, operation) for operation in SQL_OPERATIONS}
+    other_histogram = histograms["OTHER"]
+    errors = sql_statement_errors.labels(name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(connection: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        context.metrics_start = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(connection: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        histograms.get(statement[:6].upper(), other_histogram).observe(perf_counter() - context.metrics_start)
+
+    @event.listens_for(engine, "handle_error")
+    def count_error(exception_context: Any) -> None:
+        errors.inc()
+
+    _instrument_pool(engine, pool_checkout_wait.labels(name))
+
+    @event.listens_for(engine, "engine_disposed")
+    def instrument_new_pool(disposed_engine: Engine) -> None:
+        _instrument_pool(disposed_engine, pool_checkout_wait.labels(name))
+
+def _instrument_pool(engine: Engine, histogram: Any) -> None:
+    """
+    Wraps the checkout of the engine pool to time how long callers wait for a connection.
+    SQLAlchemy has no event fired before a checkout starts, hence the wrapper.
+
+        Parameters:
+            engine (Engine): A (sync) engine.
+            histogram (Any): The histogram child of the engine.
+    """
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect() -> Any:
+        start = perf_counter()
+        try:
+            return connect()
+        finally:
+            histogram.observe(perf_counter() - start)
+
+    pool.connect = timed_connect
+
+def register_cache_stats(stats: Iterable[Tuple[str, CacheStats]]) -> None:
+    """
+    Exposes the hit and miss counters of caches as gauges.
+
+        Parameters:
+            stats (Iterable[Tuple[str, CacheStats]]): The cache statistics by cache name.
+    """
+    for name, cache_stats in stats:
+        cache_hits.set_callback((name,), lambda cache_stats=cache_stats: cache_stats.hits)
+        cache_misses.set_callback((name,), lambda cache_stats=cache_stats: cache_stats.misses)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the latency and status of HTTP requests by route template (e.g. "/users/me"),
+    so the number of label sets is bounded by the number of routes. The histogram of a route is looked up
+    once and then reused, requests that match no route share the "unmatched" label.
+    Requests pass straight through when metrics are disabled.
+    """
+    def __init__(self, app: Any) -> None:
+        """
+        Initialize the MetricsMiddleware.
+
+            Parameters:
+                app (Any): The wrapped ASGI application.
+        """
+        self.app = app
+        self._histograms: Dict[Tuple[str, str], Any] = {}
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not is_metrics_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        status = "500"
+
+        async def send_with_status(message: Dict) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            method = scope["method"]
+            route_path = getattr(scope.get("route"), "path", "unmatched")
+
+            histogram = self._histograms.get((method, route_path))
+            if histogram is None:
+                histogram = self._histograms.setdefault(
+                    (method, route_path), http_request_duration.labels(method, route_path)
+                )
+            histogram.observe(perf_counter() - start)
+            http_responses.labels(method, route_path, status).inc()
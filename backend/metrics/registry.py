@@ -0,0 +1,272 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from threading import Lock
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _escape_label_value(value: str) -> str:
+    """
+    Escapes a label value as required by the Prometheus text format.
+
+        Parameters:
+            value (str): The label value.
+
+        Returns:
+            str: The escaped value.
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    """
+    Formats a label set in the Prometheus text format.
+
+        Parameters:
+            label_names (Tuple[str, ...]): The label names.
+            label_values (Tuple[str, ...]): The label values.
+            extra (str): An additional, already formatted label (e.g. le="0.1").
+
+        Returns:
+            str: The formatted label set, empty if there are no labels.
+    """
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(ABC):
+    """
+    Base class of metrics, made of one child per label set that is rendered when the metrics are collected.
+
+        Attributes:
+            name (str): The metric name.
+            documentation (str): The metric description.
+            label_names (Tuple[str, ...]): The label names.
+    """
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> None:
+        """
+        Initialize the Metric.
+
+            Parameters:
+                name (str): The metric name.
+                documentation (str): The metric description.
+                label_names (Iterable[str]): The label names.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = Lock()
+
+    @abstractmethod
+    def _render_child(self, label_values: Tuple[str, ...], child: Any) -> List[str]:
+        """
+        Renders the child of a label set in the Prometheus text format.
+
+            Parameters:
+                label_values (Tuple[str, ...]): The label values of the child.
+                child (Any): The child.
+
+            Returns:
+                List[str]: The sample lines of the child.
+        """
+
+    def render(self) -> List[str]:
+        """
+        Renders the metric in the Prometheus text format.
+
+            Returns:
+                List[str]: The lines of the metric.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for label_values, child in list(self._children.items()):
+            lines.extend(self._render_child(label_values, child))
+        return lines
+
+
+class RecordedMetric(Metric):
+    """
+    Base class of metrics whose values are recorded by the application. The child of a label set is created once
+    and then reused, so recording a value allocates nothing.
+    """
+    def labels(self, *label_values: str) -> Any:
+        """
+        Returns the child of a label set, creating it on first use.
+
+            Parameters:
+                *label_values (str): The label values, in the order of the label names.
+
+            Returns:
+                Any: The child recording values of the label set (e.g. a CounterChild).
+        """
+        child = self._children.get(label_values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(label_values, self._create_child())
+        return child
+
+    @abstractmethod
+    def _create_child(self) -> Any:
+        """
+        Creates the child of a new label set.
+
+            Returns:
+                Any: The child, e.g. a CounterChild.
+        """
+
+
+class CounterChild:
+    """
+    Counter of a single label set.
+    """
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        """
+        Increments the counter.
+
+            Parameters:
+                amount (float): The increment.
+        """
+        with self._lock:
+            self.value += amount
+
+
+class Counter(RecordedMetric):
+    """
+    Monotonically increasing counter.
+    """
+    TYPE = "counter"
+
+    def _create_child(self) -> CounterChild:
+        return CounterChild()
+
+    def _render_child(self, label_values: Tuple[str, ...], child: CounterChild) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, label_values)} {child.value}"]
+
+
+class HistogramChild:
+    """
+    Histogram of a single label set.
+    """
+    __slots__ = ("upper_bounds", "bucket_counts", "sum", "count", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]) -> None:
+        self.upper_bounds = upper_bounds
+        self.bucket_counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = Lock()
+
+    def observe(self, value: float) -> None:
+        """
+        Records a value.
+
+            Parameters:
+                value (float): The observed value (e.g. a duration in seconds).
+        """
+        index = bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(RecordedMetric):
+    """
+    Histogram of observed values in cumulative buckets.
+
+        Attributes:
+            buckets (Tuple[float, ...]): The upper bounds of the buckets.
+    """
+    TYPE = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        """
+        Initialize the Histogram.
+
+            Parameters:
+                name (str): The metric name.
+                documentation (str): The metric description.
+                label_names (Iterable[str]): The label names.
+                buckets (Iterable[float]): The upper bounds of the buckets.
+        """
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _create_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def _render_child(self, label_values: Tuple[str, ...], child: HistogramChild) -> List[str]:
+        lines = []
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(self.buckets + (float("inf"),), child.bucket_counts):
+            cumulative_count += bucket_count
+            le = "+Inf" if upper_bound == float("inf") else repr(upper_bound)
+            bucket_labels = _format_labels(self.label_names, label_values, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative_count}")
+        labels = _format_labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {child.sum}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class CallbackGauge(Metric):
+    """
+    Gauge whose values are read from callbacks when the metrics are collected, e.g. cache statistics.
+    """
+    TYPE = "gauge"
+
+    def set_callback(self, label_values: Tuple[str, ...], callback: Callable[[], float]) -> None:
+        """
+        Registers the callback returning the value of a label set.
+
+            Parameters:
+                label_values (Tuple[str, ...]): The label values.
+                callback (Callable[[], float]): The callback.
+        """
+        with self._lock:
+            self._children[label_values] = callback
+
+    def _render_child(self, label_values: Tuple[str, ...], child: Callable[[], float]) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, label_values)} {float(child())}"]
+
+
+class Registry:
+    """
+    Collection of metrics exposed together.
+    """
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Adds a metric to the registry.
+
+            Parameters:
+                metric (Metric): The metric.
+
+            Returns:
+                Metric: The same metric.
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Renders all metrics in the Prometheus text format.
+
+            Returns:
+                str: The exposition text.
+        """
+        return "\n".join(line for metric in self._metrics for line in metric.render()) + "\n"
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, Response, status
+
+from .instruments import is_metrics_enabled, registry
+
+
+router = APIRouter(
+    tags=["metrics"]
+)
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+@router.get(
+    "/metrics",
+    summary="Get the application metrics",
+    description="""
+    <h1>Returns the application metrics in the Prometheus text format.</h1>
+
+    Request latencies by route, timings of password hashing, tokens and user services,
+    SQL statement durations, pool checkout waits and cache hit rates.
+    The endpoint is meant to be scraped from the internal network and should not be exposed publicly.
+    """,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Successfully obtained the metrics"
+        }
+    },
+    response_description="Successfully obtained the metrics",
+    status_code=status.HTTP_200_OK,
+    include_in_schema=False
+)
+async def get_metrics():
+    """
+    Renders all registered metrics.
+
+        Raises:
+            HTTPException: If metrics are disabled, as if the endpoint did not exist.
+
+        Returns:
+            Response: The metrics in the Prometheus text format.
+    """
+    if not is_metrics_enabled():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return Response(content=registry.render(), media_type=PROMETHEUS_MEDIA_TYPE)
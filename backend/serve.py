@@ -0,0 +1,210 @@
+"""
+Runs the API in production: several worker processes sharing one socket, so logins are hashed on every core.
+
+Workers default to one per available core (or WEB_CONCURRENCY), and unless PASSWORD_HASHING_WORKERS is set,
+the cores are split between the hashing pools of the workers, so they do not oversubscribe the machine.
+uvloop and httptools are used when they are installed. Workers can be recycled after a number of requests
+and are all restarted gracefully, one by one, on SIGHUP (e.g. after a deployment).
+
+By default the workers are managed by uvicorn and import the application themselves. With --preload the
+application is imported once by a gunicorn master (requires pip install gunicorn) and the workers are forked
+from it, sharing the memory of the imported modules.
+
+Usage:
+    python -m backend.serve [--host 0.0.0.0] [--port 8000] [--workers N] [--max-requests 10000] [--preload]
+    kill -HUP <pid of the launcher>   # graceful restart of all workers
+"""
+import argparse
+import importlib.util
+import os
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+
+APP = "backend.main:app"
+
+def get_available_cores() -> int:
+    """
+    Counts the cores this process may run on, which respects CPU affinity (e.g. taskset or cpusets).
+
+        Returns:
+            int: The number of available cores.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+def get_worker_count(requested: int | None, cores: int) -> int:
+    """
+    Picks the number of worker processes.
+
+        Parameters:
+            requested (int | None): The number from the command line.
+            cores (int): The number of available cores.
+
+        Returns:
+            int: The number of workers, from the command line, WEB_CONCURRENCY or one per core.
+    """
+    if requested:
+        return requested
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.environ["WEB_CONCURRENCY"]))
+    return cores
+
+def configure_worker_environment(workers: int, cores: int) -> Dict[str, str]:
+    """
+    Sizes the hashing pool of every worker so that all pools together use each core once.
+    The variable is set in the environment inherited by the workers, unless it was configured
+    in the environment or the ".env" file.
+
+        Parameters:
+            workers (int): The number of worker processes.
+            cores (int): The number of available cores.
+
+        Returns:
+            Dict[str, str]: The variables set for the workers.
+    """
+    load_dotenv()
+    configured = {}
+    if not os.getenv("PASSWORD_HASHING_WORKERS"):
+        configured["PASSWORD_HASHING_WORKERS"] = str(max(1, cores // workers))
+    os.environ.update(configured)
+    return configured
+
+def get_event_loop_and_parser() -> Dict[str, str]:
+    """
+    Picks the fastest event loop and HTTP parser that are installed.
+
+        Returns:
+            Dict[str, str]: The uvicorn "loop" and "http" options.
+    """
+    return {
+        "loop": "uvloop" if importlib.util.find_spec("uvloop") else "asyncio",
+        "http": "httptools" if importlib.util.find_spec("httptools") else "h11",
+    }
+
+def run_uvicorn(arguments: argparse.Namespace, workers: int) -> None:
+    """
+    Runs the workers under the uvicorn supervisor, which restarts workers that exit and all of them on SIGHUP.
+
+        Parameters:
+            arguments (argparse.Namespace): The parsed arguments.
+            workers (int): The number of worker processes.
+    """
+    import uvicorn
+
+    uvicorn.run(
+        APP,
+        host=arguments.host,
+        port=arguments.port,
+        workers=workers,
+        limit_max_requests=arguments.max_requests or None,
+        limit_max_requests_jitter=arguments.max_requests_jitter,
+        timeout_graceful_shutdown=arguments.graceful_timeout,
+        backlog=arguments.backlog,
+        forwarded_allow_ips=arguments.forwarded_allow_ips,
+        access_log=arguments.access_log,
+        **get_event_loop_and_parser()
+    )
+
+def run_gunicorn(arguments: argparse.Namespace, workers: int) -> None:
+    """
+    Runs the workers under a gunicorn master that imports the application before forking them.
+
+        Parameters:
+            arguments (argparse.Namespace): The parsed arguments.
+            workers (int): The number of worker processes.
+
+        Raises:
+            SystemExit: If gunicorn is not installed.
+    """
+    if importlib.util.find_spec("gunicorn") is None:
+        raise SystemExit("--preload requires gunicorn (pip install gunicorn)")
+
+    from gunicorn.app.base import BaseApplication
+
+    options = {
+        "bind": f"{arguments.host}:{arguments.port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": arguments.max_requests,
+        "max_requests_jitter": arguments.max_requests_jitter,
+        "graceful_timeout": arguments.graceful_timeout,
+        "backlog": arguments.backlog,
+        "forwarded_allow_ips": arguments.forwarded_allow_ips,
+    }
+    if arguments.access_log:
+        options["accesslog"] = "-"
+
+    class PreloadedApplication(BaseApplication):
+        def load_config(self) -> None:
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from backend.main import app
+            return app
+
+    PreloadedApplication().run()
+
+def parse_arguments(argv: List[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+        Parameters:
+            argv (List[str] | None): The arguments, defaults to sys.argv.
+
+        Returns:
+            argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.serve", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, help="Worker processes, defaults to WEB_CONCURRENCY or one per core")
+    parser.add_argument(
+        "--max-requests", type=int, default=0, help="Requests after which a worker is replaced, 0 never replaces it"
+    )
+    parser.add_argument(
+        "--max-requests-jitter", type=int, default=0, help="Random extra requests, so workers are not replaced at once"
+    )
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=30, help="Seconds a stopping worker may finish its requests"
+    )
+    parser.add_argument("--backlog", type=int, default=2048, help="Connections waiting to be accepted")
+    parser.add_argument(
+        "--forwarded-allow-ips", default="127.0.0.1", help="Proxies trusted to set X-Forwarded-For, e.g. nginx"
+    )
+    parser.add_argument("--access-log", action="store_true", help="Log every request (e.g. if no proxy logs them)")
+    parser.add_argument("--preload", action="store_true", help="Import the application once before forking workers")
+    parser.add_argument("--migrate", action="store_true", help="Apply the pending migrations before starting")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    command_arguments = parse_arguments()
+    available_cores = get_available_cores()
+    worker_count = get_worker_count(command_arguments.workers, available_cores)
+    configure_worker_environment(worker_count, available_cores)
+    event_loop_and_parser = get_event_loop_and_parser()
+    print(
+        f"Starting {worker_count} workers with {os.environ['PASSWORD_HASHING_WORKERS']} hashing workers each "
+        f"({event_loop_and_parser['loop']}, {event_loop_and_parser['http']})"
+    )
+
+    if command_arguments.migrate:
+        from backend.database.configuration import get_engine
+        from backend.database.migrate import upgrade
+
+        upgrade(get_engine())
+        get_engine().dispose()
+        get_engine.cache_clear()
+
+    if command_arguments.preload:
+        run_gunicorn(command_arguments, worker_count)
+    else:
+        run_uvicorn(command_arguments, worker_count)
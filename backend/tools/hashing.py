@@ -0,0 +1,124 @@
+"""
+Picks the password hash cost that makes one verification take about the target time on this machine.
+Run it on the production hardware and put the printed settings into the ".env" file: new passwords are hashed
+with the new cost and existing hashes are replaced the next time their users log in.
+
+Usage:
+    python -m backend.tools.hashing calibrate --target-ms 250 [--scheme bcrypt] [--min-cost 10]
+    python -m backend.tools.hashing calibrate --scheme argon2 --target-ms 100 --memory-cost 65536
+"""
+import argparse
+import json
+from statistics import median
+from time import perf_counter
+from typing import Callable, Dict, List
+
+from passlib.hash import argon2, bcrypt
+
+
+CALIBRATION_PASSWORD = "Calibration123"
+MAX_COST = {"bcrypt": 31, "argon2": 64}
+
+def measure_verification(hasher: Callable, samples: int) -> float:
+    """
+    Measures the median time of verifying a password against a hash.
+
+        Parameters:
+            hasher (Callable): A passlib handler configured with the measured cost.
+            samples (int): The number of verifications.
+
+        Returns:
+            float: The median verification time in seconds.
+    """
+    hashed_password = hasher.hash(CALIBRATION_PASSWORD)
+    durations = []
+    for _ in range(samples):
+        start = perf_counter()
+        hasher.verify(CALIBRATION_PASSWORD, hashed_password)
+        durations.append(perf_counter() - start)
+    return median(durations)
+
+def calibrate(scheme: str, target_seconds: float, min_cost: int, samples: int, memory_cost: int | None) -> Dict:
+    """
+    Raises the cost (bcrypt rounds or argon2 time cost) from the minimum until a verification exceeds the target,
+    and picks the highest cost within the target. The minimum is kept even if it is slower than the target.
+
+        Parameters:
+            scheme (str): "bcrypt" or "argon2".
+            target_seconds (float): The target verification time.
+            min_cost (int): The lowest acceptable cost.
+            samples (int): The number of verifications per cost.
+            memory_cost (int | None): The argon2 memory cost in KiB, None for the passlib default.
+
+        Returns:
+            Dict: The recommended settings and the measured times by cost.
+    """
+    measurements: Dict[int, float] = {}
+    cost = min_cost
+    while cost <= MAX_COST[scheme]:
+        if scheme == "bcrypt":
+            hasher = bcrypt.using(rounds=cost)
+        else:
+            hasher = argon2.using(rounds=cost, **({"memory_cost": memory_cost} if memory_cost else {}))
+
+        measurements[cost] = measure_verification(hasher, samples)
+        if measurements[cost] > target_seconds:
+            break
+        cost += 1
+
+    within_target: List[int] = [cost for cost, seconds in measurements.items() if seconds <= target_seconds]
+    chosen_cost = max(within_target, default=min_cost)
+
+    if scheme == "bcrypt":
+        settings = {"PASSWORD_HASH_SCHEMES": "bcrypt", "BCRYPT_ROUNDS": chosen_cost}
+    else:
+        settings = {"PASSWORD_HASH_SCHEMES": "argon2,bcrypt", "ARGON2_TIME_COST": chosen_cost}
+        if memory_cost:
+            settings["ARGON2_MEMORY_COST"] = memory_cost
+
+    return {
+        "settings": settings,
+        "verification_ms": round(measurements[chosen_cost] * 1000, 1),
+        "measurements_ms": {cost: round(seconds * 1000, 1) for cost, seconds in measurements.items()},
+    }
+
+def parse_arguments(argv: List[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+        Parameters:
+            argv (List[str] | None): The arguments, defaults to sys.argv.
+
+        Returns:
+            argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.tools.hashing", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    calibrate_parser = commands.add_parser("calibrate", help="Recommend a hash cost for a target verification time")
+    calibrate_parser.add_argument("--scheme", choices=("bcrypt", "argon2"), default="bcrypt")
+    calibrate_parser.add_argument("--target-ms", type=float, default=250, help="Target verification time")
+    calibrate_parser.add_argument(
+        "--min-cost", type=int, help="Lowest acceptable cost, defaults to 10 for bcrypt and 2 for argon2"
+    )
+    calibrate_parser.add_argument("--memory-cost", type=int, help="argon2 memory cost in KiB")
+    calibrate_parser.add_argument("--samples", type=int, default=3, help="Verifications measured per cost")
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    command_arguments = parse_arguments()
+    if command_arguments.scheme == "argon2" and not argon2.has_backend():
+        raise SystemExit("The argon2 scheme requires argon2-cffi (pip install argon2-cffi)")
+
+    print(json.dumps(calibrate(
+        command_arguments.scheme,
+        command_arguments.target_ms / 1000,
+        command_arguments.min_cost or (10 if command_arguments.scheme == "bcrypt" else 2),
+        command_arguments.samples,
+        command_arguments.memory_cost
+    ), indent=2))
@@ -0,0 +1,48 @@
+"""
+Deletes the sessions whose refresh token expired. Expired sessions can not be used anymore, they only take space,
+so this can run as rarely as once a day (e.g. from cron).
+
+Usage:
+    python -m backend.tools.sessions purge
+"""
+import argparse
+import asyncio
+from typing import List
+
+from backend.authentication.sessions import purge_expired_sessions
+from backend.database.configuration import get_async_sessionmaker
+
+
+async def purge() -> int:
+    """
+    Deletes the expired sessions.
+
+        Returns:
+            int: The number of deleted sessions.
+    """
+    async with get_async_sessionmaker()() as db:
+        return await purge_expired_sessions(db)
+
+def parse_arguments(argv: List[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+        Parameters:
+            argv (List[str] | None): The arguments, defaults to sys.argv.
+
+        Returns:
+            argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.tools.sessions", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("purge", help="Delete the sessions whose refresh token expired")
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    parse_arguments()
+    print(f"Deleted {asyncio.run(purge())} expired sessions")
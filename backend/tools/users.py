@@ -0,0 +1,360 @@
+"""
+Streams users in and out of the users table without going through the HTTP API.
+
+Usage:
+    python -m backend.tools.users export --format csv --output users.csv [--with-password-hashes]
+    python -m backend.tools.users import --format ndjson --input users.ndjson [--hash-plaintext] [--checkpoint FILE]
+
+Imported rows need an "email" and either a "hashed_password" of one of the PASSWORD_HASH_SCHEMES
+(e.g. bcrypt from a legacy system, or argon2 from an export) or a plaintext "password",
+which is hashed in a process pool when --hash-plaintext is given.
+Rows whose email address is already registered are skipped, so an interrupted import can simply be
+restarted: with --checkpoint, already imported rows are skipped without touching the database.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Set
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from backend import models
+from backend.database.configuration import get_sessionmaker
+from backend.users.schemas import UserBase
+from backend.utils.security import get_hashed_string, is_supported_hashed_string
+
+
+FORMATS = ("csv", "ndjson", "parquet")
+
+def _require_pyarrow():
+    """
+    Imports pyarrow, which is needed only for the Parquet format.
+
+        Raises:
+            SystemExit: If pyarrow is not installed.
+
+        Returns:
+            module: The pyarrow module, with pyarrow.parquet loaded.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("The parquet format requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def read_rows(path: Path, file_format: str, chunk_size: int) -> Iterator[Dict[str, str]]:
+    """
+    Reads rows from a file one at a time (Parquet files one record batch at a time).
+
+        Parameters:
+            path (Path): The input file.
+            file_format (str): "csv", "ndjson" or "parquet".
+            chunk_size (int): The number of rows of a Parquet record batch.
+
+        Returns:
+            Iterator[Dict[str, str]]: The rows.
+    """
+    if file_format == "parquet":
+        parquet_file = _require_pyarrow().parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield from batch.to_pylist()
+        return
+
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield {}
+
+def write_chunks(path: Path, file_format: str, field_names: List[str], chunks: Iterator[List[Dict]]) -> int:
+    """
+    Writes rows to a file one chunk at a time.
+
+        Parameters:
+            path (Path): The output file.
+            file_format (str): "csv", "ndjson" or "parquet".
+            field_names (List[str]): The columns.
+            chunks (Iterator[List[Dict]]): The chunks of rows.
+
+        Returns:
+            int: The number of written rows.
+    """
+    written = 0
+
+    if file_format == "parquet":
+        pyarrow = _require_pyarrow()
+        with pyarrow.parquet.ParquetWriter(path, pyarrow.schema(
+            [(name, pyarrow.int64() if name == "id" else pyarrow.string()) for name in field_names]
+        )) as parquet_writer:
+            for chunk in chunks:
+                parquet_writer.write_table(pyarrow.Table.from_pylist(chunk, schema=parquet_writer.schema))
+                written += len(chunk)
+        return written
+
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        if file_format == "csv":
+            csv_writer = csv.DictWriter(file, fieldnames=field_names)
+            csv_writer.writeheader()
+
+        for chunk in chunks:
+            if file_format == "csv":
+                csv_writer.writerows(chunk)
+            else:
+                file.writelines(json.dumps(row) + "\n" for row in chunk)
+            written += len(chunk)
+
+    return written
+
+def read_chunks(rows: Iterator[Dict[str, str]], chunk_size: int, skip: int = 0) -> Iterator[List[Dict[str, str]]]:
+    """
+    Groups rows into fixed-size chunks, skipping rows that were already imported.
+
+        Parameters:
+            rows (Iterator[Dict[str, str]]): The rows.
+            chunk_size (int): The number of rows of a chunk.
+            skip (int): The number of leading rows to skip.
+
+        Returns:
+            Iterator[List[Dict[str, str]]]: The chunks.
+    """
+    chunk = []
+    for row_number, row in enumerate(rows):
+        if row_number < skip:
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Checkpoint:
+    """
+    Progress of an import, saved atomically after every committed chunk.
+
+        Attributes:
+            path (Path | None): The checkpoint file, None if checkpoints are disabled.
+            source (str): The imported file.
+            rows (int): The number of rows already imported.
+    """
+    def __init__(self, path: Path | None, source: Path) -> None:
+        """
+        Initialize the Checkpoint, loading the saved progress of the same source file.
+
+            Parameters:
+                path (Path | None): The checkpoint file.
+                source (Path): The imported file.
+        """
+        self.path = path
+        self.source = str(source.resolve())
+        self.rows = 0
+
+        if path is not None and path.exists():
+            saved = json.loads(path.read_text())
+            if saved.get("source") == self.source:
+                self.rows = saved["rows"]
+
+    def save(self, rows: int) -> None:
+        """
+        Saves the number of imported rows.
+
+            Parameters:
+                rows (int): The number of rows already imported.
+        """
+        self.rows = rows
+        if self.path is None:
+            return
+
+        temporary_path = self.path.with_name(f"{self.path.name}.tmp")
+        temporary_path.write_text(json.dumps({"source": self.source, "rows": rows}))
+        os.replace(temporary_path, self.path)
+
+
+def import_chunk(db: Session, chunk: List[Dict[str, str]], first_row: int, hashing_pool: Executor | None) -> Dict[str, int]:
+    """
+    Validates a chunk, hashes plaintext passwords if requested and inserts the new users in one transaction.
+
+        Parameters:
+            db (Session): A database session.
+            chunk (List[Dict[str, str]]): The rows.
+            first_row (int): The number of the first row of the chunk, used in error messages.
+            hashing_pool (Executor | None): The pool hashing plaintext passwords, None to reject them.
+
+        Returns:
+            Dict[str, int]: The number of imported, skipped and invalid rows.
+    """
+    counts = {"imported": 0, "skipped": 0, "invalid": 0}
+    valid_rows: Dict[str, Dict[str, str]] = {}
+
+    for row_number, row in enumerate(chunk, start=first_row):
+        error = None
+        try:
+            email = UserBase.model_validate({"email": row.get("email")}).email
+        except ValidationError:
+            error = "invalid email address"
+        else:
+            if row.get("hashed_password"):
+                if not is_supported_hashed_string(row["hashed_password"]):
+                    error = "hashed_password is not a hash of the configured password hash schemes"
+            elif not row.get("password"):
+                error = "missing password"
+            elif hashing_pool is None:
+                error = "plaintext password given without --hash-plaintext"
+
+        if error:
+            counts["invalid"] += 1
+            print(f"row {row_number}: {error}", file=sys.stderr)
+        elif email in valid_rows:
+            counts["skipped"] += 1
+        else:
+            valid_rows[email] = row
+
+    registered_emails: Set[str] = set(db.scalars(
+        select(models.User.email).where(models.User.email.in_(list(valid_rows)))
+    )) if valid_rows else set()
+    counts["skipped"] += len(registered_emails)
+    new_rows = {email: row for email, row in valid_rows.items() if email not in registered_emails}
+
+    plaintext_emails = [email for email, row in new_rows.items() if not row.get("hashed_password")]
+    if plaintext_emails:
+        hashed_passwords = hashing_pool.map(
+            get_hashed_string, [new_rows[email]["password"] for email in plaintext_emails], chunksize=16
+        )
+        for email, hashed_password in zip(plaintext_emails, hashed_passwords):
+            new_rows[email] = {"hashed_password": hashed_password}
+
+    if new_rows:
+        db.execute(insert(models.User), [
+            {"email": email, "hashed_password": row["hashed_password"]} for email, row in new_rows.items()
+        ])
+    db.commit()
+
+    counts["imported"] = len(new_rows)
+    return counts
+
+def import_users(arguments: argparse.Namespace) -> None:
+    """
+    Imports users from a file chunk by chunk, committing and checkpointing after every chunk.
+
+        Parameters:
+            arguments (argparse.Namespace): The command line arguments.
+    """
+    checkpoint = Checkpoint(arguments.checkpoint, arguments.input)
+    if checkpoint.rows:
+        print(f"Resuming after row {checkpoint.rows}", file=sys.stderr)
+
+    totals = {"imported": 0, "skipped": 0, "invalid": 0}
+    hashing_pool = ProcessPoolExecutor(max_workers=arguments.workers) if arguments.hash_plaintext else None
+    rows = read_rows(arguments.input, arguments.format, arguments.chunk_size)
+
+    try:
+        with get_sessionmaker()() as db:
+            for chunk in read_chunks(rows, arguments.chunk_size, skip=checkpoint.rows):
+                counts = import_chunk(db, chunk, checkpoint.rows + 1, hashing_pool)
+                for name, count in counts.items():
+                    totals[name] += count
+
+                checkpoint.save(checkpoint.rows + len(chunk))
+                print(f"{checkpoint.rows} rows processed", file=sys.stderr)
+    finally:
+        if hashing_pool is not None:
+            hashing_pool.shutdown()
+
+    print(json.dumps(totals))
+
+def iter_user_chunks(db: Session, columns: List, chunk_size: int) -> Iterator[List[Dict]]:
+    """
+    Reads the users table chunk by chunk in identifier order. Every chunk continues after the last
+    identifier of the previous one (keyset pagination), so each query costs the same.
+
+        Parameters:
+            db (Session): A database session.
+            columns (List): The selected columns, including the identifier.
+            chunk_size (int): The number of rows of a chunk.
+
+        Returns:
+            Iterator[List[Dict]]: The chunks of rows.
+    """
+    last_id = 0
+    while True:
+        chunk = [dict(row._mapping) for row in db.execute(
+            select(*columns).where(models.User.id > last_id).order_by(models.User.id).limit(chunk_size)
+        )]
+        if not chunk:
+            return
+
+        yield chunk
+        last_id = chunk[-1]["id"]
+
+def export_users(arguments: argparse.Namespace) -> None:
+    """
+    Exports users to a file chunk by chunk.
+
+        Parameters:
+            arguments (argparse.Namespace): The command line arguments.
+    """
+    columns = [models.User.id, models.User.email]
+    if arguments.with_password_hashes:
+        columns.append(models.User.hashed_password)
+
+    with get_sessionmaker()() as db:
+        exported = write_chunks(
+            arguments.output, arguments.format, [column.key for column in columns],
+            iter_user_chunks(db, columns, arguments.chunk_size)
+        )
+
+    print(json.dumps({"exported": exported}))
+
+def parse_arguments(argv: List[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+        Parameters:
+            argv (List[str] | None): The arguments, defaults to sys.argv.
+
+        Returns:
+            argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.tools.users", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export users to a file")
+    export_parser.add_argument("--output", type=Path, required=True)
+    export_parser.add_argument(
+        "--with-password-hashes", action="store_true",
+        help="Include password hashes, importable wherever PASSWORD_HASH_SCHEMES includes their scheme"
+    )
+    export_parser.set_defaults(handler=export_users)
+
+    import_parser = commands.add_parser("import", help="Import users from a file")
+    import_parser.add_argument("--input", type=Path, required=True)
+    import_parser.add_argument("--hash-plaintext", action="store_true", help="Hash plaintext \"password\" columns")
+    import_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes hashing passwords")
+    import_parser.add_argument("--checkpoint", type=Path, help="File recording the progress of the import")
+    import_parser.set_defaults(handler=import_users)
+
+    for command_parser in (export_parser, import_parser):
+        command_parser.add_argument("--format", choices=FORMATS, required=True)
+        command_parser.add_argument("--chunk-size", type=int, default=5000, help="Rows read and written at once")
+
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    command_arguments = parse_arguments()
+    command_arguments.handler(command_arguments)
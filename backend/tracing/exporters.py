@@ -0,0 +1,114 @@
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from queue import Empty, Full, Queue
+from threading import Thread
+from typing import Dict, List
+
+
+FILE_EXPORTER_MAX_PENDING = 10000
+
+
+class SpanExporter(ABC):
+    """
+    Destination of finished traces. Spans are exported as dictionaries with the field names of the OpenTelemetry
+    data model (trace_id, span_id, parent_span_id, start_time_unix_nano, ...), so they can be loaded by its tools.
+    """
+    @abstractmethod
+    def export(self, spans: List[Dict]) -> None:
+        """
+        Exports the spans of a finished trace.
+
+            Parameters:
+                spans (List[Dict]): The spans, the root span last.
+        """
+
+    def close(self) -> None:
+        """
+        Releases the resources of the exporter.
+        """
+
+
+class MemorySpanExporter(SpanExporter):
+    """
+    Keeps the exported spans in a list, e.g. to inspect them in tests.
+
+        Attributes:
+            spans (List[Dict]): The exported spans, in export order.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize the MemorySpanExporter.
+        """
+        self.spans: List[Dict] = []
+
+    def export(self, spans: List[Dict]) -> None:
+        self.spans.extend(spans)
+
+    def clear(self) -> None:
+        """
+        Forgets the exported spans.
+        """
+        self.spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends the spans to a local file, one JSON object per line, from a background thread, so a traced request
+    never waits for the disk. Traces are handed over through a bounded queue: when the disk can not keep up,
+    new traces are dropped instead of piling up in memory. Pending traces are written in batches,
+    with one flush per batch. Several worker processes can share the file, since every batch is written
+    with a single append.
+
+        Attributes:
+            dropped (int): The number of traces dropped because the queue was full.
+    """
+    def __init__(self, path: str, max_pending: int = FILE_EXPORTER_MAX_PENDING) -> None:
+        """
+        Initialize the FileSpanExporter and start its writer thread.
+
+            Parameters:
+                path (str): The path of the file, created if needed.
+                max_pending (int): The maximum number of traces waiting to be written.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._pending: Queue[List[Dict] | None] = Queue(max_pending)
+        self.dropped = 0
+        self._writer = Thread(target=self._write_pending, name="span-exporter", daemon=True)
+        self._writer.start()
+
+    def export(self, spans: List[Dict]) -> None:
+        try:
+            self._pending.put_nowait(spans)
+        except Full:
+            self.dropped += 1
+
+    def _write_pending(self) -> None:
+        """
+        Writes the pending traces until the exporter is closed.
+        """
+        closed = False
+        while not closed:
+            batch = [self._pending.get()]
+            try:
+                while True:
+                    batch.append(self._pending.get_nowait())
+            except Empty:
+                pass
+
+            closed = None in batch
+            lines = "".join(
+                json.dumps(span, separators=(",", ":")) + "\n" for spans in batch if spans is not None for span in spans
+            )
+            if lines:
+                self._file.write(lines)
+                self._file.flush()
+
+    def close(self) -> None:
+        """
+        Writes the pending traces, stops the writer thread and closes the file.
+        """
+        self._pending.put(None)
+        self._writer.join()
+        self._file.close()
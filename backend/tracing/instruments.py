@@ -0,0 +1,98 @@
+from typing import Any, Callable, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .tracer import get_current_span, get_tracer, reset_current_span, set_current_span
+
+
+SQL_STATEMENT_MAX_LENGTH = 1000
+
+def instrument_engine_tracing(engine: Engine, name: str) -> None:
+    """
+    Records every SQL statement of a sampled trace as a span. Parameters are never recorded,
+    since they hold email addresses and password hashes.
+
+        Parameters:
+            engine (Engine): A (sync) engine, e.g. the sync_engine of an async engine.
+            name (str): The engine label, e.g. "primary".
+    """
+    system = engine.dialect.name
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_span(connection: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        parent = get_current_span()
+        if parent is None:
+            context.tracing_span = None
+            return
+        context.tracing_span = parent.start_child(f"db.{statement[:6].strip().upper() or 'OTHER'}", {
+            "db.system": system,
+            "db.engine": name,
+            "db.statement": statement[:SQL_STATEMENT_MAX_LENGTH],
+        })
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_span(connection: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        if context.tracing_span is not None:
+            context.tracing_span.set_attribute("db.rowcount", cursor.rowcount)
+            context.tracing_span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def fail_span(exception_context: Any) -> None:
+        execution_context = exception_context.execution_context
+        tracing_span = getattr(execution_context, "tracing_span", None)
+        if tracing_span is not None:
+            tracing_span.end(exception_context.original_exception)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware starting a trace per HTTP request, named after the route template (e.g. "POST /users/login")
+    once the route is known. The spans of the request are exported when its response has been sent.
+    Requests pass straight through when tracing is disabled.
+    """
+    def __init__(self, app: Any) -> None:
+        """
+        Initialize the TracingMiddleware.
+
+            Parameters:
+                app (Any): The wrapped ASGI application.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for header, value in scope["headers"]:
+            if header == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        tracer = get_tracer()
+        root_span = tracer.start_trace(scope["method"], traceparent) if tracer is not None else None
+        if root_span is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_status(message: Dict) -> None:
+            if message["type"] == "http.response.start":
+                root_span.set_attribute("http.status_code", message["status"])
+            await send(message)
+
+        root_span.set_attribute("http.method", scope["method"])
+        token = set_current_span(root_span)
+        error = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as exception:
+            error = exception
+            raise
+        finally:
+            reset_current_span(token)
+            route_path = getattr(scope.get("route"), "path", "unmatched")
+            root_span.name = f"{scope['method']} {route_path}"
+            root_span.set_attribute("http.route", route_path)
+            tracer.finish_trace(root_span, error)
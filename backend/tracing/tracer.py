@@ -0,0 +1,276 @@
+import random
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from inspect import iscoroutinefunction
+from time import time_ns
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from ..config import get_settings
+from .exporters import FileSpanExporter, MemorySpanExporter, SpanExporter
+
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: ContextVar["Span | None"] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    Timed operation of a sampled trace. The spans of a trace share the list they are appended to when they end,
+    which is exported once the root span ends.
+
+        Attributes:
+            name (str): The name of the operation.
+            trace_id (str): The identifier of the trace, 32 hexadecimal digits.
+            span_id (str): The identifier of the span, 16 hexadecimal digits.
+            parent_span_id (str | None): The identifier of the parent span, None for a root span without
+                a remote parent.
+            attributes (Dict[str, Any]): The attributes of the span.
+    """
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "attributes", "_start_time", "_trace")
+
+    def __init__(
+        self, name: str, trace_id: str, parent_span_id: str | None, trace: List[Dict],
+        attributes: Dict[str, Any] | None = None
+    ) -> None:
+        """
+        Initialize the Span and start it.
+
+            Parameters:
+                name (str): The name of the operation.
+                trace_id (str): The identifier of the trace.
+                parent_span_id (str | None): The identifier of the parent span.
+                trace (List[Dict]): The finished spans of the trace.
+                attributes (Dict[str, Any] | None): The initial attributes.
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.attributes = attributes or {}
+        self._start_time = time_ns()
+        self._trace = trace
+
+    def start_child(self, name: str, attributes: Dict[str, Any] | None = None) -> "Span":
+        """
+        Starts a span of the same trace whose parent is this span.
+
+            Parameters:
+                name (str): The name of the operation.
+                attributes (Dict[str, Any] | None): The initial attributes.
+
+            Returns:
+                Span: The child span.
+        """
+        return Span(name, self.trace_id, self.span_id, self._trace, attributes)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """
+        Sets an attribute of the span.
+
+            Parameters:
+                key (str): The attribute name, e.g. "http.status_code".
+                value (Any): A JSON-serializable value.
+        """
+        self.attributes[key] = value
+
+    def end(self, error: BaseException | None = None) -> None:
+        """
+        Ends the span and adds it to the finished spans of its trace.
+
+            Parameters:
+                error (BaseException | None): The exception that ended the operation, None if it succeeded.
+        """
+        status = {"code": "OK"}
+        if error is not None:
+            status = {"code": "ERROR", "message": f"{type(error).__name__}: {error}"}
+        self._trace.append({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self._start_time,
+            "end_time_unix_nano": time_ns(),
+            "attributes": self.attributes,
+            "status": status,
+        })
+
+
+class Tracer:
+    """
+    Starts traces with head-based sampling: whether a request is traced is decided once, when its root span starts,
+    and only sampled requests create spans. The others pay a single context variable lookup per instrumented call.
+    A valid W3C "traceparent" header continues the trace of the caller, but its sampled flag is ignored: the header
+    comes from untrusted clients, which could otherwise have every request traced.
+    """
+    def __init__(self, exporter: SpanExporter, sample_rate: float) -> None:
+        """
+        Initialize the Tracer.
+
+            Parameters:
+                exporter (SpanExporter): The destination of finished traces.
+                sample_rate (float): The share of traces sampled, from 0 to 1.
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def start_trace(self, name: str, traceparent: str | None = None) -> Span | None:
+        """
+        Starts the root span of a trace, if the trace is sampled.
+
+            Parameters:
+                name (str): The name of the operation.
+                traceparent (str | None): The "traceparent" header of the caller, if any.
+
+            Returns:
+                Span | None: The root span, None if the trace is not sampled.
+        """
+        if random.random() >= self.sample_rate:
+            return None
+        remote_parent = parse_traceparent(traceparent) if traceparent else None
+        trace_id, parent_span_id = remote_parent[:2] if remote_parent is not None else (None, None)
+        return Span(name, trace_id or f"{random.getrandbits(128):032x}", parent_span_id, [])
+
+    def finish_trace(self, root_span: Span, error: BaseException | None = None) -> None:
+        """
+        Ends the root span and exports the spans of its trace.
+
+            Parameters:
+                root_span (Span): The root span.
+                error (BaseException | None): The exception that ended the operation, None if it succeeded.
+        """
+        root_span.end(error)
+        self.exporter.export(root_span._trace)
+
+
+def parse_traceparent(traceparent: str) -> Tuple[str, str, bool] | None:
+    """
+    Parses a W3C "traceparent" header (version 00).
+
+        Parameters:
+            traceparent (str): The header value.
+
+        Returns:
+            Tuple[str, str, bool] | None: The trace identifier, the parent span identifier and whether the trace
+            is sampled, None if the header is invalid.
+    """
+    match = TRACEPARENT_PATTERN.match(traceparent.strip().lower())
+    if match is None or match[1] == "0" * 32 or match[2] == "0" * 16:
+        return None
+    return match[1], match[2], bool(int(match[3], 16) & 1)
+
+@lru_cache
+def get_tracer() -> Tracer | None:
+    """
+    Returns the tracer configured by the settings.
+
+        Returns:
+            Tracer | None: The tracer, None if tracing is disabled.
+    """
+    settings = get_settings()
+    if not settings.tracing_enabled:
+        return None
+
+    exporter = MemorySpanExporter() if settings.tracing_exporter == "memory" \
+        else FileSpanExporter(settings.tracing_file)
+    return Tracer(exporter, settings.tracing_sample_rate)
+
+def shutdown_tracer() -> None:
+    """
+    Closes the exporter of the tracer created so far, e.g. on shutdown.
+    """
+    if get_tracer.cache_info().currsize and get_tracer() is not None:
+        get_tracer().exporter.close()
+    get_tracer.cache_clear()
+
+def get_current_span() -> Span | None:
+    """
+    Returns the span of the running operation, e.g. to add attributes to it.
+
+        Returns:
+            Span | None: The current span, None if the trace is not sampled.
+    """
+    return _current_span.get()
+
+def set_current_span(current_span: Span | None) -> Any:
+    """
+    Makes a span the current one, e.g. the root span of a request.
+
+        Parameters:
+            current_span (Span | None): The span.
+
+        Returns:
+            Any: The token restoring the previous span with reset_current_span.
+    """
+    return _current_span.set(current_span)
+
+def reset_current_span(token: Any) -> None:
+    """
+    Restores the span that was current before set_current_span.
+
+        Parameters:
+            token (Any): The token returned by set_current_span.
+    """
+    _current_span.reset(token)
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | None]:
+    """
+    Runs the enclosed block as a child span of the current span. Nothing is recorded if the trace is not sampled.
+
+        Parameters:
+            name (str): The name of the operation.
+            **attributes (Any): The initial attributes of the span.
+
+        Returns:
+            Iterator[Span | None]: The span, None if the trace is not sampled.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = parent.start_child(name, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as error:
+        child.end(error)
+        raise
+    else:
+        child.end()
+    finally:
+        _current_span.reset(token)
+
+def traced(function: Callable) -> Callable:
+    """
+    Decorator running every call of a sync or async function as a span named after the function.
+    Calls outside a sampled trace (always the case when tracing is disabled) only pay a context variable lookup,
+    so nothing is decided at import time.
+
+        Parameters:
+            function (Callable): The function to trace.
+
+        Returns:
+            Callable: The traced function.
+    """
+    name = f"{function.__module__.removeprefix('backend.')}.{function.__qualname__}"
+
+    if iscoroutinefunction(function):
+        @wraps(function)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _current_span.get() is None:
+                return await function(*args, **kwargs)
+            with span(name):
+                return await function(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        if _current_span.get() is None:
+            return function(*args, **kwargs)
+        with span(name):
+            return function(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,175 @@
+import json
+from typing import Any, AsyncIterator, Dict, List, Set
+
+from fastapi import Request
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import services
+from .exceptions import EmailAlreadyRegistered, InvalidBulkBody, TooManyRecords
+from .schemas import BulkRegisterOut, BulkRegisterResult, UserIn
+from ..config import get_settings
+from ..utils.security import async_get_hashed_strings
+
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+INVALID_JSON = object()
+
+async def iter_records(request: Request) -> AsyncIterator[Any]:
+    """
+    Reads the records of a bulk request, either a JSON array or NDJSON (one JSON object per line)
+    which is parsed while the body is still streaming in.
+
+        Parameters:
+            request (Request): The incoming request.
+
+        Raises:
+            InvalidBulkBody: If a body that is not NDJSON is not a JSON array.
+
+        Returns:
+            AsyncIterator[Any]: The parsed records, INVALID_JSON for NDJSON lines that are not valid JSON.
+    """
+    if request.headers.get("content-type", "").split(";")[0].strip() not in NDJSON_MEDIA_TYPES:
+        try:
+            records = json.loads(await request.body())
+        except ValueError:
+            raise InvalidBulkBody()
+        if not isinstance(records, list):
+            raise InvalidBulkBody()
+
+        for record in records:
+            yield record
+        return
+
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_json_line(line)
+
+    if buffer.strip():
+        yield _parse_json_line(buffer)
+
+def _parse_json_line(line: bytes) -> Any:
+    """
+    Parses a single NDJSON line.
+
+        Parameters:
+            line (bytes): The line to parse.
+
+        Returns:
+            Any: The parsed record or INVALID_JSON.
+    """
+    try:
+        return json.loads(line)
+    except ValueError:
+        return INVALID_JSON
+
+async def register_users_in_bulk(db: AsyncSession, records: AsyncIterator[Any]) -> BulkRegisterOut:
+    """
+    Registers users in chunks: every chunk is validated, deduplicated in memory, checked against the database
+    with a single IN query, hashed in parallel on all hashing workers and inserted with a multi-row INSERT.
+    All chunks are committed in one transaction, so either every valid record is created or none is.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            records (AsyncIterator[Any]): The records of the request.
+
+        Raises:
+            TooManyRecords: If there are more records than BULK_REGISTER_MAX_RECORDS.
+            EmailAlreadyRegistered: If an email address got registered by another request meanwhile.
+            HashingQueueFull: If the password hashing pool is overloaded.
+
+        Returns:
+            BulkRegisterOut: The outcome of every record.
+    """
+    settings = get_settings()
+    results: List[BulkRegisterResult] = []
+    seen_emails: Set[str] = set()
+    chunk: Dict[int, UserIn] = {}
+
+    try:
+        async for record in records:
+            index = len(results)
+            if index >= settings.bulk_register_max_records:
+                raise TooManyRecords()
+
+            results.append(_validate_record(index, record, seen_emails, chunk))
+            if len(chunk) >= settings.bulk_register_chunk_size:
+                await _register_chunk(db, chunk, results)
+                chunk = {}
+
+        await _register_chunk(db, chunk, results)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise EmailAlreadyRegistered()
+
+    return BulkRegisterOut(
+        created=sum(result.status == "created" for result in results),
+        results=results
+    )
+
+def _validate_record(index: int, record: Any, seen_emails: Set[str], chunk: Dict[int, UserIn]) -> BulkRegisterResult:
+    """
+    Validates a record and adds it to the chunk unless it is invalid or repeats an earlier email address.
+
+        Parameters:
+            index (int): The position of the record in the request.
+            record (Any): The record to validate.
+            seen_emails (Set[str]): The email addresses of the earlier records.
+            chunk (Dict[int, UserIn]): The valid records waiting to be registered, by position.
+
+        Returns:
+            BulkRegisterResult: The preliminary outcome of the record.
+    """
+    email = record.get("email") if isinstance(record, dict) else None
+
+    try:
+        user = UserIn.model_validate(record) if record is not INVALID_JSON else None
+    except ValidationError as error:
+        return BulkRegisterResult(
+            index=index, email=email if isinstance(email, str) else None, status="invalid",
+            errors=[
+                ": ".join(filter(None, [".".join(map(str, detail["loc"])), detail["msg"]]))
+                for detail in error.errors()
+            ]
+        )
+    if user is None:
+        return BulkRegisterResult(index=index, status="invalid", errors=["Record is not a valid JSON object"])
+
+    if user.email in seen_emails:
+        return BulkRegisterResult(index=index, email=user.email, status="duplicate")
+
+    seen_emails.add(user.email)
+    chunk[index] = user
+    return BulkRegisterResult(index=index, email=user.email, status="created")
+
+async def _register_chunk(db: AsyncSession, chunk: Dict[int, UserIn], results: List[BulkRegisterResult]) -> None:
+    """
+    Checks, hashes and inserts a chunk of valid records, updating their outcomes.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            chunk (Dict[int, UserIn]): The valid records by position.
+            results (List[BulkRegisterResult]): The outcomes of all records.
+    """
+    registered_emails = await services.get_registered_emails(db, [user.email for user in chunk.values()])
+    new_users = {}
+    for index, user in chunk.items():
+        if user.email in registered_emails:
+            results[index].status = "already_registered"
+        else:
+            new_users[index] = user
+
+    hashed_passwords = await async_get_hashed_strings([user.password for user in new_users.values()])
+    user_ids = await services.insert_users(db, [
+        {"email": user.email, "hashed_password": hashed_password}
+        for user, hashed_password in zip(new_users.values(), hashed_passwords)
+    ])
+
+    for index, user in new_users.items():
+        results[index].id = user_ids[user.email]
@@ -0,0 +1,76 @@
+import asyncio
+
+from sqlalchemy import select
+
+from .. import models
+from ..database.configuration import get_async_sessionmaker
+from ..utils.bloom import BloomFilter
+
+
+class RegisteredEmailFilter:
+    """
+    Bloom filter of the registered email addresses of this worker, which tells that an address is
+    likely not registered without touching the database. It is filled in the background on first use
+    and is told about every address registered by this worker meanwhile. Addresses registered by
+    other workers, by the import tool or directly in the database are only seen after a restart,
+    so "not registered" is a hint: it may only skip a lookup whose answer the unique constraint
+    of the users table checks anyway (e.g. before a registration), never answer a caller.
+
+        Attributes:
+            bloom (BloomFilter): The registered email addresses.
+            ready (bool): Whether all registered email addresses were loaded.
+    """
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """
+        Initialize the RegisteredEmailFilter.
+
+            Parameters:
+                capacity (int): The number of email addresses the filter is sized for.
+                error_rate (float): The false positive rate at full capacity.
+        """
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.ready = False
+        self._loading: asyncio.Task | None = None
+
+    def start_loading(self) -> None:
+        """
+        Starts loading the registered email addresses in the background, unless it already started.
+        """
+        if self._loading is None:
+            self._loading = asyncio.get_running_loop().create_task(self._load())
+
+    async def _load(self) -> None:
+        """
+        Streams the registered email addresses into the filter. A failed load is retried on the next use.
+        """
+        try:
+            async with get_async_sessionmaker()() as db:
+                emails = await db.stream_scalars(select(models.User.email).execution_options(yield_per=10000))
+                async for email in emails:
+                    self.bloom.add(email)
+        except Exception:
+            self._loading = None
+            raise
+        self.ready = True
+
+    def add(self, email: str) -> None:
+        """
+        Records a registered email address.
+
+            Parameters:
+                email (str): The email address.
+        """
+        self.bloom.add(email)
+
+    def is_definitely_available(self, email: str) -> bool:
+        """
+        Checks whether an email address was not registered by this worker or before it started.
+
+            Parameters:
+                email (str): The email address.
+
+            Returns:
+                bool: True if the address is not known as registered, False if it may be or the filter is still loading.
+        """
+        self.start_loading()
+        return self.ready and email not in self.bloom
@@ -1,5 +1,7 @@
 from fastapi import HTTPException, status
 
+from ..utils.responses import encode_detail
+
 
 class EmailAlreadyRegistered(HTTPException):
     """
@@ -8,15 +10,63 @@ class EmailAlreadyRegistered(HTTPException):
         Attributes:
             STATUS_CODE (int): The HTTP status code for this exception, set to 409 CONFLICT.
             DETAIL (str): The detailed error message indicating that the email is already registered.
+            BODY (bytes): The pre-encoded body of the error response.
     """
     STATUS_CODE = status.HTTP_409_CONFLICT
     DETAIL = {
         "loc": ["body", "email"],
         "msg": "Email address is already registered"
     }
+    BODY = encode_detail(DETAIL)
 
     def __init__(self) -> None:
         """
         Initialize the EmailAlreadyRegistered exception.
         """
         super().__init__(status_code=self.STATUS_CODE, detail=self.DETAIL)
+
+
+class TooManyRecords(HTTPException):
+    """
+    Custom exception class for indicating that a bulk request contains more records than allowed.
+
+        Attributes:
+            STATUS_CODE (int): The HTTP status code for this exception, set to 413 Payload Too Large.
+            DETAIL (str): The detailed error message indicating that there are too many records.
+            BODY (bytes): The pre-encoded body of the error response.
+    """
+    STATUS_CODE = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    DETAIL = {
+        "loc": ["body"],
+        "msg": "Too many records in a single request"
+    }
+    BODY = encode_detail(DETAIL)
+
+    def __init__(self) -> None:
+        """
+        Initialize the TooManyRecords exception.
+        """
+        super().__init__(status_code=self.STATUS_CODE, detail=self.DETAIL)
+
+
+class InvalidBulkBody(HTTPException):
+    """
+    Custom exception class for indicating that the body of a bulk request is not a JSON array.
+
+        Attributes:
+            STATUS_CODE (int): The HTTP status code for this exception, set to 400 Bad Request.
+            DETAIL (str): The detailed error message indicating that the body is malformed.
+            BODY (bytes): The pre-encoded body of the error response.
+    """
+    STATUS_CODE = status.HTTP_400_BAD_REQUEST
+    DETAIL = {
+        "loc": ["body"],
+        "msg": "Body must be a JSON array of records or NDJSON"
+    }
+    BODY = encode_detail(DETAIL)
+
+    def __init__(self) -> None:
+        """
+        Initialize the InvalidBulkBody exception.
+        """
+        super().__init__(status_code=self.STATUS_CODE, detail=self.DETAIL)
@@ -1,17 +1,24 @@
-from fastapi import APIRouter, Depends, status
+from typing import Dict
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from datetime import timedelta
-from os import getenv
-
-from backend.users import services
-from backend.users.exceptions import EmailAlreadyRegistered
-from .schemas import UserIn, UserOut
-from ..dependencies import get_db, get_current_user
+from pydantic import EmailStr
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.users import bulk, services
+from backend.users.exceptions import EmailAlreadyRegistered, InvalidBulkBody, TooManyRecords
+from .schemas import BulkRegisterOut, EmailAvailabilityOut, UserIn, UserOut, UserPage, UserSearchPage
+from ..dependencies import get_admin, get_db, get_current_token_claims, get_current_user, \
+    limit_login_attempts
 from ..utils import responses
-from ..authentication.schemas import Tokens, AccessToken
-from ..authentication.exceptions import IncorrectEmailOrPassword, InvalidCredentials
-from ..authentication.services import authenticate_user, create_token, decode_token, authenticate_refresh_token
+from ..utils.exceptions import HashingQueueFull
+from ..tracing.tracer import traced
+from ..authentication.schemas import Tokens
+from ..authentication.exceptions import AdminAccessRequired, IncorrectEmailOrPassword, InvalidCredentials, \
+    TooManyLoginAttempts
+from ..authentication.services import authenticate_user, end_all_sessions, end_session, refresh_session, \
+    start_session
 
 
 router = APIRouter(
@@ -45,29 +52,286 @@ router = APIRouter(
             "description": "Already registered email address",
             **responses.build_example_response(EmailAlreadyRegistered.DETAIL)
         },
+        HashingQueueFull.STATUS_CODE: {
+            "description": "Server is busy",
+            **responses.build_example_response(HashingQueueFull.DETAIL, HashingQueueFull.HEADERS)
+        },
     },
     response_description="User created successfully",
     status_code=status.HTTP_201_CREATED
 )
-async def create_user(user: UserIn, db: Session = Depends(get_db)):
+@traced
+async def create_user(user: UserIn, db: AsyncSession = Depends(get_db)):
     """
     Creates a new user and adds it to the database if the email is not already registered and the password is strong.
 
         Parameters:
             user (UserIn): Input data to create a user (email and password).
-            db (Session): A database session. Defaults to Depends(get_db).
+            db (AsyncSession): A database session. Defaults to Depends(get_db).
 
         Raises:
             EmailAlreadyRegistered: If the email is already registered.
+            HashingQueueFull: If the password hashing pool is overloaded.
 
         Returns:
             UserOut: Main information about the created user.
     """
-    db_user = services.get_user_by_email(db, user.email)
-    if db_user:
+    # The unique constraint decides, the lookup only saves hashing the password of an address
+    # that the email filter reports as possibly registered. A stale filter only costs a hash.
+    email_filter = services.get_email_filter()
+    if email_filter is not None and not email_filter.is_definitely_available(user.email) \
+            and not await services.is_email_available(db, user.email):
+        raise EmailAlreadyRegistered()
+
+    try:
+        created_user = await services.create_user(db, user)
+    except IntegrityError:
+        await db.rollback()
         raise EmailAlreadyRegistered()
 
-    return services.create_user(db, user)
+    return responses.model_response(created_user, status_code=status.HTTP_201_CREATED)
+
+
+@router.get(
+    "/email-available",
+    summary="Check whether an email address is available",
+    description="""
+    <h1>Checks whether an email address can still be registered:</h1>
+
+    email: The email address to check.
+
+    Meant to be called while the user types, every address is answered by a lookup of the email index.
+    """,
+    response_model=EmailAvailabilityOut,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Successfully checked the email address"
+        },
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {
+            "description": "Invalid email address",
+        }
+    },
+    response_description="Successfully checked the email address",
+    status_code=status.HTTP_200_OK
+)
+@traced
+async def check_email_availability(email: EmailStr = Query(...), db: AsyncSession = Depends(get_db)):
+    """
+    Checks whether an email address is not registered yet.
+
+        Parameters:
+            email (EmailStr): The email address to check.
+            db (AsyncSession): A database session. Defaults to Depends(get_db).
+
+        Returns:
+            EmailAvailabilityOut: The email address and whether it is available.
+    """
+    return {"email": email, "available": await services.is_email_available(db, email)}
+
+
+@router.post(
+    "/register/bulk",
+    summary="Register many users at once",
+    description="""
+    <h1>Creates users from a list of records, each with the same fields as a single registration:</h1>
+
+    The body is either a JSON array or NDJSON (Content-Type: application/x-ndjson, one JSON object per line).
+    Requires the admin key in the X-Admin-Key header.
+
+    Every record gets its own result:
+        - created: the user was created,
+        - duplicate: the email address already appeared earlier in the request,
+        - already_registered: the email address is already registered,
+        - invalid: the record is not a valid email address and password.
+    """,
+    response_model=BulkRegisterOut,
+    responses={
+        status.HTTP_201_CREATED: {
+            "description": "Records processed successfully",
+        },
+        AdminAccessRequired.STATUS_CODE: {
+            "description": "Missing or invalid admin key",
+            **responses.build_example_response(AdminAccessRequired.DETAIL)
+        },
+        EmailAlreadyRegistered.STATUS_CODE: {
+            "description": "An email address got registered during the import, no user was created",
+            **responses.build_example_response(EmailAlreadyRegistered.DETAIL)
+        },
+        InvalidBulkBody.STATUS_CODE: {
+            "description": "The body is not a JSON array or NDJSON",
+            **responses.build_example_response(InvalidBulkBody.DETAIL)
+        },
+        TooManyRecords.STATUS_CODE: {
+            "description": "Too many records in a single request",
+            **responses.build_example_response(TooManyRecords.DETAIL)
+        },
+        HashingQueueFull.STATUS_CODE: {
+            "description": "Server is busy",
+            **responses.build_example_response(HashingQueueFull.DETAIL, HashingQueueFull.HEADERS)
+        },
+    },
+    response_description="Records processed successfully",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(get_admin)]
+)
+@traced
+async def create_users_in_bulk(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Creates users from a JSON array or a streamed NDJSON body in a single transaction.
+
+        Parameters:
+            request (Request): The request whose body contains the records.
+            db (AsyncSession): A database session. Defaults to Depends(get_db).
+
+        Raises:
+            InvalidBulkBody: If the body is neither a JSON array nor NDJSON.
+            TooManyRecords: If the request contains more records than allowed.
+            EmailAlreadyRegistered: If an email address got registered by another request meanwhile.
+            HashingQueueFull: If the password hashing pool is overloaded.
+
+        Returns:
+            BulkRegisterOut: The outcome of every record.
+    """
+    return await bulk.register_users_in_bulk(db, bulk.iter_records(request))
+
+
+@router.get(
+    "/admin/list",
+    summary="List users",
+    description="""
+    <h1>Lists users ordered by identifier, one page at a time:</h1>
+
+    after_id: The next_after_id of the previous page, 0 (default) for the first page.
+    limit: The maximum number of users of the page.
+
+    Every page costs the same, however deep it is. Requires the admin key in the X-Admin-Key header.
+    """,
+    response_model=UserPage,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Successfully listed the users"
+        },
+        AdminAccessRequired.STATUS_CODE: {
+            "description": "Missing or invalid admin key",
+            **responses.build_example_response(AdminAccessRequired.DETAIL)
+        },
+    },
+    response_description="Successfully listed the users",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(get_admin)]
+)
+@traced
+async def list_users(
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Lists a page of users ordered by identifier. One extra user is fetched to know whether a next page exists.
+
+        Parameters:
+            after_id (int): The identifier of the last user of the previous page. Defaults to 0.
+            limit (int): The maximum number of users. Defaults to 100.
+            db (AsyncSession): A database session. Defaults to Depends(get_db).
+
+        Returns:
+            UserPage: The users of the page and the cursor of the next page.
+    """
+    users = await services.list_users(db, after_id, limit + 1)
+    next_after_id = users[limit - 1].id if len(users) > limit else None
+    return responses.model_response(UserPage.model_construct(users=users[:limit], next_after_id=next_after_id))
+
+
+@router.get(
+    "/admin/search",
+    summary="Search users by email address",
+    description="""
+    <h1>Searches users whose email address starts with a prefix, ordered by email address, one page at a time:</h1>
+
+    email_prefix: The beginning of the email addresses (case-sensitive).
+    after_email: The next_after_email of the previous page, omitted for the first page.
+    limit: The maximum number of users of the page.
+
+    The search uses the email index and every page costs the same. Requires the admin key in the X-Admin-Key header.
+    """,
+    response_model=UserSearchPage,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Successfully searched the users"
+        },
+        AdminAccessRequired.STATUS_CODE: {
+            "description": "Missing or invalid admin key",
+            **responses.build_example_response(AdminAccessRequired.DETAIL)
+        },
+    },
+    response_description="Successfully searched the users",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(get_admin)]
+)
+@traced
+async def search_users(
+    email_prefix: str = Query(..., min_length=1, max_length=320),
+    after_email: str | None = Query(None, max_length=320),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Searches a page of users by email address prefix. One extra user is fetched to know whether a next page exists.
+
+        Parameters:
+            email_prefix (str): The beginning of the email addresses.
+            after_email (str | None): The email address of the last user of the previous page. Defaults to None.
+            limit (int): The maximum number of users. Defaults to 100.
+            db (AsyncSession): A database session. Defaults to Depends(get_db).
+
+        Returns:
+            UserSearchPage: The users of the page and the cursor of the next page.
+    """
+    users = await services.search_users_by_email_prefix(db, email_prefix, after_email, limit + 1)
+    next_after_email = users[limit - 1].email if len(users) > limit else None
+    return responses.model_response(
+        UserSearchPage.model_construct(users=users[:limit], next_after_email=next_after_email)
+    )
+
+
+@router.get(
+    "/admin/export",
+    summary="Export users",
+    description="""
+    <h1>Streams all users ordered by identifier as NDJSON (one JSON object per line):</h1>
+
+    email_prefix: Only exports users whose email address starts with it (case-sensitive), optional.
+
+    Users are read from a server-side cursor, so the export takes constant memory.
+    Requires the admin key in the X-Admin-Key header.
+    """,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Successfully started the export",
+            "content": {responses.NDJSON_MEDIA_TYPE: {"example": '{"id":1,"email":"user@example.com"}\n'}}
+        },
+        AdminAccessRequired.STATUS_CODE: {
+            "description": "Missing or invalid admin key",
+            **responses.build_example_response(AdminAccessRequired.DETAIL)
+        },
+    },
+    response_description="Successfully started the export",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(get_admin)]
+)
+@traced
+async def export_users(email_prefix: str | None = Query(None, min_length=1, max_length=320)):
+    """
+    Streams the users as NDJSON. The lookups use their own session, which lives as long as the response.
+
+        Parameters:
+            email_prefix (str | None): The beginning of the email addresses. Defaults to None.
+
+        Returns:
+            StreamingResponse: The NDJSON response.
+    """
+    return responses.ndjson_response(services.stream_users(email_prefix))
 
 
 @router.post(
@@ -90,60 +354,58 @@ async def create_user(user: UserIn, db: Session = Depends(get_db)):
                 IncorrectEmailOrPassword.DETAIL,
                 IncorrectEmailOrPassword.HEADERS
             )
+        },
+        TooManyLoginAttempts.STATUS_CODE: {
+            "description": "Too many login attempts",
+            **responses.build_example_response(TooManyLoginAttempts.DETAIL, TooManyLoginAttempts.HEADERS)
+        },
+        HashingQueueFull.STATUS_CODE: {
+            "description": "Server is busy",
+            **responses.build_example_response(HashingQueueFull.DETAIL, HashingQueueFull.HEADERS)
         }
     },
     response_description="Successfully created an access token, a refresh token and authenticated the user",
-    status_code=status.HTTP_200_OK
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(limit_login_attempts)]
 )
-async def login_for_tokens(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+@traced
+async def login_for_tokens(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
-    Authenticates the user and creates an access token and a refresh token.
+    Authenticates the user and starts a new session with an access token and a refresh token.
+    An outdated password hash is replaced by a background job, so the response does not wait for it.
 
         Parameters:
             form_data (UserIn): User input data containing email and password for authentication.
-            db (Session): A database session. Defaults to Depends(get_db).
+            db (AsyncSession): A database session. Defaults to Depends(get_db).
 
         Raises:
             IncorrectEmailOrPassword: If the user with entered email and password does not exist.
+            TooManyLoginAttempts: If too many login attempts were made from the IP address or for the email address.
+            HashingQueueFull: If the password hashing pool is overloaded.
 
         Returns:
             Tokens: A dictionary containing the created refresh token, access token and its type.
     """
-    if not authenticate_user(db, email=form_data.username, password=form_data.password):
+    user = await authenticate_user(db, email=form_data.username, password=form_data.password)
+    if user is None:
         raise IncorrectEmailOrPassword()
 
-    user = services.get_user_by_email(db, email=form_data.username)
-
-    access_token_expires = timedelta(minutes=float(getenv("ACCESS_TOKEN_EXPIRE_MINUTES")))
-    access_token = create_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
-    )
-
-    refresh_token_expires = timedelta(minutes=float(getenv("REFRESH_TOKEN_EXPIRE_MINUTES")))
-    refresh_token = create_token(
-        data={"sub": str(user.id)}, expires_delta=refresh_token_expires
-    )
-    services.hash_and_save_refresh_token_in_db(db, user.id, refresh_token)
-
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    return responses.json_response(await start_session(db, user))
 
 
 @router.get(
     "/refresh",
-    summary="Refresh the access token",
+    summary="Refresh the tokens",
     description="""
-    <h1>Refreshes the access token from the provided information:</h1>
+    <h1>Refreshes the access token and rotates the refresh token from the provided information:</h1>
     
-    refresh_token: The correct refresh token.
+    refresh_token: The current refresh token of the session. It can be used once,
+    the returned refresh token replaces it. Presenting a used refresh token ends the session.
     """,
-    response_model=AccessToken,
+    response_model=Tokens,
     responses={
         status.HTTP_200_OK: {
-            "description": "Successfully refreshed access token"
+            "description": "Successfully refreshed access token and rotated refresh token"
         },
         InvalidCredentials.STATUS_CODE: {
             "description": "Invalid credentials",
@@ -153,35 +415,101 @@ async def login_for_tokens(form_data: OAuth2PasswordRequestForm = Depends(), db:
             )
         }
     },
-    response_description="Successfully refreshed access token",
+    response_description="Successfully refreshed access token and rotated refresh token",
     status_code=status.HTTP_200_OK
 )
-async def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)):
+@traced
+async def refresh_access_token(refresh_token: str, db: AsyncSession = Depends(get_db)):
     """
-    Based on the refresh token, it creates an access token if the refresh token is correct.
+    Based on the refresh token, it creates an access token and a new refresh token if the refresh token is correct.
 
         Parameters:
-            refresh_token (str): A refresh token. Defaults to Depends(oauth2_bearer).
-            db (Session): A database session. Defaults to Depends(get_db).
+            refresh_token (str): The current refresh token of the session.
+            db (AsyncSession): A database session. Defaults to Depends(get_db).
 
         Raises:
-            InvalidCredentials: If the refresh token is incorrect.
+            InvalidCredentials: If the refresh token is incorrect, already used or its session ended.
 
         Returns:
-            AccessToken: An access token and its type.
+            Tokens: A dictionary containing the new refresh token, access token and its type.
     """
-    decoded_refresh_token = decode_token(refresh_token)
-    user_id = decoded_refresh_token.get("sub")
+    return responses.json_response(await refresh_session(db, refresh_token))
 
-    if authenticate_refresh_token(db, user_id, refresh_token):
-        access_token_expires = timedelta(minutes=float(getenv("ACCESS_TOKEN_EXPIRE_MINUTES")))
-        new_access_token = create_token(
-            data={"sub": user_id}, expires_delta=access_token_expires
-        )
 
-        return {"access_token": new_access_token, "token_type": "bearer"}
+@router.post(
+    "/logout",
+    summary="Log out",
+    description="""
+    <h1>Ends the session of the provided access token.</h1>
+    
+    Its refresh token stops working and its access tokens are revoked.
+    """,
+    responses={
+        status.HTTP_204_NO_CONTENT: {
+            "description": "Successfully ended the session"
+        },
+        InvalidCredentials.STATUS_CODE: {
+            "description": "Invalid credentials",
+            **responses.build_example_response(
+                InvalidCredentials.DETAIL,
+                InvalidCredentials.HEADERS
+            )
+        }
+    },
+    response_description="Successfully ended the session",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+@traced
+async def logout(claims: Dict = Depends(get_current_token_claims), db: AsyncSession = Depends(get_db)) -> None:
+    """
+    Ends the session of the current access token.
+
+        Parameters:
+            claims (Dict): The decoded access token claims. Defaults to Depends(get_current_token_claims).
+            db (AsyncSession): A database session. Defaults to Depends(get_db).
+
+        Raises:
+            InvalidCredentials: If the access token is incorrect or revoked.
+    """
+    await end_session(db, claims)
+
+
+@router.post(
+    "/logout-all",
+    summary="Log out from all devices",
+    description="""
+    <h1>Ends every session of the current user.</h1>
+    
+    All refresh tokens stop working and all access tokens issued until now are revoked.
+    """,
+    responses={
+        status.HTTP_204_NO_CONTENT: {
+            "description": "Successfully ended all sessions"
+        },
+        InvalidCredentials.STATUS_CODE: {
+            "description": "Invalid credentials",
+            **responses.build_example_response(
+                InvalidCredentials.DETAIL,
+                InvalidCredentials.HEADERS
+            )
+        }
+    },
+    response_description="Successfully ended all sessions",
+    status_code=status.HTTP_204_NO_CONTENT
+)
+@traced
+async def logout_all(claims: Dict = Depends(get_current_token_claims), db: AsyncSession = Depends(get_db)) -> None:
+    """
+    Ends every session of the current user.
+
+        Parameters:
+            claims (Dict): The decoded access token claims. Defaults to Depends(get_current_token_claims).
+            db (AsyncSession): A database session. Defaults to Depends(get_db).
 
-    raise InvalidCredentials()
+        Raises:
+            InvalidCredentials: If the access token is incorrect or revoked.
+    """
+    await end_all_sessions(db, int(claims["sub"]))
 
 
 @router.get(
@@ -205,6 +533,7 @@ async def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)
     response_description="Successfully obtained an authenticated user",
     status_code=status.HTTP_200_OK
 )
+@traced
 async def get_me(user: UserOut = Depends(get_current_user)):
     """
     Gets the currently authenticated user.
@@ -215,4 +544,4 @@ async def get_me(user: UserOut = Depends(get_current_user)):
         Returns:
             user (UserOut): Main information about the current user.
     """
-    return user
+    return responses.model_response(user)
@@ -1,3 +1,4 @@
+from typing import List, Literal
 from pydantic import BaseModel, EmailStr, field_validator, Field
 import re
 
@@ -60,6 +61,17 @@ class UserOut(UserBase):
     id: int = Field(..., examples=[1])
 
 
+class EmailAvailabilityOut(UserBase):
+    """
+    Class representing whether an email address can still be registered.
+
+        Parameters:
+            email (EmailStr): The checked email address (inherited from UserBase).
+            available (bool): Whether the email address is not registered yet.
+    """
+    available: bool = Field(..., examples=[True])
+
+
 class UserInDB(UserBase):
     """
     Class representing user data stored in the database.
@@ -71,4 +83,57 @@ class UserInDB(UserBase):
     """
     id: int = Field(..., examples=[1])
     hashed_password: str = Field(..., examples=["Userexamplehashedpassword123"])
-    hashed_refresh_token: str = Field(..., examples=["Userexamplehashedrefreshtoken123"])
+
+
+class BulkRegisterResult(BaseModel):
+    """
+    Class representing the outcome of a single record of a bulk registration.
+
+        Parameters:
+            index (int): The position of the record in the request.
+            email (str | None): The email address of the record, if it could be read.
+            status (str): "created", "duplicate" (repeated in the request), "already_registered" or "invalid".
+            id (int | None): The identifier of the created user.
+            errors (List[str] | None): Validation errors of an invalid record.
+    """
+    index: int = Field(..., examples=[0])
+    email: str | None = Field(None, examples=["user@example.com"])
+    status: Literal["created", "duplicate", "already_registered", "invalid"] = Field(..., examples=["created"])
+    id: int | None = Field(None, examples=[1])
+    errors: List[str] | None = Field(None, examples=[None])
+
+
+class BulkRegisterOut(BaseModel):
+    """
+    Class representing the outcome of a bulk registration.
+
+        Parameters:
+            created (int): The number of created users.
+            results (List[BulkRegisterResult]): The outcome of every record, in the request order.
+    """
+    created: int = Field(..., examples=[1])
+    results: List[BulkRegisterResult]
+
+
+class UserPage(BaseModel):
+    """
+    Class representing a page of users ordered by identifier.
+
+        Parameters:
+            users (List[UserOut]): The users of the page.
+            next_after_id (int | None): The after_id of the next page, None on the last page.
+    """
+    users: List[UserOut]
+    next_after_id: int | None = Field(None, examples=[100])
+
+
+class UserSearchPage(BaseModel):
+    """
+    Class representing a page of users found by email address prefix, ordered by email address.
+
+        Parameters:
+            users (List[UserOut]): The users of the page.
+            next_after_email (str | None): The after_email of the next page, None on the last page.
+    """
+    users: List[UserOut]
+    next_after_email: str | None = Field(None, examples=["user@example.com"])
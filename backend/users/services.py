@@ -1,74 +1,319 @@
-from sqlalchemy.orm import Session
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Set
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import EmailStr
 
 from .. import models
+from ..config import get_settings
+from ..database.configuration import get_async_sessionmaker
+from ..database.routing import is_reading_replica, mark_recent_write, use_primary, use_primary_if_recent
+from ..metrics.instruments import timed
+from .email_filter import RegisteredEmailFilter
 from .schemas import UserIn, UserInDB, UserOut
-from ..utils.security import get_hashed_string
+from ..utils.cache import Cache, build_cache
+from ..utils.security import async_get_hashed_string
 
 
-def get_user_by_email(db: Session, email: EmailStr) -> UserInDB | None:
+@lru_cache
+def get_user_cache() -> Cache:
     """
-    Retrieves a user by his email address.
+    Returns the cache placed in front of user lookups by identifier, configured by the settings.
+
+        Returns:
+            Cache: The user cache.
+    """
+    settings = get_settings()
+    return build_cache(
+        settings.user_cache_backend,
+        max_size=settings.user_cache_max_size,
+        ttl=settings.user_cache_ttl_seconds
+    )
+
+@lru_cache
+def get_email_filter() -> RegisteredEmailFilter | None:
+    """
+    Returns the filter of registered email addresses, configured by the settings.
+
+        Returns:
+            RegisteredEmailFilter | None: The email filter, None if it is disabled.
+    """
+    settings = get_settings()
+    if not settings.email_filter_capacity:
+        return None
+    return RegisteredEmailFilter(settings.email_filter_capacity, settings.email_filter_error_rate)
+
+@timed
+async def get_user_by_email(db: AsyncSession, email: EmailStr) -> UserInDB | None:
+    """
+    Retrieves a user by his email address. A user missing from a replica is looked up again on the primary,
+    since he may have just registered through another worker.
 
         Parameters:
-            db (Session): A database session.
+            db (AsyncSession): A database session.
             email (EmailStr): An email address of the user to retrieve.
 
         Returns:
             UserInDB | None: The retrieved user if found, otherwise None.
         """
-    return db.query(models.User).filter(models.User.email == email).first()
+    use_primary_if_recent(db, ("email", email))
+    statement = select(models.User).where(models.User.email == email)
+    user = (await db.execute(statement)).scalars().first()
+    if user is None and is_reading_replica(db):
+        use_primary(db)
+        user = (await db.execute(statement)).scalars().first()
+    return user
 
-def get_user_by_id(db: Session, user_id: int) -> UserInDB | None:
+@timed
+async def get_user_by_id(db: AsyncSession, user_id: int) -> UserInDB | None:
     """
-    Retrieves a user by his identifier.
+    Retrieves a user by his identifier. A user missing from a replica is looked up again on the primary.
 
     Parameters:
-        db (Session): A database session.
+        db (AsyncSession): A database session.
         user_id (int): An identifier of the user to retrieve.
 
     Returns:
         UserInDB | None: The retrieved user if found, otherwise None.
     """
-    return db.query(models.User).filter(models.User.id == user_id).first()
+    use_primary_if_recent(db, ("user", user_id))
+    statement = select(models.User).where(models.User.id == user_id)
+    user = (await db.execute(statement)).scalars().first()
+    if user is None and is_reading_replica(db):
+        use_primary(db)
+        user = (await db.execute(statement)).scalars().first()
+    return user
+
+@timed
+async def get_cached_user_by_id(db: AsyncSession, user_id: int) -> UserOut | None:
+    """
+    Retrieves main information about a user by his identifier, using the user cache when possible.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            user_id (int): An identifier of the user to retrieve.
+
+        Returns:
+            UserOut | None: The retrieved user if found, otherwise None.
+    """
+    user_cache = get_user_cache()
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    db_user = await get_user_by_id(db, user_id)
+    if db_user is None:
+        return None
+
+    user = UserOut.model_validate(db_user, from_attributes=True)
+    user_cache.set(user_id, user)
+    return user
 
-def create_user(db: Session, user: UserIn) -> UserOut:
+@timed
+async def create_user(db: AsyncSession, user: UserIn) -> UserOut:
     """
-    Creates a new user.
+    Creates a new user. The identifier is fetched by the INSERT itself, so no refresh is needed.
 
         Parameters:
-            db (Session): A database session.
+            db (AsyncSession): A database session.
             user (UserIn): User input data including email and password.
 
+        Raises:
+            IntegrityError: If the email address is already registered.
+
         Returns:
             UserOut: Main information about the created user.
     """
-    hashed_password = get_hashed_string(user.password)
+    hashed_password = await async_get_hashed_string(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password)
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    get_user_cache().delete(db_user.id)
+    mark_recent_write(("user", db_user.id), ("email", db_user.email))
+
+    email_filter = get_email_filter()
+    if email_filter is not None:
+        email_filter.add(db_user.email)
 
-    return db_user
+    return UserOut.model_construct(id=db_user.id, email=db_user.email)
 
-def hash_and_save_refresh_token_in_db(db: Session, user_id: int, refresh_token: str) -> UserOut:
+@timed
+async def is_email_available(db: AsyncSession, email: str) -> bool:
     """
-    Saves a hashed user refresh token in the database.
+    Checks whether an email address is not registered yet, through the email index. The email filter is not
+    consulted: it misses the addresses registered by other workers, so it can not tell that an address is free.
 
         Parameters:
-            db (Session): A database session.
-            user_id (int): An identifier of the user whose refresh token we want to save in the database.
-            refresh_token (str): User refresh token that we want to save in the database.
+            db (AsyncSession): A database session.
+            email (str): The email address to check.
 
         Returns:
-            UserOut: Main information about the user whose refresh token we have saved in the database.
+            bool: True if the email address is not registered, False otherwise.
     """
-    db_user = get_user_by_id(db, user_id)
-    db_user.hashed_refresh_token = get_hashed_string(refresh_token)
+    use_primary_if_recent(db, ("email", email))
+    result = await db.execute(select(models.User.id).where(models.User.email == email))
+    return result.first() is None
 
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+@timed
+async def get_registered_emails(db: AsyncSession, emails: List[str]) -> Set[str]:
+    """
+    Checks which of the email addresses are already registered, with a single query. Every address is queried
+    on the primary, since the inserts that follow in the same transaction rely on the answer and a replica
+    may lack the addresses just registered through any worker.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            emails (List[str]): Email addresses to check.
+
+        Returns:
+            Set[str]: The registered email addresses.
+    """
+    if not emails:
+        return set()
+
+    use_primary(db)
+
+    result = await db.execute(select(models.User.email).where(models.User.email.in_(emails)))
+    return set(result.scalars())
+
+@timed
+async def insert_users(db: AsyncSession, users: List[Dict[str, str]]) -> Dict[str, int]:
+    """
+    Inserts users with a multi-row INSERT. The transaction is left open for the caller to commit.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            users (List[Dict[str, str]]): Rows with "email" and "hashed_password".
+
+        Returns:
+            Dict[str, int]: The identifiers of the inserted users by email address.
+    """
+    if not users:
+        return {}
+
+    result = await db.execute(insert(models.User).returning(models.User.id, models.User.email), users)
+    user_ids = {email: user_id for user_id, email in result}
+    mark_recent_write(*(("email", email) for email in user_ids), *(("user", user_id) for user_id in user_ids.values()))
+
+    email_filter = get_email_filter()
+    if email_filter is not None:
+        for email in user_ids:
+            email_filter.add(email)
+
+    return user_ids
+
+@timed
+async def update_hashed_password(
+    db: AsyncSession, user_id: int, hashed_password: str, new_hashed_password: str
+) -> bool:
+    """
+    Replaces the password hash of a user, unless the password was changed meanwhile.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            user_id (int): An identifier of the user.
+            hashed_password (str): The hash the new hash replaces.
+            new_hashed_password (str): The new hash of the same password.
+
+        Returns:
+            bool: True if the hash was replaced, False otherwise.
+    """
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id, models.User.hashed_password == hashed_password)
+        .values(hashed_password=new_hashed_password)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+def get_email_prefix_range(prefix: str) -> Dict[str, str]:
+    """
+    Turns an email address prefix into a range of the email index: the addresses starting with the prefix
+    are the ones from the prefix (inclusive) to the prefix with its last character incremented (exclusive).
+    Unlike LIKE, the range is always answered from the index.
+
+        Parameters:
+            prefix (str): A non-empty email address prefix.
+
+        Returns:
+            Dict[str, str]: The "start" of the range and its "end", missing if the range is unbounded.
+    """
+    if ord(prefix[-1]) == 0x10FFFF:
+        return {"start": prefix}
+    return {"start": prefix, "end": prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+
+@timed
+async def list_users(db: AsyncSession, after_id: int, limit: int) -> List[UserOut]:
+    """
+    Retrieves a page of users ordered by identifier, seeking to the first identifier after the cursor
+    through the primary key, so every page costs the same no matter how deep it is.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            after_id (int): The identifier of the last user of the previous page, 0 for the first page.
+            limit (int): The maximum number of users.
+
+        Returns:
+            List[UserOut]: The users of the page.
+    """
+    result = await db.execute(
+        select(models.User.id, models.User.email)
+        .where(models.User.id > after_id)
+        .order_by(models.User.id)
+        .limit(limit)
+    )
+    return [UserOut.model_construct(id=user_id, email=email) for user_id, email in result]
+
+@timed
+async def search_users_by_email_prefix(
+    db: AsyncSession, prefix: str, after_email: str | None, limit: int
+) -> List[UserOut]:
+    """
+    Retrieves a page of users whose email address starts with a prefix (case-sensitive), ordered by email address
+    and seeking through the email index, so every page costs the same no matter how deep it is.
+
+        Parameters:
+            db (AsyncSession): A database session.
+            prefix (str): A non-empty email address prefix.
+            after_email (str | None): The email address of the last user of the previous page, None for the first page.
+            limit (int): The maximum number of users.
+
+        Returns:
+            List[UserOut]: The users of the page.
+    """
+    prefix_range = get_email_prefix_range(prefix)
+    statement = select(models.User.id, models.User.email).where(models.User.email >= prefix_range["start"])
+    if "end" in prefix_range:
+        statement = statement.where(models.User.email < prefix_range["end"])
+    if after_email is not None:
+        statement = statement.where(models.User.email > after_email)
+
+    result = await db.execute(statement.order_by(models.User.email).limit(limit))
+    return [UserOut.model_construct(id=user_id, email=email) for user_id, email in result]
+
+async def stream_users(email_prefix: str | None = None, chunk_size: int = 1000) -> AsyncIterator[List[UserOut]]:
+    """
+    Streams all users (or those whose email address starts with a prefix) ordered by identifier, in chunks fetched
+    from a server-side cursor, so memory stays bounded by the chunk size. It uses its own session for lookups,
+    since the response is still being sent after the request handler returned.
+
+        Parameters:
+            email_prefix (str | None): A non-empty email address prefix, None for all users.
+            chunk_size (int): The number of users fetched at once.
+
+        Returns:
+            AsyncIterator[List[UserOut]]: The chunks of users.
+    """
+    statement = select(models.User.id, models.User.email).order_by(models.User.id)
+    if email_prefix:
+        prefix_range = get_email_prefix_range(email_prefix)
+        statement = statement.where(models.User.email >= prefix_range["start"])
+        if "end" in prefix_range:
+            statement = statement.where(models.User.email < prefix_range["end"])
 
-    return db_user
+    async with get_async_sessionmaker()() as db:
+        result = await db.stream(statement.execution_options(yield_per=chunk_size))
+        async for partition in result.partitions():
+            yield [UserOut.model_construct(id=user_id, email=email) for user_id, email in partition]
@@ -0,0 +1,64 @@
+import hashlib
+from math import ceil, log
+from threading import Lock
+from typing import Iterator
+
+
+class BloomFilter:
+    """
+    Set of strings in a fixed-size bit array. It never misses an added string but may report
+    a string that was not added, with about `error_rate` probability while it holds at most `capacity` strings.
+
+        Attributes:
+            capacity (int): The number of strings the filter is sized for.
+            size (int): The number of bits.
+            hash_count (int): The number of bits set per string.
+            count (int): The number of added strings.
+    """
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """
+        Initialize the BloomFilter.
+
+            Parameters:
+                capacity (int): The number of strings the filter is sized for.
+                error_rate (float): The false positive rate at full capacity, e.g. 0.01.
+        """
+        self.capacity = capacity
+        self.size = max(64, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * log(2)))
+        self.count = 0
+        self._bits = bytearray(ceil(self.size / 8))
+        self._lock = Lock()
+
+    def _positions(self, item: str) -> Iterator[int]:
+        """
+        Derives the bit positions of a string from a single digest (double hashing).
+
+            Parameters:
+                item (str): The string.
+
+            Returns:
+                Iterator[int]: The bit positions.
+        """
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first_hash = int.from_bytes(digest[:8], "little")
+        second_hash = int.from_bytes(digest[8:], "little") | 1
+        for index in range(self.hash_count):
+            yield (first_hash + index * second_hash) % self.size
+
+    def add(self, item: str) -> None:
+        """
+        Adds a string.
+
+            Parameters:
+                item (str): The string.
+        """
+        positions = list(self._positions(item))
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
@@ -0,0 +1,179 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Hashable
+
+
+class CacheStats:
+    """
+    Hit and miss counters of a cache.
+
+        Attributes:
+            hits (int): The number of lookups answered from the cache.
+            misses (int): The number of lookups that had to fall back to the source.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize the counters with zeros.
+        """
+        self.hits = 0
+        self.misses = 0
+
+    def record_hit(self) -> None:
+        """
+        Increments the hit counter.
+        """
+        self.hits += 1
+
+    def record_miss(self) -> None:
+        """
+        Increments the miss counter.
+        """
+        self.misses += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Returns the counters as a dictionary.
+
+            Returns:
+                Dict[str, int]: The hits and misses.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class Cache(ABC):
+    """
+    Interface of a key-value cache. A shared backend (e.g. Redis) can be plugged in by implementing it.
+
+        Attributes:
+            stats (CacheStats): Hit and miss counters of the cache.
+    """
+    def __init__(self) -> None:
+        """
+        Initialize the cache statistics.
+        """
+        self.stats = CacheStats()
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Returns the cached value or None if the key is missing or expired.
+        """
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Stores a value, optionally with a time to live (in seconds) shorter than the default one.
+        """
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None:
+        """
+        Removes a key from the cache.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """
+        Removes all keys from the cache.
+        """
+
+
+class NullCache(Cache):
+    """
+    Cache that stores nothing, used when caching is disabled.
+    """
+    def get(self, key: Hashable) -> Any | None:
+        self.stats.record_miss()
+        return None
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        pass
+
+    def delete(self, key: Hashable) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+class LRUCache(Cache):
+    """
+    In-process cache bounded by the number of entries and by the entry age.
+    The least recently used entry is evicted when the cache is full.
+
+        Attributes:
+            max_size (int): The maximum number of entries.
+            ttl (float): The default time to live of an entry in seconds.
+    """
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        Initialize the LRUCache.
+
+            Parameters:
+                max_size (int): The maximum number of entries.
+                ttl (float): The default time to live of an entry in seconds.
+        """
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats.record_hit()
+                    return entry[1]
+                del self._entries[key]
+
+        self.stats.record_miss()
+        return None
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def build_cache(backend: str, max_size: int, ttl: float) -> Cache:
+    """
+    Builds a cache from its configuration.
+
+        Parameters:
+            backend (str): The cache backend, "memory" or "none".
+            max_size (int): The maximum number of entries.
+            ttl (float): The default time to live of an entry in seconds.
+
+        Raises:
+            ValueError: If the backend is unknown.
+
+        Returns:
+            Cache: The configured cache.
+    """
+    if backend == "none" or max_size <= 0 or ttl <= 0:
+        return NullCache()
+    if backend == "memory":
+        return LRUCache(max_size=max_size, ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
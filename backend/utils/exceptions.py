@@ -0,0 +1,25 @@
+from fastapi import HTTPException, status
+
+from .responses import encode_detail
+
+
+class HashingQueueFull(HTTPException):
+    """
+    Custom exception class for indicating that the password hashing pool has too many pending jobs.
+
+        Attributes:
+            STATUS_CODE (int): The HTTP status code for this exception, set to 503 Service Unavailable.
+            DETAIL (str): The detailed error message indicating that the server is temporarily overloaded.
+            BODY (bytes): The pre-encoded body of the error response.
+            HEADERS (Dict[str, str]): The headers to be included in the response when this exception is raised.
+    """
+    STATUS_CODE = status.HTTP_503_SERVICE_UNAVAILABLE
+    DETAIL = {"msg": "Server is busy, please try again later"}
+    BODY = encode_detail(DETAIL)
+    HEADERS = {"Retry-After": "1"}
+
+    def __init__(self) -> None:
+        """
+        Initialize the HashingQueueFull exception.
+        """
+        super().__init__(status_code=self.STATUS_CODE, detail=self.DETAIL, headers=self.HEADERS)
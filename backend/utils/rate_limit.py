@@ -0,0 +1,143 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import List, Tuple
+from zlib import crc32
+
+
+class RateLimitBackend(ABC):
+    """
+    Storage of token buckets. A shared backend (e.g. Redis) can be plugged in by implementing it,
+    so that all workers and instances share the same limits.
+    """
+    @abstractmethod
+    def consume(self, key: str, capacity: float, refill_per_second: float) -> float:
+        """
+        Takes one token from the bucket of the key.
+
+            Parameters:
+                key (str): The bucket key.
+                capacity (float): The size of the bucket, i.e. the allowed burst.
+                refill_per_second (float): Tokens added back to the bucket every second.
+
+            Returns:
+                float: 0 if a token was taken, otherwise the number of seconds until one is available.
+        """
+
+
+class NullRateLimitBackend(RateLimitBackend):
+    """
+    Backend that never limits, used when rate limiting is disabled.
+    """
+    def consume(self, key: str, capacity: float, refill_per_second: float) -> float:
+        return 0
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    In-process token buckets, split into shards with their own locks to limit contention.
+    A bucket is stored as a (tokens, updated, refilled) tuple, where refilled is the time the bucket is full again
+    and can be forgotten. The buckets of a shard are kept in the order they were last used, so expired buckets
+    are dropped from the front in O(1) and the least recently used buckets are evicted when a shard is full.
+
+        Attributes:
+            max_keys (int): The maximum number of buckets kept in memory.
+    """
+    def __init__(self, max_keys: int, shards: int = 64) -> None:
+        """
+        Initialize the MemoryRateLimitBackend.
+
+            Parameters:
+                max_keys (int): The maximum number of buckets kept in memory.
+                shards (int): The number of independently locked shards.
+        """
+        self.max_keys = max_keys
+        self._max_keys_per_shard = max(1, max_keys // shards)
+        self._shards: List[Tuple[Lock, OrderedDict[str, Tuple[float, float, float]]]] = [
+            (Lock(), OrderedDict()) for _ in range(shards)
+        ]
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for _, buckets in self._shards)
+
+    def consume(self, key: str, capacity: float, refill_per_second: float) -> float:
+        lock, buckets = self._shards[crc32(key.encode()) % len(self._shards)]
+        now = monotonic()
+
+        with lock:
+            while buckets:
+                oldest_key, (_, _, oldest_refilled) = next(iter(buckets.items()))
+                if oldest_refilled > now and len(buckets) < self._max_keys_per_shard:
+                    break
+                del buckets[oldest_key]
+
+            tokens, updated, _ = buckets.pop(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+
+            retry_after = 0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / refill_per_second
+
+            buckets[key] = (tokens, now, now + (capacity - tokens) / refill_per_second)
+            return retry_after
+
+
+class RateLimiter:
+    """
+    Token bucket limiter allowing a burst of `capacity` attempts, refilled evenly over `period` seconds.
+
+        Attributes:
+            name (str): The prefix of the bucket keys, which separates limiters sharing a backend.
+            capacity (float): The allowed burst.
+            refill_per_second (float): Tokens added back every second.
+    """
+    def __init__(self, name: str, backend: RateLimitBackend, capacity: float, period: float) -> None:
+        """
+        Initialize the RateLimiter.
+
+            Parameters:
+                name (str): The prefix of the bucket keys.
+                backend (RateLimitBackend): The bucket storage.
+                capacity (float): The allowed burst.
+                period (float): Seconds in which an empty bucket is refilled.
+        """
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_second = capacity / period
+        self._backend = backend
+
+    def hit(self, key: str) -> float:
+        """
+        Records an attempt.
+
+            Parameters:
+                key (str): The limited key, e.g. an IP address.
+
+            Returns:
+                float: 0 if the attempt is allowed, otherwise the number of seconds until the next one is.
+        """
+        return self._backend.consume(f"{self.name}:{key}", self.capacity, self.refill_per_second)
+
+
+def build_rate_limit_backend(backend: str, max_keys: int) -> RateLimitBackend:
+    """
+    Builds a rate limit backend from its configuration.
+
+        Parameters:
+            backend (str): The backend, "memory" or "none".
+            max_keys (int): The maximum number of buckets kept in memory.
+
+        Raises:
+            ValueError: If the backend is unknown.
+
+        Returns:
+            RateLimitBackend: The configured backend.
+    """
+    if backend == "none":
+        return NullRateLimitBackend()
+    if backend == "memory":
+        return MemoryRateLimitBackend(max_keys=max_keys)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
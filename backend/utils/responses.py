@@ -1,4 +1,21 @@
-from typing import Dict
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.exception_handlers import http_exception_handler as default_http_exception_handler
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+from ..config import get_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 
 def build_example_response(detail: Dict, headers: Dict = None) -> Dict:
@@ -26,3 +43,92 @@ def build_example_response(detail: Dict, headers: Dict = None) -> Dict:
         example_response["content"]["application/json"].update({"headers": headers})
 
     return example_response
+
+@lru_cache
+def get_json_encoder() -> Callable[[Any], bytes]:
+    """
+    Returns the JSON encoder selected by the settings.
+
+        Raises:
+            ImportError: If the orjson backend is selected but orjson is not installed.
+
+        Returns:
+            Callable[[Any], bytes]: The JSON encoder.
+    """
+    if get_settings().json_backend == "orjson":
+        if orjson is None:
+            raise ImportError("The orjson backend requires the orjson package (pip install orjson)")
+        return orjson.dumps
+    return to_json
+
+def encode_detail(detail: Dict) -> bytes:
+    """
+    Encodes the body of an error response once, when its exception class is defined.
+
+        Parameters:
+            detail (Dict): The detail of the error.
+
+        Returns:
+            bytes: The encoded response body.
+    """
+    return to_json({"detail": detail})
+
+def json_response(content: Dict, status_code: int = 200) -> Response:
+    """
+    Builds a JSON response from content the handler built itself, so the response model does not validate it again.
+
+        Parameters:
+            content (Dict): The content, already matching the response model.
+            status_code (int): The status code of the response.
+
+        Returns:
+            Response: The JSON response.
+    """
+    return Response(get_json_encoder()(content), status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Builds a JSON response from a model that is already the response model, so it is not validated again.
+
+        Parameters:
+            model (BaseModel): The model to send.
+            status_code (int): The status code of the response.
+
+        Returns:
+            Response: The JSON response.
+    """
+    return Response(model.__pydantic_serializer__.to_json(model), status_code=status_code, media_type=JSON_MEDIA_TYPE)
+
+def ndjson_response(chunks: AsyncIterator[List[BaseModel]]) -> StreamingResponse:
+    """
+    Builds a streamed NDJSON response, one model per line, sending every chunk as soon as it is encoded.
+
+        Parameters:
+            chunks (AsyncIterator[List[BaseModel]]): The chunks of models to send.
+
+        Returns:
+            StreamingResponse: The NDJSON response.
+    """
+    async def encode_chunks() -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            if chunk:
+                yield b"".join(model.__pydantic_serializer__.to_json(model) + b"\n" for model in chunk)
+
+    return StreamingResponse(encode_chunks(), media_type=NDJSON_MEDIA_TYPE)
+
+async def http_exception_handler(request: Request, exc: HTTPException) -> Response:
+    """
+    Sends the pre-encoded body (BODY) of an exception class raised with its constant detail,
+    and lets FastAPI encode any other HTTP exception.
+
+        Parameters:
+            request (Request): The request that raised the exception.
+            exc (HTTPException): The raised exception.
+
+        Returns:
+            Response: The error response.
+    """
+    body = getattr(exc, "BODY", None)
+    if body is None or exc.detail is not getattr(exc, "DETAIL", None):
+        return await default_http_exception_handler(request, exc)
+    return Response(body, status_code=exc.status_code, headers=exc.headers, media_type=JSON_MEDIA_TYPE)
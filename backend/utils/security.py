@@ -1,8 +1,75 @@
+import asyncio
+import hashlib
+import hmac
+from math import ceil
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from importlib.util import find_spec
+from threading import Lock
+from typing import Any, Callable, List
+
 from passlib.context import CryptContext
 
+from ..config import Settings, get_settings
+from ..metrics.instruments import timed
+from ..tracing.tracer import traced
+from .exceptions import HashingQueueFull
+
+
+def build_crypt_context(settings: Settings) -> CryptContext:
+    """
+    Builds the cryptographic context of passwords. The first scheme hashes new passwords with the configured cost,
+    hashes of the other schemes or with another cost are still verified but reported by needs_update.
+
+        Parameters:
+            settings (Settings): The application settings.
+
+        Raises:
+            ImportError: If the argon2 scheme is configured without argon2-cffi.
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        Returns:
+            CryptContext: The cryptographic context.
+    """
+    if "argon2" in settings.password_hash_schemes and find_spec("argon2") is None:
+        raise ImportError("The argon2 scheme requires the argon2-cffi package (pip install argon2-cffi)")
+
+    options = {}
+    if settings.bcrypt_rounds is not None:
+        options.update(
+            bcrypt__default_rounds=settings.bcrypt_rounds,
+            bcrypt__min_rounds=settings.bcrypt_rounds,
+            bcrypt__max_rounds=settings.bcrypt_rounds
+        )
+    if settings.argon2_time_cost is not None:
+        options.update(
+            argon2__default_rounds=settings.argon2_time_cost,
+            argon2__min_rounds=settings.argon2_time_cost,
+            argon2__max_rounds=settings.argon2_time_cost
+        )
+    if settings.argon2_memory_cost is not None:
+        options["argon2__memory_cost"] = settings.argon2_memory_cost
+
+    return CryptContext(schemes=list(settings.password_hash_schemes), deprecated="auto", **options)
+
+
+@lru_cache
+def get_pwd_context() -> CryptContext:
+    """
+    Returns the cryptographic context of passwords, built from the settings on first use
+    (in every process of a process hashing pool).
 
+        Returns:
+            CryptContext: The cryptographic context.
+    """
+    return build_crypt_context(get_settings())
+
+_hashing_executor: Executor | None = None
+_hashing_max_pending = 0
+_hashing_pending = 0
+_hashing_lock = Lock()
+_dummy_hashed_string: str | None = None
+
+@timed
 def verify_hashed_string(plain_string: str, hashed_string: str) -> bool:
     """
     Verifies a plain string against a string hashed by a cryptographic context.
@@ -14,8 +81,9 @@ def verify_hashed_string(plain_string: str, hashed_string: str) -> bool:
         Returns:
             bool: True if the string match, False otherwise.
     """
-    return pwd_context.verify(plain_string, hashed_string)
+    return get_pwd_context().verify(plain_string, hashed_string)
 
+@timed
 def get_hashed_string(string: str) -> str:
     """
    Hashes a string using the configured cryptographic context.
@@ -26,4 +94,211 @@ def get_hashed_string(string: str) -> str:
        Returns:
            str: The hashed string.
     """
-    return pwd_context.hash(string)
+    return get_pwd_context().hash(string)
+
+def hashed_string_needs_update(hashed_string: str) -> bool:
+    """
+    Checks whether a hash uses a deprecated scheme or another cost than the configured one.
+
+        Parameters:
+            hashed_string (str): A hashed string.
+
+        Returns:
+            bool: True if the string should be hashed again, False otherwise.
+    """
+    return get_pwd_context().needs_update(hashed_string)
+
+def is_supported_hashed_string(hashed_string: str) -> bool:
+    """
+    Checks whether a string is a well-formed hash of one of the configured schemes (PASSWORD_HASH_SCHEMES),
+    e.g. before importing it.
+
+        Parameters:
+            hashed_string (str): A hashed string.
+
+        Returns:
+            bool: True if the hash can be verified, False otherwise.
+    """
+    pwd_context = get_pwd_context()
+    scheme = pwd_context.identify(hashed_string, required=False)
+    if scheme is None:
+        return False
+    try:
+        pwd_context.handler(scheme).from_string(hashed_string)
+    except ValueError:
+        return False
+    return True
+
+@lru_cache
+def _get_digest_key() -> bytes:
+    """
+    Returns the key of refresh-token digests, encoded once.
+
+        Returns:
+            bytes: The digest key.
+    """
+    return get_settings().secret_key.encode()
+
+@traced
+def get_keyed_digest(string: str) -> str:
+    """
+    Computes a keyed HMAC-SHA256 digest of a high-entropy string (e.g. a refresh token).
+    Unlike bcrypt the digest is deterministic, so it can be stored in an index and looked up directly.
+
+        Parameters:
+            string (str): The string to digest.
+
+        Returns:
+            str: The hexadecimal digest.
+    """
+    return hmac.new(_get_digest_key(), string.encode(), hashlib.sha256).hexdigest()
+
+def _get_hashing_executor() -> Executor:
+    """
+    Creates the hashing pool configured by the settings on first use,
+    so that forked worker processes do not inherit it.
+
+        Returns:
+            Executor: The hashing pool.
+    """
+    global _hashing_executor, _hashing_max_pending
+
+    with _hashing_lock:
+        if _hashing_executor is None:
+            settings = get_settings()
+            executor_class = ProcessPoolExecutor \
+                if settings.password_hashing_executor == "process" else ThreadPoolExecutor
+
+            _hashing_executor = executor_class(max_workers=settings.password_hashing_workers)
+            _hashing_max_pending = settings.password_hashing_max_pending
+
+    return _hashing_executor
+
+async def _run_in_hashing_pool(function: Callable[..., Any], *args: Any) -> Any:
+    """
+    Runs a hashing function in the hashing pool without blocking the event loop.
+
+        Parameters:
+            function (Callable[..., Any]): The function to run.
+            *args (Any): Arguments passed to the function.
+
+        Raises:
+            HashingQueueFull: If the pool already has the maximum number of pending jobs.
+
+        Returns:
+            Any: The value returned by the function.
+    """
+    global _hashing_pending
+
+    executor = _get_hashing_executor()
+    with _hashing_lock:
+        if _hashing_pending >= _hashing_max_pending:
+            raise HashingQueueFull()
+        _hashing_pending += 1
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+    finally:
+        with _hashing_lock:
+            _hashing_pending -= 1
+
+@traced
+@timed
+async def async_verify_hashed_string(plain_string: str, hashed_string: str) -> bool:
+    """
+    Verifies a plain string against a hashed string in the hashing pool.
+
+        Parameters:
+            plain_string (str): A plain string to be verified.
+            hashed_string (str): A hashed string to compare against.
+
+        Raises:
+            HashingQueueFull: If the hashing pool is overloaded.
+
+        Returns:
+            bool: True if the string match, False otherwise.
+    """
+    return await _run_in_hashing_pool(verify_hashed_string, plain_string, hashed_string)
+
+@traced
+@timed
+async def async_get_hashed_string(string: str) -> str:
+    """
+    Hashes a string in the hashing pool.
+
+        Parameters:
+            string (str): The string to be hashed.
+
+        Raises:
+            HashingQueueFull: If the hashing pool is overloaded.
+
+        Returns:
+            str: The hashed string.
+    """
+    return await _run_in_hashing_pool(get_hashed_string, string)
+
+async def async_get_dummy_hashed_string() -> str:
+    """
+    Returns a hash that is verified instead of a real one when a user does not exist,
+    so that a login with an unknown email address takes as long as one with a wrong password.
+    It is computed once in the hashing pool, normally at startup, so it never blocks the event loop.
+
+        Raises:
+            HashingQueueFull: If the hashing pool is overloaded.
+
+        Returns:
+            str: The dummy hashed string.
+    """
+    global _dummy_hashed_string
+    if _dummy_hashed_string is None:
+        _dummy_hashed_string = await async_get_hashed_string("dummy password used to equalize login timing")
+    return _dummy_hashed_string
+
+@timed
+def get_hashed_strings(strings: List[str]) -> List[str]:
+    """
+    Hashes several strings one after another, used to send a batch to a single pool worker.
+
+        Parameters:
+            strings (List[str]): The strings to be hashed.
+
+        Returns:
+            List[str]: The hashed strings, in the same order.
+    """
+    return [get_pwd_context().hash(string) for string in strings]
+
+@traced
+@timed
+async def async_get_hashed_strings(strings: List[str]) -> List[str]:
+    """
+    Hashes a batch of strings in parallel on all workers of the hashing pool.
+    The batch is split into one job per worker, so it takes only a few slots of the pool queue.
+
+        Parameters:
+            strings (List[str]): The strings to be hashed.
+
+        Raises:
+            HashingQueueFull: If the hashing pool is overloaded.
+
+        Returns:
+            List[str]: The hashed strings, in the same order.
+    """
+    if not strings:
+        return []
+
+    group_size = ceil(len(strings) / get_settings().password_hashing_workers)
+    groups = [strings[index:index + group_size] for index in range(0, len(strings), group_size)]
+    hashed_groups = await asyncio.gather(*[_run_in_hashing_pool(get_hashed_strings, group) for group in groups])
+
+    return [hashed_string for hashed_group in hashed_groups for hashed_string in hashed_group]
+
+def shutdown_hashing_pool() -> None:
+    """
+    Shuts down the hashing pool. It is created again on the next use.
+    """
+    global _hashing_executor
+
+    with _hashing_lock:
+        if _hashing_executor is not None:
+            _hashing_executor.shutdown(wait=True)
+            _hashing_executor = None
@@ -0,0 +1,76 @@
+"""
+Compares benchmark results (from benchmarks.load_test or benchmarks.microbenchmarks) with a baseline
+and fails if any metric got worse by more than the threshold.
+
+Usage:
+    python -m benchmarks.load_test --output baseline.json      # on the base commit
+    python -m benchmarks.load_test --output current.json       # on the new commit
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.10]
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms")
+HIGHER_IS_BETTER = ("throughput_per_second", "ops_per_second")
+
+def compare_results(baseline: Dict, current: Dict, threshold: float) -> List[Dict]:
+    """
+    Compares the metrics that exist in both results.
+
+        Parameters:
+            baseline (Dict): The baseline results.
+            current (Dict): The current results.
+            threshold (float): The allowed relative regression, e.g. 0.1 for 10%.
+
+        Returns:
+            List[Dict]: One comparison per metric, with its relative change and whether it regressed.
+    """
+    comparisons = []
+    for name, baseline_metrics in baseline["results"].items():
+        current_metrics = current["results"].get(name)
+        if current_metrics is None:
+            continue
+
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            if metric not in baseline_metrics or metric not in current_metrics or not baseline_metrics[metric]:
+                continue
+
+            change = (current_metrics[metric] - baseline_metrics[metric]) / baseline_metrics[metric]
+            worse = change if metric in LOWER_IS_BETTER else -change
+            comparisons.append({
+                "name": name,
+                "metric": metric,
+                "baseline": baseline_metrics[metric],
+                "current": current_metrics[metric],
+                "change": round(change, 4),
+                "regressed": worse > threshold,
+            })
+
+    return comparisons
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.compare", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("baseline", help="Results of the base commit")
+    parser.add_argument("current", help="Results of the new commit")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative regression")
+    arguments = parser.parse_args()
+
+    with open(arguments.baseline) as baseline_file, open(arguments.current) as current_file:
+        results = compare_results(json.load(baseline_file), json.load(current_file), arguments.threshold)
+
+    for comparison in results:
+        print(
+            f"{'REGRESSED' if comparison['regressed'] else 'ok':<10}{comparison['name']:<40}{comparison['metric']:<24}"
+            f"{comparison['baseline']:>14} -> {comparison['current']:<14}{comparison['change']:+.1%}"
+        )
+
+    regressions = [comparison for comparison in results if comparison["regressed"]]
+    if regressions:
+        print(f"{len(regressions)} metrics regressed by more than {arguments.threshold:.0%}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,29 @@
+"""
+Environment shared by the benchmarks, set before the backend is imported.
+"""
+from os import environ
+from pathlib import Path
+
+
+def configure_environment(directory: str, database_url: str | None = None) -> None:
+    """
+    Points the API at a temporary SQLite database (or the given database) before the backend is imported.
+
+        Parameters:
+            directory (str): A directory for the temporary database.
+            database_url (str | None): A database URL to use instead, e.g. a local PostgreSQL database.
+    """
+    environ["DATABASE_URL"] = database_url or f"sqlite:///{Path(directory) / 'benchmark.db'}"
+    environ.setdefault("ALGORITHM", "HS256")
+    environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "15")
+    environ.setdefault("REFRESH_TOKEN_EXPIRE_MINUTES", "10080")
+
+def migrate_database() -> None:
+    """
+    Applies the schema migrations to the configured database, as a deployment does before starting the API.
+    """
+    from backend.database.configuration import get_engine
+    from backend.database.migrate import upgrade
+
+    upgrade(get_engine())
@@ -0,0 +1,114 @@
+"""
+Measures how long importing the application takes in a fresh interpreter, which every worker pays on a cold start,
+and fails if the median exceeds the budget. The database URL points into a directory that does not exist,
+so the import also fails if anything connects to the database before the application starts.
+
+Usage:
+    python -m benchmarks.import_time [--runs 5] [--budget-ms 1500] [--module backend.main] [--output FILE]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from os import environ
+from pathlib import Path
+from statistics import median
+from typing import Dict, List, Tuple
+
+from .environment import configure_environment
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Imports a module in a new interpreter with -X importtime.
+
+        Parameters:
+            module (str): The imported module.
+
+        Raises:
+            RuntimeError: If the import fails.
+
+        Returns:
+            Tuple[float, Dict[str, float]]: The cumulative import time of the module and the own import time
+            of every imported module, in milliseconds.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=environ.copy(), capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    total_ms = 0.0
+    self_times: Dict[str, float] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        self_times[name.strip()] = int(self_us) / 1000
+        if name.strip() == module:
+            total_ms = int(cumulative_us) / 1000
+    return total_ms, self_times
+
+def run_import_benchmark(module: str, runs: int, top: int) -> Dict:
+    """
+    Measures the import several times and summarizes it.
+
+        Parameters:
+            module (str): The imported module.
+            runs (int): The number of fresh interpreters.
+            top (int): The number of slowest modules reported.
+
+        Returns:
+            Dict: The median and maximum import time and the slowest modules of the last run.
+    """
+    durations: List[float] = []
+    self_times: Dict[str, float] = {}
+    for _ in range(runs):
+        total_ms, self_times = measure_import(module)
+        durations.append(total_ms)
+
+    project_ms = sum(milliseconds for name, milliseconds in self_times.items() if name.split(".")[0] == "backend")
+    return {
+        "p50_ms": round(median(durations), 1),
+        "max_ms": round(max(durations), 1),
+        "project_ms": round(project_ms, 1),
+        "slowest_modules_ms": {
+            name: round(milliseconds, 1)
+            for name, milliseconds in sorted(self_times.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.import_time", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--module", default="backend.main", help="Module imported by the workers")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters measured")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="Allowed median import time")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules reported")
+    parser.add_argument("--output", help="Also write the results to this file")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        unreachable_database = Path(temporary_directory) / "missing" / "benchmark.db"
+        configure_environment(temporary_directory, f"sqlite:///{unreachable_database}")
+        benchmark_name = f"import {arguments.module}"
+        results = {
+            "benchmark": "import_time",
+            "parameters": {"module": arguments.module, "runs": arguments.runs, "budget_ms": arguments.budget_ms},
+            "results": {benchmark_name: run_import_benchmark(arguments.module, arguments.runs, arguments.top)},
+        }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if arguments.output:
+        Path(arguments.output).write_text(output)
+
+    import_ms = results["results"][benchmark_name]["p50_ms"]
+    if import_ms > arguments.budget_ms:
+        print(f"Import time budget exceeded: {import_ms} ms > {arguments.budget_ms} ms", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,54 @@
+"""
+Compares encode and decode throughput of the available JWT backends.
+
+Usage:
+    python -m benchmarks.jwt_backends [--iterations N]
+"""
+import argparse
+import json
+from datetime import datetime, timedelta, timezone
+from timeit import timeit
+from typing import Dict
+
+from backend.authentication.backends import JWT_BACKENDS
+from backend.authentication.keys import KeyRing
+
+
+def benchmark_backend(name: str, iterations: int, algorithm: str = "HS256") -> Dict[str, float]:
+    """
+    Measures how many tokens per second a backend encodes and decodes.
+
+        Parameters:
+            name (str): The backend name.
+            iterations (int): The number of tokens encoded and decoded.
+            algorithm (str): The signing algorithm.
+
+        Returns:
+            Dict[str, float]: Encoded and decoded tokens per second.
+    """
+    backend = JWT_BACKENDS[name](KeyRing(algorithm, "benchmark-secret-key-" * 3))
+    claims = {"sub": "1", "exp": datetime.now(timezone.utc) + timedelta(minutes=15)}
+    token = backend.encode(claims)
+
+    encode_seconds = timeit(lambda: backend.encode(claims), number=iterations)
+    decode_seconds = timeit(lambda: backend.decode(token), number=iterations)
+
+    return {
+        "encode_per_second": round(iterations / encode_seconds),
+        "decode_per_second": round(iterations / decode_seconds),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    arguments = parser.parse_args()
+
+    results = {}
+    for backend_name in JWT_BACKENDS:
+        try:
+            results[backend_name] = benchmark_backend(backend_name, arguments.iterations)
+        except ImportError as error:
+            results[backend_name] = {"error": str(error)}
+
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,127 @@
+"""
+Measures the hot functions of the authentication flows in isolation: password hashing and refresh-token digests
+(backend/utils/security.py), token creation and decoding (backend/authentication/services.py),
+the password validation of UserIn and the encoding of token and user responses (backend/utils/responses.py),
+next to the validation and encoding the response model would do, and the cost of a span in unsampled and sampled
+traces (backend/tracing/tracer.py).
+Prints operations per second as JSON, to be compared with benchmarks.compare.
+
+Usage:
+    python -m benchmarks.microbenchmarks [--iterations 20000] [--hash-iterations 5] [--output results.json]
+"""
+import argparse
+import json
+import tempfile
+from datetime import timedelta
+from os import environ
+from timeit import timeit
+from typing import Callable, Dict
+
+from .environment import configure_environment
+
+
+def measure(function: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """
+    Runs a function repeatedly after one warm-up call.
+
+        Parameters:
+            function (Callable[[], object]): The function to measure.
+            iterations (int): The number of calls.
+
+        Returns:
+            Dict[str, float]: Calls per second and the mean duration of a call in microseconds.
+    """
+    function()
+    seconds = timeit(function, number=iterations)
+    return {
+        "ops_per_second": round(iterations / seconds, 1),
+        "mean_us": round(seconds / iterations * 1_000_000, 2),
+    }
+
+def run_microbenchmarks(iterations: int, hash_iterations: int) -> Dict[str, Dict[str, float]]:
+    """
+    Measures every microbenchmark.
+
+        Parameters:
+            iterations (int): The number of calls of fast functions.
+            hash_iterations (int): The number of calls of bcrypt functions.
+
+        Returns:
+            Dict[str, Dict[str, float]]: The measurements by function.
+    """
+    from fastapi import Response
+
+    from backend.authentication.schemas import Tokens
+    from backend.authentication.services import create_token, decode_token, decode_token_cached
+    from backend.tracing.exporters import MemorySpanExporter
+    from backend.tracing.tracer import Tracer, set_current_span, span
+    from backend.users.schemas import UserIn, UserOut
+    from backend.utils.responses import JSON_MEDIA_TYPE, json_response, model_response
+    from backend.utils.security import get_hashed_string, get_keyed_digest, verify_hashed_string
+
+    password = "Benchmark123"
+    hashed_password = get_hashed_string(password)
+    token = create_token({"sub": "1"}, timedelta(minutes=15))
+    refresh_token = create_token({"sub": "1"}, timedelta(days=7))
+    tokens = {"access_token": token, "refresh_token": refresh_token, "token_type": "bearer"}
+    user = UserOut(id=1, email="benchmark@example.com")
+
+    def run_span() -> None:
+        with span("benchmark"):
+            pass
+
+    tracer = Tracer(MemorySpanExporter(), sample_rate=1)
+    unsampled_span = measure(run_span, iterations)
+    set_current_span(tracer.start_trace("benchmark"))
+    sampled_span = measure(run_span, iterations)
+    set_current_span(None)
+
+    return {
+        "security.get_hashed_string": measure(lambda: get_hashed_string(password), hash_iterations),
+        "security.verify_hashed_string": measure(
+            lambda: verify_hashed_string(password, hashed_password), hash_iterations
+        ),
+        "security.get_keyed_digest": measure(lambda: get_keyed_digest(refresh_token), iterations),
+        "authentication.create_token": measure(lambda: create_token({"sub": "1"}, timedelta(minutes=15)), iterations),
+        "authentication.decode_token": measure(lambda: decode_token(token), iterations),
+        "authentication.decode_token_cached": measure(lambda: decode_token_cached(token), iterations),
+        "users.UserIn.password_validator": measure(lambda: UserIn.password_validator(password), iterations),
+        "users.UserIn.model_validate": measure(
+            lambda: UserIn.model_validate({"email": "benchmark@example.com", "password": password}), iterations
+        ),
+        "responses.json_response": measure(lambda: json_response(tokens), iterations),
+        "responses.Tokens.validate_and_dump": measure(
+            lambda: Response(Tokens.model_validate(tokens).model_dump_json(), media_type=JSON_MEDIA_TYPE), iterations
+        ),
+        "responses.model_response": measure(lambda: model_response(user), iterations),
+        "responses.UserOut.validate_and_dump": measure(
+            lambda: Response(UserOut.model_validate(user).model_dump_json(), media_type=JSON_MEDIA_TYPE), iterations
+        ),
+        "tracing.span (unsampled)": unsampled_span,
+        "tracing.span (sampled)": sampled_span,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.microbenchmarks", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--iterations", type=int, default=20000, help="Calls of fast functions")
+    parser.add_argument("--hash-iterations", type=int, default=5, help="Calls of bcrypt functions")
+    parser.add_argument("--output", help="Also write the results to this file")
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        configure_environment(temporary_directory)
+        environ.setdefault("TOKEN_CACHE_MAX_SIZE", "10000")
+        results = {
+            "benchmark": "microbenchmarks",
+            "parameters": {"iterations": arguments.iterations, "hash_iterations": arguments.hash_iterations},
+            "results": run_microbenchmarks(arguments.iterations, arguments.hash_iterations),
+        }
+
+    print(json.dumps(results, indent=2))
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
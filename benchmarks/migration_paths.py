@@ -0,0 +1,120 @@
+"""
+Applies the schema migrations to the databases a deployment may start from, each in a temporary SQLite database
+holding one user, and fails if an upgrade breaks, leaves migrations pending, loses the user or does not end with
+the schema of the models.
+
+Starting points:
+    empty              a new database
+    original           the users table created by create_all before migrations and sessions existed
+    indexed-digest     the same table once refresh tokens were looked up by their indexed digest
+
+Usage:
+    python -m benchmarks.migration_paths
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict
+
+from sqlalchemy import Column, Engine, Integer, MetaData, String, Table, create_engine, inspect, text
+
+from .environment import configure_environment
+
+
+def create_legacy_users_table(indexed_digest: bool) -> Callable[[Engine], None]:
+    """
+    Returns a function creating the users table as create_all built it before migrations existed.
+
+        Parameters:
+            indexed_digest (bool): Whether the refresh token digest has a unique index.
+
+        Returns:
+            Callable[[Engine], None]: Creates the table and a user.
+    """
+    def create(engine: Engine) -> None:
+        metadata = MetaData()
+        Table(
+            "users", metadata,
+            Column("id", Integer, primary_key=True, index=True),
+            Column("email", String, unique=True, index=True),
+            Column("hashed_password", String),
+            Column("hashed_refresh_token", String, unique=indexed_digest, index=indexed_digest, default=None)
+        )
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(text(
+                "INSERT INTO users (email, hashed_password, hashed_refresh_token) "
+                "VALUES ('legacy@example.com', 'hash', 'digest')"
+            ))
+
+    return create
+
+def check_upgrade(directory: Path, name: str, prepare: Callable[[Engine], None]) -> Dict:
+    """
+    Prepares a database, applies the migrations and compares the result with the models.
+
+        Parameters:
+            directory (Path): A directory for the temporary database.
+            name (str): The name of the starting point.
+            prepare (Callable[[Engine], None]): Creates the starting schema and data.
+
+        Returns:
+            Dict: The applied versions and the problems found, empty if the upgrade succeeded.
+    """
+    from backend import models
+    from backend.database.configuration import Base
+    from backend.database.migrate import get_pending_migrations, upgrade
+
+    engine = create_engine(f"sqlite:///{directory / f'{name}.db'}")
+    problems = []
+    applied = []
+    try:
+        prepare(engine)
+        applied = [migration.version for migration in upgrade(engine)]
+        with engine.connect() as connection:
+            if get_pending_migrations(connection):
+                problems.append("migrations are still pending")
+            inspector = inspect(connection)
+            for table in Base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    problems.append(f"table {table.name} is missing")
+                    continue
+                columns = {column["name"] for column in inspector.get_columns(table.name)}
+                if columns != set(table.columns.keys()):
+                    problems.append(f"table {table.name} has columns {sorted(columns)}")
+            users = connection.scalar(text(f"SELECT COUNT(*) FROM {models.User.__tablename__}"))
+            if name != "empty" and users != 1:
+                problems.append(f"{users} users left instead of 1")
+    except Exception as error:
+        problems.append(f"{type(error).__name__}: {error}")
+    finally:
+        engine.dispose()
+    return {"applied": applied, "problems": problems}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.migration_paths", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        configure_environment(temporary_directory)
+        starting_points = {
+            "empty": lambda engine: None,
+            "original": create_legacy_users_table(indexed_digest=False),
+            "indexed-digest": create_legacy_users_table(indexed_digest=True),
+        }
+        results = {
+            name: check_upgrade(Path(temporary_directory), name, prepare)
+            for name, prepare in starting_points.items()
+        }
+
+    print(json.dumps(results, indent=2))
+    failed = [name for name, result in results.items() if result["problems"]]
+    if failed:
+        print(f"Upgrade failed from: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
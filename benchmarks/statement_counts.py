@@ -0,0 +1,81 @@
+"""
+Counts the SQL statements executed by every endpoint and fails if any endpoint exceeds its budget.
+
+Usage:
+    python -m benchmarks.statement_counts
+"""
+import json
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from .environment import configure_environment, migrate_database
+
+
+STATEMENT_BUDGETS = {
+    "register": 1,
+    "login": 2,
+    "refresh": 1,
+    "me (cold)": 1,
+    "me (cached)": 0,
+}
+
+def count_statements() -> Dict[str, int]:
+    """
+    Runs one request per endpoint and counts the statements sent to the database.
+
+        Returns:
+            Dict[str, int]: The number of statements executed by each endpoint.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    from backend.config import API_ENDPOINT
+    from backend.database.configuration import get_async_engine
+    from backend.main import app
+    from backend.users.services import get_email_filter
+
+    statements = []
+    event.listen(
+        get_async_engine().sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2])
+    )
+
+    def measure(name: str, method: str, url: str, **kwargs) -> Dict:
+        statements.clear()
+        response = client.request(method, f"{API_ENDPOINT}{url}", **kwargs)
+        response.raise_for_status()
+        counts[name] = len(statements)
+        return response.json()
+
+    counts = {}
+    credentials = {"email": "benchmark@example.com", "password": "Benchmark123"}
+    with TestClient(app) as client:
+        client.get(f"{API_ENDPOINT}/users/email-available", params={"email": credentials["email"]})
+        while get_email_filter() is not None and not get_email_filter().ready:
+            time.sleep(0.01)
+
+        measure("register", "POST", "/users/register", json=credentials)
+        tokens = measure(
+            "login", "POST", "/users/login",
+            data={"username": credentials["email"], "password": credentials["password"]}
+        )
+        measure("refresh", "GET", "/users/refresh", params={"refresh_token": tokens["refresh_token"]})
+        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        measure("me (cold)", "GET", "/users/me", headers=headers)
+        measure("me (cached)", "GET", "/users/me", headers=headers)
+
+    return counts
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        configure_environment(temporary_directory)
+        migrate_database()
+        counts = count_statements()
+
+    print(json.dumps(counts, indent=2))
+    over_budget = {name: count for name, count in counts.items() if count > STATEMENT_BUDGETS[name]}
+    if over_budget:
+        print(f"Statement budget exceeded: {over_budget}", file=sys.stderr)
+        sys.exit(1)
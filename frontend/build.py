@@ -0,0 +1,213 @@
+"""
+Builds the frontend for the production nginx profile (nginx-1.25.2/conf/nginx.production.conf) into frontend/dist.
+
+Every file of frontend/src is copied to dist/assets with a hash of its content in its name
+(e.g. hooks/loginHook.3f2a9c1e.js), after the references to other assets (ES module imports and CSS @import)
+were rewritten to their hashed names, so a change in a module also renames the modules importing it.
+Assets can then be cached by browsers forever. The pages of frontend/public are copied with their references
+pointing to the hashed assets and are never cached. Text files also get precompressed .gz copies
+(and .br copies if the brotli package is installed) served by gzip_static and brotli_static.
+
+Usage:
+    python frontend/build.py [--output frontend/dist]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import posixpath
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, List, Set
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+FRONTEND_DIRECTORY = Path(__file__).resolve().parent
+ASSETS_URL = "/assets/"
+HASH_LENGTH = 8
+COMPRESSED_SUFFIXES = {".html", ".js", ".css", ".svg", ".json", ".txt"}
+
+MODULE_REFERENCE_PATTERN = re.compile(r"""((?:\bfrom|\bimport)\s*\(?\s*["'])(\.{1,2}/[^"']+)(["'])""")
+CSS_REFERENCE_PATTERN = re.compile(r"""(@import\s+url\(\s*["']?)(?![a-z]+:|/)([^"')]+)(["']?\s*\))""")
+PAGE_REFERENCE_PATTERN = re.compile(r"""((?:\bsrc=|\bhref=|\bfrom\s+)["'])((?:\.\./|\./)*src/[^"']+)(["'])""")
+
+def get_hashed_name(relative_path: str, content: bytes) -> str:
+    """
+    Inserts a hash of the content in a file name, before its extension.
+
+        Parameters:
+            relative_path (str): The path of the file, relative to frontend/src.
+            content (bytes): The content of the file.
+
+        Returns:
+            str: The hashed path, e.g. "hooks/loginHook.3f2a9c1e.js".
+    """
+    stem, extension = posixpath.splitext(relative_path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{extension}"
+
+def hash_asset(
+    relative_path: str, source_directory: Path, hashed_names: Dict[str, str], contents: Dict[str, bytes],
+    in_progress: Set[str]
+) -> str:
+    """
+    Rewrites the references of an asset to the hashed names of the assets it references, hashing them first,
+    and then hashes the asset itself.
+
+        Parameters:
+            relative_path (str): The path of the asset, relative to the source directory.
+            source_directory (Path): The frontend/src directory.
+            hashed_names (Dict[str, str]): The hashed paths by source path, filled in.
+            contents (Dict[str, bytes]): The rewritten contents by hashed path, filled in.
+            in_progress (Set[str]): The assets being hashed, to detect import cycles.
+
+        Raises:
+            ValueError: If assets import each other or a referenced asset does not exist.
+
+        Returns:
+            str: The hashed path of the asset.
+    """
+    if relative_path in hashed_names:
+        return hashed_names[relative_path]
+    if relative_path in in_progress:
+        raise ValueError(f"Import cycle through {relative_path}, content hashes can not be computed")
+    source_file = source_directory / relative_path
+    if not source_file.is_file():
+        raise ValueError(f"Referenced asset {relative_path} does not exist")
+
+    in_progress.add(relative_path)
+    content = source_file.read_bytes()
+    pattern = {".js": MODULE_REFERENCE_PATTERN, ".css": CSS_REFERENCE_PATTERN}.get(source_file.suffix)
+    if pattern is not None:
+        directory = posixpath.dirname(relative_path)
+
+        def replace_reference(match: re.Match) -> str:
+            referenced_path = posixpath.normpath(posixpath.join(directory, match[2]))
+            hashed_path = hash_asset(referenced_path, source_directory, hashed_names, contents, in_progress)
+            hashed_reference = posixpath.relpath(hashed_path, directory or ".")
+            if match[2].startswith("./") or (source_file.suffix == ".js" and not hashed_reference.startswith(".")):
+                hashed_reference = f"./{hashed_reference}"
+            return f"{match[1]}{hashed_reference}{match[3]}"
+
+        content = pattern.sub(replace_reference, content.decode()).encode()
+    in_progress.discard(relative_path)
+
+    hashed_path = get_hashed_name(relative_path, content)
+    hashed_names[relative_path] = hashed_path
+    contents[hashed_path] = content
+    return hashed_path
+
+def rewrite_page(page: str, hashed_names: Dict[str, str]) -> str:
+    """
+    Points the asset references of a page (e.g. "src/hooks/loginHook.js" or "../../src/utils/logout.js")
+    to the absolute URLs of the hashed assets.
+
+        Parameters:
+            page (str): The HTML of the page.
+            hashed_names (Dict[str, str]): The hashed paths by source path.
+
+        Raises:
+            ValueError: If a referenced asset does not exist.
+
+        Returns:
+            str: The rewritten HTML.
+    """
+    def replace_reference(match: re.Match) -> str:
+        relative_path = match[2].rsplit("src/", 1)[1]
+        if relative_path not in hashed_names:
+            raise ValueError(f"Referenced asset {match[2]} does not exist")
+        return f"{match[1]}{ASSETS_URL}{hashed_names[relative_path]}{match[3]}"
+
+    return PAGE_REFERENCE_PATTERN.sub(replace_reference, page)
+
+def write_file(path: Path, content: bytes) -> List[Path]:
+    """
+    Writes a file and its precompressed copies.
+
+        Parameters:
+            path (Path): The path of the file.
+            content (bytes): The content of the file.
+
+        Returns:
+            List[Path]: The written files.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    written = [path]
+    if path.suffix not in COMPRESSED_SUFFIXES:
+        return written
+
+    gzip_path = path.with_name(f"{path.name}.gz")
+    gzip_path.write_bytes(gzip.compress(content, compresslevel=9, mtime=0))
+    written.append(gzip_path)
+    if brotli is not None:
+        brotli_path = path.with_name(f"{path.name}.br")
+        brotli_path.write_bytes(brotli.compress(content, quality=11))
+        written.append(brotli_path)
+    return written
+
+def build(output_directory: Path) -> Dict[str, str]:
+    """
+    Builds the hashed assets and the pages into an emptied output directory.
+
+        Parameters:
+            output_directory (Path): The output directory, e.g. frontend/dist.
+
+        Returns:
+            Dict[str, str]: The manifest: the hashed asset URL by source path.
+    """
+    source_directory = FRONTEND_DIRECTORY / "src"
+    public_directory = FRONTEND_DIRECTORY / "public"
+
+    hashed_names: Dict[str, str] = {}
+    contents: Dict[str, bytes] = {}
+    for source_file in sorted(source_directory.rglob("*")):
+        if source_file.is_file():
+            relative_path = source_file.relative_to(source_directory).as_posix()
+            hash_asset(relative_path, source_directory, hashed_names, contents, set())
+
+    if output_directory.exists():
+        shutil.rmtree(output_directory)
+    for hashed_path, content in contents.items():
+        write_file(output_directory / "assets" / hashed_path, content)
+
+    for page_file in sorted(public_directory.rglob("*")):
+        if not page_file.is_file():
+            continue
+        content = page_file.read_bytes()
+        if page_file.suffix == ".html":
+            content = rewrite_page(content.decode(), hashed_names).encode()
+        write_file(output_directory / page_file.relative_to(public_directory), content)
+
+    manifest = {f"src/{path}": f"{ASSETS_URL}{hashed_path}" for path, hashed_path in sorted(hashed_names.items())}
+    (output_directory / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+def parse_arguments(argv: List[str] | None = None) -> argparse.Namespace:
+    """
+    Parses the command line arguments.
+
+        Parameters:
+            argv (List[str] | None): The arguments, defaults to sys.argv.
+
+        Returns:
+            argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python frontend/build.py", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--output", default=str(FRONTEND_DIRECTORY / "dist"), help="The output directory")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    built_manifest = build(Path(arguments.output))
+    print(f"Built {len(built_manifest)} assets into {arguments.output}")
+    if brotli is None:
+        print("brotli is not installed (pip install brotli), only .gz copies were written")
@@ -1 +1 @@
-export const baseApiUrl = "http://localhost:8000/api/v1";
\ No newline at end of file
+export const baseApiUrl = "/api/v1";
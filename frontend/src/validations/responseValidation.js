@@ -72,6 +72,7 @@ export async function refreshAccessTokenResponseValidation(refreshAccessTokenRes
     if (refreshAccessTokenResponse.status === 200) {
         const responseData = await refreshAccessTokenResponse.json();
         document.cookie = `accessToken=${responseData.access_token}; path=/; SameSite=Strict;`;
+        document.cookie = `refreshToken=${responseData.refresh_token}; path=/; SameSite=Strict;`;
         return true;
     } else {
         removeCookies();